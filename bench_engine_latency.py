@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+基准测试：比较“每任务一个 yt-dlp 进程”和“常驻 worker 进程池”的单任务延迟
+
+默认使用本地 file:// 媒体文件，不依赖网络，测到的主要就是 yt-dlp 冷启动
+（解释器、全部 extractor、插件加载）的开销。也可以用 --url 指定真实链接。
+
+用法：
+    python bench_engine_latency.py
+    python bench_engine_latency.py --jobs 10 --workers 2 --url https://...
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from statistics import mean, median
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import worker_pool
+
+
+def build_process_command():
+    """与下载器 QProcess 路径相同的可执行文件；开发环境退回 python -m yt_dlp"""
+    exe = Path(__file__).parent / "bin" / "yt-dlp.exe"
+    if exe.exists() and os.name == "nt":
+        return [str(exe)]
+    return [sys.executable, "-m", "yt_dlp"]
+
+
+def build_job_args(url, output_dir, index):
+    return [
+        "--enable-file-urls",
+        "--no-progress",
+        "--force-overwrites",
+        "-o", os.path.join(output_dir, f"job{index}.%(ext)s"),
+        url,
+    ]
+
+
+def bench_process(url, output_dir, jobs):
+    """每个任务冷启动一次 yt-dlp"""
+    command = build_process_command()
+    latencies = []
+    for index in range(jobs):
+        started = time.perf_counter()
+        result = subprocess.run(command + build_job_args(url, output_dir, index), capture_output=True)
+        latencies.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            print(f"  进程模式任务 {index} 失败: {result.stderr.decode(errors='replace').strip()[-200:]}")
+    return latencies
+
+
+def bench_pool(url, output_dir, jobs, workers):
+    """worker 预热完成后，逐个提交任务并测量提交到完成的延迟"""
+    finished = {}
+    done = threading.Event()
+
+    def on_event(event):
+        if event[0] == "finished":
+            finished[event[1]] = (time.perf_counter(), event[2])
+            done.set()
+
+    pool = worker_pool.WorkerPool(
+        workers,
+        plugin_archives=worker_pool.find_plugin_archives(Path(__file__).parent / "bin"),
+        on_event=on_event,
+    )
+
+    # 预热：首个任务包含 worker 冷启动，单独统计
+    warmup_started = time.perf_counter()
+    pool.submit("warmup", build_job_args(url, output_dir, "warmup"), output_dir)
+    done.wait(timeout=120)
+    warmup = time.perf_counter() - warmup_started
+
+    latencies = []
+    for index in range(jobs):
+        done.clear()
+        task_id = f"job-{index}"
+        started = time.perf_counter()
+        pool.submit(task_id, build_job_args(url, output_dir, index), output_dir)
+        done.wait(timeout=120)
+        end, exit_code = finished.get(task_id, (time.perf_counter(), -1))
+        latencies.append(end - started)
+        if exit_code != 0:
+            print(f"  进程池任务 {index} 失败，退出码 {exit_code}")
+
+    pool.shutdown()
+    return warmup, latencies
+
+
+def report(name, latencies):
+    print(
+        f"{name:<14} 平均 {mean(latencies) * 1000:8.1f} ms   "
+        f"中位数 {median(latencies) * 1000:8.1f} ms   "
+        f"最大 {max(latencies) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yt-dlp 执行后端延迟对比")
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--url", help="要下载的链接，默认使用本地 file:// 样例")
+    options = parser.parse_args()
+
+    if not worker_pool.is_available():
+        print("当前环境无法导入 yt_dlp，请先 pip install yt-dlp")
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="ytdlp-bench-")
+    try:
+        url = options.url
+        if not url:
+            sample = Path(work_dir) / "sample.mp4"
+            sample.write_bytes(os.urandom(256 * 1024))
+            url = sample.as_uri()
+
+        print("=" * 60)
+        print(f"任务数: {options.jobs}  worker 数: {options.workers}")
+        print(f"链接: {url}")
+        print("=" * 60)
+
+        report("独立进程", bench_process(url, work_dir, options.jobs))
+        warmup, pool_latencies = bench_pool(url, work_dir, options.jobs, options.workers)
+        print(f"{'进程池预热':<14} {warmup * 1000:8.1f} ms（仅首次）")
+        report("worker 进程池", pool_latencies)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+基准测试：任务日志文件的索引、按页读取与筛选
+
+把生成的 yt-dlp 输出（也可用 --log 指定录制的日志）写入 LogSpool，测量：
+- 日志窗口后台分段建立索引的总耗时和单段最长耗时；
+- 滚动时随机读取一屏（约 40 行）的耗时；
+- 按级别、按正则筛选全部日志的耗时。
+
+原来的日志窗口打开时在界面线程把每条日志逐条 append 到 QTextEdit；现在建立索引和
+筛选都在后台线程进行，界面线程只处理每段的行号数组和可见的几十行。
+
+用法：
+    python bench_log_spool.py
+    python bench_log_spool.py --videos 500 --chunk 20000
+"""
+
+import argparse
+import logging
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.log_spool import LogSpool, scan_index
+from bench_samples import generate_ytdlp_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务日志文件的索引与筛选耗时")
+    parser.add_argument("--log", help="录制的 yt-dlp 输出文件（UTF-8 文本）")
+    parser.add_argument("--videos", type=int, default=200, help="生成样例的视频数，默认 200")
+    parser.add_argument("--chunk", type=int, default=20000, help="每段建立索引的行数，默认 20000")
+    options = parser.parse_args()
+
+    if options.log:
+        text = Path(options.log).read_text(encoding="utf-8", errors="replace")
+    else:
+        text = generate_ytdlp_log(videos=options.videos)
+
+    with tempfile.TemporaryDirectory() as directory:
+        spool = LogSpool(directory)
+        started = time.perf_counter()
+        for line in text.splitlines():
+            spool.append_raw("Task-1", line)
+        write_elapsed = time.perf_counter() - started
+        spool.finish("Task-1")
+
+        reader = spool.reader("Task-1")
+        longest = 0.0
+        started = time.perf_counter()
+        while True:
+            chunk_started = time.perf_counter()
+            offsets, levels, end = scan_index(reader.path, reader.end, options.chunk)
+            longest = max(longest, time.perf_counter() - chunk_started)
+            if not offsets:
+                break
+            reader.extend(offsets, levels, end)
+        index_elapsed = time.perf_counter() - started
+
+        rng = random.Random(0)
+        screens = [rng.randrange(max(1, len(reader) - 40)) for _ in range(200)]
+        started = time.perf_counter()
+        for first in screens:
+            for number in range(first, min(first + 40, len(reader))):
+                reader.line(number)
+        screen_elapsed = (time.perf_counter() - started) / len(screens)
+
+        searches = {
+            "警告及以上": (None, logging.WARNING),
+            "正则 Merger|ERROR": (re.compile("Merger|ERROR"), 0),
+            "正则 merger|error（忽略大小写）": (re.compile("merger|error", re.IGNORECASE), 0),
+            "正则 进度 100%": (re.compile(r"100(\.0)?%"), 0),
+        }
+        size = reader.end / 1024 / 1024
+        print("=" * 60)
+        print(f"行数: {len(reader)}  文件: {size:.1f} MiB  段大小: {options.chunk}")
+        print("=" * 60)
+        print(f"写入（逐行 append_raw）   {write_elapsed * 1000:10.1f} ms")
+        print(f"建立索引（全部）          {index_elapsed * 1000:10.1f} ms")
+        print(f"建立索引（单段最长）      {longest * 1000:10.1f} ms")
+        print(f"随机读取一屏 40 行        {screen_elapsed * 1000:10.3f} ms")
+        for name, (pattern, min_level) in searches.items():
+            started = time.perf_counter()
+            matches = reader.search(pattern, min_level)
+            elapsed = time.perf_counter() - started
+            print(f"筛选 {name:<24} {elapsed * 1000:8.1f} ms   匹配 {len(matches)} 行")
+        spool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+基准测试：同步写日志 vs 队列 + 后台线程写日志
+
+模拟多个下载并行时的日志压力：若干 I/O 线程按固定速率写日志（播放列表的 stderr 行、
+下载器的调试信息），同时主线程（界面线程）执行一批日志调用（平台识别、标题提取等
+DEBUG 日志）。比较主线程花在日志调用上的总时间和单次调用的分位数。
+
+- 同步：原来的配置，根 logger 直接挂 FileHandler 和控制台 StreamHandler，
+  每次调用都在调用线程里格式化、加锁并写盘，和 I/O 线程争用同一把锁；
+- 队列：core/app_logging.py 的配置，调用线程只把记录放进队列，
+  由 QueueListener 的后台线程写 RotatingFileHandler 和控制台。
+
+控制台输出在测试期间重定向到空设备。
+
+用法：
+    python bench_logging.py
+    python bench_logging.py --threads 16 --calls 20000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import app_logging
+from bench_samples import generate_ytdlp_log
+
+
+def setup_sync(log_file):
+    """原来 Config.setup_logging 的做法"""
+    formatter = logging.Formatter(app_logging.LOG_FORMAT, datefmt=app_logging.DATE_FORMAT)
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    for handler in (logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler()):
+        handler.setLevel(logging.DEBUG)
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+
+
+def teardown():
+    app_logging.stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def io_thread(lines, rate, stop):
+    """模拟 I/O 线程：每 10ms 一批，每秒约 rate 行，直到主线程结束"""
+    logger = logging.getLogger("gui.playlist_window")
+    batch = max(1, rate // 100)
+    position = 0
+    while not stop.is_set():
+        for _ in range(batch):
+            logger.error(f"下载错误: {lines[position % len(lines)]}")
+            position += 1
+        stop.wait(0.01)
+
+
+def run(mode, options, lines):
+    log_file = os.path.join(tempfile.mkdtemp(prefix="bench-"), "debug.log")
+    if mode == "同步":
+        setup_sync(log_file)
+    else:
+        app_logging.setup_logging(log_file, max_mb=options.max_mb)
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=io_thread, args=(lines[i::options.threads], options.rate, stop), daemon=True)
+        for i in range(options.threads)
+    ]
+    for thread in threads:
+        thread.start()
+
+    platform_logger = logging.getLogger("core.platform_index")
+    downloader_logger = logging.getLogger("core.downloader")
+    durations = []
+    started = time.perf_counter()
+    for i in range(options.calls):
+        call_started = time.perf_counter()
+        if i % 2:
+            platform_logger.debug(f"检测到平台: youtube (主机: www.youtube.com) #{i}")
+        else:
+            downloader_logger.debug(f"从输出中提取到标题: 测试视频 {i}")
+        durations.append(time.perf_counter() - call_started)
+    total = time.perf_counter() - started
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    teardown()
+    durations.sort()
+    return total, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步日志与队列日志的主线程耗时对比")
+    parser.add_argument("--threads", type=int, default=8, help="并行写日志的 I/O 线程数，默认 8")
+    parser.add_argument("--rate", type=int, default=2000, help="每个 I/O 线程每秒写的行数，默认 2000")
+    parser.add_argument("--calls", type=int, default=10000, help="主线程日志调用次数，默认 10000")
+    parser.add_argument("--max-mb", type=float, default=10, help="队列模式日志轮转大小，默认 10")
+    options = parser.parse_args()
+
+    lines = generate_ytdlp_log(videos=20).splitlines()
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w", encoding="utf-8")
+    try:
+        results = {mode: run(mode, options, lines) for mode in ("同步", "队列")}
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    print("=" * 72)
+    print(f"I/O 线程: {options.threads} × {options.rate} 行/秒  主线程调用: {options.calls}")
+    print("=" * 72)
+    print(f"{'方式':<6} {'总耗时 ms':>10} {'中位数 µs':>10} {'p99 µs':>10} {'最大 ms':>10}")
+    for mode, (total, durations) in results.items():
+        p99 = durations[int(len(durations) * 0.99)]
+        print(f"{mode:<6} {total * 1000:>10.1f} {statistics.median(durations) * 1e6:>10.1f} "
+              f"{p99 * 1e6:>10.1f} {durations[-1] * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
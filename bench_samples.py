@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+基准测试共用的 yt-dlp 输出样例
+
+没有录制日志时，用这里生成的输出近似一次真实下载：
+extractor 信息、带中文标题的 Destination、大量进度刷新行、合并与警告等。
+各 bench_*.py 也都接受 --log 参数直接回放录制的真实日志。
+"""
+
+import random
+
+TITLES = [
+    "Vlog：本格的な練習に向けて徐々に体を戻していく1週間Vlog",
+    "【官方MV】夜空中最亮的星 - 逃跑计划",
+    "小红书博主的一日三餐记录",
+    "Python 并发编程完全指南",
+    "뉴진스 NewJeans 'Super Shy' Official MV",
+    "A Very Long English Title About Performance Engineering In Practice",
+]
+
+
+def generate_ytdlp_log(videos=20, progress_lines=300, seed=0, verbose=True):
+    """生成一段近似 yt-dlp 下载播放列表时的输出文本；verbose 时带上 --verbose 的 [debug] 行"""
+    rng = random.Random(seed)
+    lines = [
+        "[debug] Command-line config: ['--verbose', '--newline', 'https://www.youtube.com/playlist?list=PLx']",
+        "[debug] Encodings: locale cp936, fs utf-8, pref cp936, out utf-8, error utf-8, screen utf-8",
+        "[debug] yt-dlp version stable@2025.01.15 from yt-dlp/yt-dlp [c8541f8b1] (win_exe)",
+        "[debug] Python 3.10.11 (CPython AMD64 64bit) - Windows-10-10.0.19045-SP0 (OpenSSL 1.1.1t  7 Feb 2023)",
+        "[debug] exe versions: ffmpeg 7.1-full_build-www.gyan.dev (setts), ffprobe 7.1-full_build-www.gyan.dev",
+        "[debug] Optional libraries: Cryptodome-3.21.0, brotli-1.1.0, certifi-2024.12.14, curl_cffi-0.5.10, mutagen-1.47.0, requests-2.32.3, sqlite3-3.40.1, urllib3-2.3.0, websockets-14.1",
+        "[debug] Proxy map: {}",
+        "[debug] Request Handlers: urllib, requests, websockets, curl_cffi",
+        "[debug] Plugin directories: ['C:\\yt-dlp-gui\\bin\\yt_dlp_plugins']",
+        "[debug] Loaded 1837 extractors",
+    ] if verbose else []
+    lines.extend([
+        "[youtube:tab] Extracting URL: https://www.youtube.com/playlist?list=PLx",
+        f"[youtube:tab] Playlist 测试列表: Downloading {videos} items of {videos}",
+    ])
+    for index in range(1, videos + 1):
+        video_id = "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJ0123456789_-") for _ in range(11))
+        # 默认输出模板 "%(title)s [%(id)s].%(ext)s"
+        title = f"{rng.choice(TITLES)} [{video_id}]"
+        size = rng.uniform(5, 500)
+        lines.extend([
+            f"[download] Downloading item {index} of {videos}",
+            f"[youtube] Extracting URL: https://www.youtube.com/watch?v={video_id}",
+            f"[youtube] {video_id}: Downloading webpage",
+            f"[youtube] {video_id}: Downloading tv client config",
+            f"[youtube] {video_id}: Downloading m3u8 information",
+        ])
+        if verbose:
+            lines.extend([
+                f"[debug] [youtube] {video_id}: Loading youtube-nsig.3d3ba064 from cache",
+                "[debug] [youtube] Decrypted nsig GZzEnMqsHc6W0BeHMy => 7cXq2aE8ZvIxQw",
+                "[debug] [youtube] Signature timestamp: 20117",
+                "[debug] Sort order given by extractor: quality, res, fps, hdr:12, source, vcodec, channels, acodec, lang, proto",
+                "[debug] Formats sorted by: hasvid, ie_pref, quality, res, fps, hdr:12(7), source, vcodec, channels, acodec, "
+                "lang, proto, size, br, asr, vext, aext, hasaud, id",
+                "[debug] Default format spec: bestvideo*+bestaudio/best",
+            ])
+        lines.append(f"[info] {video_id}: Downloading 1 format(s): 137+140")
+        if verbose:
+            lines.append(
+                f"[debug] Invoking http downloader on \"https://rr3---sn-oguelnzz.googlevideo.com/videoplayback?"
+                f"expire=1737000000&ei=abc&ip=1.2.3.4&id=o-{video_id}&itag=137&source=youtube&requiressl=yes\""
+            )
+        lines.append(f"[download] Destination: {title}.f137.mp4")
+        for step in range(progress_lines):
+            percent = min(100.0, (step + 1) * 100.0 / progress_lines)
+            lines.append(
+                f"[download] {percent:5.1f}% of {size:7.2f}MiB at {rng.uniform(0.5, 12):6.2f}MiB/s ETA 00:{rng.randint(0, 59):02d}"
+                + (f" (frag {step}/{progress_lines})" if index % 3 == 0 else "")
+            )
+        lines.extend([
+            f"[download] Destination: {title}.f140.m4a",
+            f"[download] 100% of {size / 10:6.2f}MiB in 00:00:03 at 1.20MiB/s",
+            f"[Merger] Merging formats into \"{title}.mp4\"",
+        ])
+        if verbose:
+            lines.append(
+                f"[debug] ffmpeg command line: ffmpeg -y -loglevel repeat+info -i \"file:{title}.f137.mp4\" "
+                f"-i \"file:{title}.f140.m4a\" -c copy -map 0:v:0 -map 1:a:0 -movflags +faststart \"file:{title}.temp.mp4\""
+            )
+        lines.append(f"Deleting original file {title}.f137.mp4 (pass -k to keep)")
+        if index % 5 == 0:
+            lines.append(f"WARNING: [youtube] {video_id}: nsig extraction failed: You may experience throttling")
+    return "\n".join(lines) + "\n"
+
+
+def split_streams(text):
+    """按 yt-dlp 的输出方式拆成 (stdout 行, stderr 行)：[debug]、警告和错误写到 stderr"""
+    stdout, stderr = [], []
+    for line in text.splitlines():
+        (stderr if line.startswith(("[debug]", "WARNING:", "ERROR:")) else stdout).append(line)
+    return stdout, stderr
+
+
+def split_chunks(data, seed=0, min_size=1, max_size=4096):
+    """按管道读取的方式把数据切成随机大小的块，可能切开多字节字符"""
+    rng = random.Random(seed)
+    chunks = []
+    position = 0
+    while position < len(data):
+        size = rng.randint(min_size, max_size)
+        chunks.append(data[position:position + size])
+        position += size
+    return chunks
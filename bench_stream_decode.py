@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+基准测试：逐块试解码 vs 增量解码器
+
+对同一段输出（默认为生成的样例，也可用 --log 指定录制的日志文件）按随机大小切块，
+分别用旧的“UTF-8 → CP949 → GB18030 → replace”逐块试解码和 StreamDecoder 解码，
+比较耗时以及解码结果与原文不一致的行数。
+
+用法：
+    python bench_stream_decode.py
+    python bench_stream_decode.py --log recorded.log --encoding gb18030
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.process_stream import StreamDecoder
+from bench_samples import generate_ytdlp_log, split_chunks
+
+
+def legacy_decode(raw):
+    """旧实现：每块依次尝试多种编码"""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        try:
+            return raw.decode('cp949')
+        except UnicodeDecodeError:
+            try:
+                return raw.decode('gb18030')
+            except UnicodeDecodeError:
+                return raw.decode('utf-8', errors='replace')
+
+
+def decode_with_stream_decoder(chunks, preferred_encoding):
+    decoder = StreamDecoder(preferred_encoding=preferred_encoding)
+    parts = [decoder.decode(chunk) for chunk in chunks]
+    parts.append(decoder.flush())
+    return "".join(parts), decoder.encoding
+
+
+def count_mismatched_lines(expected, actual):
+    expected_lines = expected.splitlines()
+    actual_lines = actual.splitlines()
+    mismatched = sum(1 for a, b in zip(expected_lines, actual_lines) if a != b)
+    return mismatched + abs(len(expected_lines) - len(actual_lines))
+
+
+def timed(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="输出解码方式对比")
+    parser.add_argument("--log", help="录制的 yt-dlp 输出文件（原始字节）")
+    parser.add_argument("--encoding", default="utf-8", help="生成样例时使用的编码，默认 utf-8")
+    parser.add_argument("--max-chunk", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    if options.log:
+        raw = Path(options.log).read_bytes()
+        expected = raw.decode(options.encoding, errors="replace")
+    else:
+        expected = generate_ytdlp_log()
+        raw = expected.encode(options.encoding)
+
+    chunks = split_chunks(raw, max_size=options.max_chunk)
+
+    legacy_time, legacy_text = timed(lambda: "".join(legacy_decode(chunk) for chunk in chunks), options.repeat)
+    # 模拟中文 Windows：控制台输出非 UTF-8 时，系统首选编码就是这个编码
+    preferred = None if options.encoding.lower().replace("-", "") == "utf8" else options.encoding
+    stream_time, (stream_text, detected) = timed(
+        lambda: decode_with_stream_decoder(chunks, preferred), options.repeat
+    )
+
+    print("=" * 60)
+    print(f"数据量: {len(raw) / 1024:.1f} KiB  块数: {len(chunks)}  编码: {options.encoding}")
+    print("=" * 60)
+    print(f"逐块试解码   {legacy_time * 1000:8.2f} ms   不一致行数: {count_mismatched_lines(expected, legacy_text)}")
+    print(f"增量解码器   {stream_time * 1000:8.2f} ms   不一致行数: {count_mismatched_lines(expected, stream_text)}"
+          f"   检测编码: {detected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+基准测试：播放列表输出逐条规则扫描 vs 按行首前缀分发
+
+把同一段输出（默认为生成的样例，也可用 --log 指定录制的日志文件）按批送入
+旧的 _track_line（每行依次 re.search 和子串查找，再单独扫一遍进度行）和
+现在按前缀分发的 _track_lines，比较每秒处理的行数，并核对两者得到的
+item_states、总条目数和界面更新是否完全一致。
+
+--verbosity 时改为对比默认输出和 --verbose 输出：按 yt-dlp 的方式把 [debug]、
+警告和错误行分到 stderr，经 _parse_output_lines 完整处理（含写入调试日志文件），
+比较输出量、日志文件大小和耗时。
+
+用法：
+    python bench_track_line.py
+    python bench_track_line.py --log recorded.log --batch 64
+    python bench_track_line.py --verbosity --progress-lines 30
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import progress_protocol
+from core.process_stream import MarkerMatcher, TailBuffer
+from gui.playlist_window import PlaylistWindow
+from bench_samples import generate_ytdlp_log, split_streams
+
+
+def legacy_track_line(self, line, is_error=False):
+    """旧实现（原样保留）"""
+    self._sync_tracker.feed(line)
+    event = progress_protocol.parse_record(line)
+    if event is not None:
+        self._track_protocol_event(event)
+        return
+
+    extracting_match = re.search(
+        r'\[youtube\]\s+Extracting URL:\s+https?://[^\s]+[?&]v=([A-Za-z0-9_-]{10,20})',
+        line
+    )
+    if extracting_match:
+        video_id = extracting_match.group(1)
+        self.current_item_id = video_id
+        state = self._ensure_item_state(video_id)
+        if state and not state["stage"]:
+            state["stage"] = "download"
+
+    info_match = re.search(r'^\[info\]\s+([A-Za-z0-9_-]{10,20}):', line)
+    if info_match:
+        video_id = info_match.group(1)
+        self.current_item_id = video_id
+        state = self._ensure_item_state(video_id)
+        if state and not state["stage"]:
+            state["stage"] = "download"
+
+    youtube_step_match = re.search(r'^\[youtube\]\s+([A-Za-z0-9_-]{10,20}):', line)
+    if youtube_step_match:
+        video_id = youtube_step_match.group(1)
+        self.current_item_id = video_id
+        state = self._ensure_item_state(video_id)
+        if state and not state["stage"]:
+            state["stage"] = "download"
+
+    item_match = re.search(r'\[download\] Downloading item (\d+) of (\d+|N/A)', line)
+    if item_match:
+        _, total = item_match.groups()
+        try:
+            self.total_items_expected = max(self.total_items_expected, int(total))
+        except ValueError:
+            pass
+        self._finalize_pending_for_item(self.current_item_id, switched_to_next=True)
+        self.current_item_id = None
+        self.current_merging_id = None
+        return
+
+    if '[download] Destination: ' in line:
+        path_text = line.split('[download] Destination: ', 1)[-1].strip()
+        video_id = self._extract_video_id(path_text)
+        title = self._extract_display_title(path_text)
+        if video_id:
+            self.current_item_id = video_id
+            state = self._ensure_item_state(video_id, title)
+            if state:
+                state["stage"] = "download"
+        return
+
+    if '[Merger] Merging formats into ' in line:
+        merged_path = line.split('[Merger] Merging formats into ', 1)[-1].strip().strip('"')
+        video_id = self._extract_video_id(merged_path) or self.current_item_id
+        if video_id:
+            self.current_merging_id = video_id
+            state = self._ensure_item_state(video_id, self._extract_display_title(merged_path))
+            if state:
+                state["seen_merger"] = True
+                state["stage"] = "merge"
+        return
+
+    if line.startswith('Deleting original file '):
+        video_id = self._extract_video_id(line)
+        if video_id:
+            self._mark_item_completed(video_id, merged=True)
+            if self.current_merging_id == video_id:
+                self.current_merging_id = None
+        return
+
+    if 'has already been downloaded and merged' in line:
+        video_id = self._extract_video_id(line) or self.current_item_id
+        if video_id:
+            self._mark_item_completed(video_id, merged=True)
+        return
+
+    if 'Retrying (10/10)' in line:
+        video_id = self.current_item_id
+        if video_id:
+            self._mark_retry_exhausted_pending(video_id, line)
+        return
+
+    if 'Giving up after 10 retries' in line:
+        video_id = self.current_item_id
+        if video_id:
+            self._mark_item_failed(video_id, "retries_exhausted", line, "download")
+        return
+
+    lower = line.lower()
+    if is_error or 'error:' in lower:
+        target_id = self.current_merging_id or self.current_item_id
+        if not target_id:
+            return
+
+        if any(key in lower for key in ['ffmpeg', 'merger', 'postprocess', 'conversion failed']):
+            self._mark_item_failed(target_id, "merge_failed", line, "merge")
+        elif any(key in lower for key in ['unable to download', 'video unavailable']):
+            self._mark_item_failed(target_id, "download_failed", line, "download")
+        elif 'error:' in lower:
+            self._mark_item_failed(target_id, "download_failed", line, "download")
+
+
+def legacy_parse_lines(self, lines):
+    """旧的 _parse_stdout_lines 中与状态有关的部分：先逐行跟踪，再单独扫一遍 [download] 行"""
+    for line in lines:
+        legacy_track_line(self, line)
+    for line in lines:
+        if '[download]' not in line:
+            continue
+        if '[download] Destination: ' in line:
+            filename = line.split('[download] Destination: ')[-1].strip()
+            if any(filename.endswith(ext) for ext in ['.mp4', '.webm', '.mkv']):
+                self._post_ui("filename", f"正在下载: {filename}")
+        elif 'Downloading item' in line:
+            match = re.search(r'\[download\] Downloading item (\d+) of (\d+|N/A)', line)
+            if match:
+                current, total = match.groups()
+                if total.isdigit():
+                    self._post_ui("total_progress", f"正在下载第 {current} 个视频，共 {total} 个")
+                else:
+                    self._post_ui("total_progress", f"正在下载第 {current} 个视频")
+        elif '%' in line and 'of' in line:
+            self._saw_download_progress = True
+            progress_match = re.search(
+                r'\[download\]\s+([\d.]+)%\s+of\s+~?\s*([\d.]+\S+)\s+at\s+([\d.]+\S+)\s+ETA\s+(\S+)',
+                line
+            )
+            if progress_match:
+                percent = progress_match.group(1) + '%'
+                size = progress_match.group(2)
+                speed = progress_match.group(3)
+                self._post_ui("status", f"单个视频下载进度: {percent}  大小: {size}  速度: {speed}")
+
+
+def new_window():
+    """只创建解析用到的状态，不创建界面"""
+    window = PlaylistWindow.__new__(PlaylistWindow)
+    window._last_process_output = TailBuffer()
+    window._last_process_error = TailBuffer()
+    window._retry_markers = MarkerMatcher(PlaylistWindow._YOUTUBE_RETRY_ERROR_MARKERS)
+    window._ui_updates = None
+    window._saw_download_progress = False
+    window._line_dispatcher = window._build_line_dispatcher()
+    window._reset_download_tracking()
+    return window
+
+
+def replay(parse, batches):
+    window = new_window()
+    window._ui_updates = []
+    started = time.perf_counter()
+    for batch in batches:
+        parse(window, batch)
+    elapsed = time.perf_counter() - started
+    return elapsed, window
+
+
+def snapshot(window):
+    return window.item_states, window.total_items_expected, window._saw_download_progress, window._ui_updates
+
+
+def stream_batches(text, batch):
+    """按原顺序把连续的同一条流的行分批，模拟 I/O 线程交给解析函数的批次"""
+    stdout, stderr = split_streams(text)
+    stderr_lines = set(stderr)
+    batches = []
+    for line in text.splitlines():
+        is_error = line in stderr_lines
+        if batches and batches[-1][1] == is_error and len(batches[-1][0]) < batch:
+            batches[-1][0].append(line)
+        else:
+            batches.append(([line], is_error))
+    return batches
+
+
+def compare_verbosity(options):
+    """默认输出与 --verbose 输出的处理开销对比"""
+    log_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "debug.log")
+    handler = logging.FileHandler(log_path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+    print("=" * 72)
+    print(f"{'档位':<6} {'行数':>8} {'stderr 行':>10} {'输出 KiB':>10} {'日志 KiB':>10} {'耗时 ms':>10}")
+    print("=" * 72)
+    for name, verbose in (("默认", False), ("调试", True)):
+        text = generate_ytdlp_log(videos=50, progress_lines=options.progress_lines, verbose=verbose)
+        batches = stream_batches(text, options.batch)
+        best = float("inf")
+        log_size = 0
+        for _ in range(options.repeat):
+            handler.stream.truncate(0)
+            handler.stream.seek(0)
+            window = new_window()
+            started = time.perf_counter()
+            for lines, is_error in batches:
+                window._parse_output_lines(lines, is_error)
+            handler.flush()
+            best = min(best, time.perf_counter() - started)
+            log_size = os.path.getsize(log_path)
+        stderr_count = sum(len(lines) for lines, is_error in batches if is_error)
+        print(f"{name:<6} {len(text.splitlines()):>8} {stderr_count:>10} "
+              f"{len(text.encode('utf-8')) / 1024:>10.1f} {log_size / 1024:>10.1f} {best * 1000:>10.2f}")
+
+    root.removeHandler(handler)
+    handler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="播放列表输出解析方式对比")
+    parser.add_argument("--log", help="录制的 yt-dlp 输出文件（UTF-8 文本）")
+    parser.add_argument("--batch", type=int, default=64, help="每批行数，默认 64")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--verbosity", action="store_true", help="对比默认输出与 --verbose 输出的处理开销")
+    parser.add_argument("--progress-lines", type=int, default=300, help="--verbosity 时每个视频的进度行数，默认 300")
+    options = parser.parse_args()
+
+    if options.verbosity:
+        compare_verbosity(options)
+        return
+
+    if options.log:
+        text = Path(options.log).read_text(encoding="utf-8", errors="replace")
+    else:
+        text = generate_ytdlp_log(videos=50)
+    lines = text.splitlines()
+    batches = [lines[i:i + options.batch] for i in range(0, len(lines), options.batch)]
+
+    runs = {"逐条规则扫描": legacy_parse_lines, "按前缀分发": PlaylistWindow._track_lines}
+    results = {}
+    for name, parse in runs.items():
+        best = float("inf")
+        for _ in range(options.repeat):
+            elapsed, window = replay(parse, batches)
+            best = min(best, elapsed)
+        results[name] = (best, snapshot(window))
+
+    baseline = results["逐条规则扫描"][1]
+    print("=" * 60)
+    print(f"行数: {len(lines)}  批大小: {options.batch}  条目数: {len(baseline[0])}")
+    print("=" * 60)
+    for name, (elapsed, state) in results.items():
+        same = "一致" if state == baseline else "不一致"
+        print(f"{name:<8} {elapsed * 1000:8.2f} ms   {len(lines) / elapsed:12,.0f} 行/秒   结果: {same}")
+
+
+if __name__ == "__main__":
+    main()
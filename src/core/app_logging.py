@@ -0,0 +1,71 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_MAX_MB = 10
+DEFAULT_BACKUP_COUNT = 3
+
+_listener = None
+
+
+def setup_logging(log_file, levels=None, max_mb=DEFAULT_MAX_MB, backup_count=DEFAULT_BACKUP_COUNT):
+    """配置整个程序的日志，只在第一次调用时安装处理器，之后的调用只更新各模块级别。
+
+    调用方（界面线程、I/O 线程）只把记录放进队列，由 QueueListener 的后台线程写
+    debug.log（按大小轮转）和控制台。levels 为 {logger 名: 级别}，"" 表示根 logger，
+    如 {"": "DEBUG", "core.platform_index": "INFO"}。
+    """
+    global _listener
+    apply_levels(levels)
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(max_mb * 1024 * 1024),
+        backupCount=backup_count,
+        encoding='utf-8',
+    )
+    file_handler.setFormatter(formatter)
+    handlers = [file_handler]
+    # 打包成窗口程序时没有控制台
+    if sys.stderr is not None:
+        console = logging.StreamHandler()
+        console.setFormatter(formatter)
+        handlers.append(console)
+
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def apply_levels(levels=None):
+    """设置各 logger 的级别；未指定时根 logger 为 DEBUG"""
+    levels = dict(levels or {})
+    levels.setdefault("", "DEBUG")
+    for name, level in levels.items():
+        if isinstance(level, str):
+            level = level.upper()
+        try:
+            logging.getLogger(name or None).setLevel(level)
+        except (TypeError, ValueError):
+            logging.warning(f"无效的日志级别: {name or '根'} = {level}")
+
+
+def stop_logging():
+    """停止后台写入线程，写完队列中剩余的记录"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
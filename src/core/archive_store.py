@@ -0,0 +1,206 @@
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from .info_cache import key_from_url
+
+# 导出文件中重复行、空行超过该比例时在启动时整理
+_COMPACT_RATIO = 1.2
+
+
+def archive_id(extractor_key, video_id) -> str:
+    """与 yt-dlp --download-archive 的记录格式一致：提取器小写 + 空格 + 视频ID"""
+    return f"{extractor_key.lower()} {video_id}"
+
+
+def archive_id_from_url(url):
+    """不经提取直接从链接得出下载记录；无法识别时返回 None"""
+    key = key_from_url(url)
+    return archive_id(*key) if key else None
+
+
+def _normalize(line):
+    parts = line.split()
+    if len(parts) != 2:
+        return None
+    return archive_id(parts[0], parts[1])
+
+
+class ArchiveStore:
+    """下载记录（已下载过的视频）的 SQLite 存储。
+
+    启动时把全部记录读入内存集合，查询不访问磁盘；写入用 INSERT OR IGNORE，
+    多个进程（同时打开的多个程序实例）可以同时写，其他实例写入的记录在下次
+    查询前按 rowid 增量读取。
+    yt-dlp 仍然读写文本格式的 --download-archive：export_text 在记录有变化时
+    重写文本文件，ingest_text 从上次读到的位置读取 yt-dlp 追加的记录。
+    """
+
+    def __init__(self, database, export_path=None, legacy_paths=()):
+        self.database = Path(database)
+        self.export_path = Path(export_path) if export_path else None
+        self._lock = threading.Lock()
+        self.database.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.database), timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS archive (entry TEXT PRIMARY KEY)")
+        # 文本文件已读取到的字节位置
+        self._connection.execute("CREATE TABLE IF NOT EXISTS text_offsets (path TEXT PRIMARY KEY, offset INTEGER)")
+        self._connection.commit()
+        self._entries = set()
+        self._max_rowid = 0
+        self._refresh()
+        # 启动后第一次导出总是重写，保证文本文件与数据库一致
+        self._dirty = True
+
+        lines = self.ingest_text(self.export_path) if self.export_path is not None else 0
+        for path in map(Path, legacy_paths):
+            if path.exists():
+                lines += self._migrate(path)
+        if self.export_path is not None and lines > len(self._entries) * _COMPACT_RATIO:
+            self.compact()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entry):
+        return entry in self._entries
+
+    def contains_url(self, url) -> bool:
+        entry = archive_id_from_url(url)
+        return entry is not None and entry in self._entries
+
+    def filter_urls(self, urls):
+        """去掉已下载过的链接，返回 (保留的链接, 已下载过的链接)；只查内存，不启动进程"""
+        with self._lock:
+            self._refresh()
+        kept = []
+        skipped = []
+        for url in urls:
+            (skipped if self.contains_url(url) else kept).append(url)
+        return kept, skipped
+
+    def add(self, extractor_key, video_id):
+        self.add_entries([archive_id(extractor_key, video_id)])
+
+    def add_entries(self, entries):
+        """写入记录，返回新增的条数"""
+        new = [entry for entry in dict.fromkeys(entries) if entry not in self._entries]
+        if not new:
+            return 0
+        with self._lock:
+            try:
+                self._connection.executemany("INSERT OR IGNORE INTO archive (entry) VALUES (?)", ((entry,) for entry in new))
+                self._connection.commit()
+            except sqlite3.Error as e:
+                logging.error(f"写入下载记录失败: {e}")
+                return 0
+            self._refresh()
+            self._dirty = True
+        return len(new)
+
+    def ingest_text(self, path, complete=False):
+        """读取文本文件中上次读取位置之后的记录（yt-dlp 追加的），返回读到的行数。
+
+        默认只处理以换行结尾的完整行，yt-dlp 可能正在写最后一行；
+        complete 为 True 时（文件不会再被写入）最后一行没有换行也读取。
+        """
+        path = Path(path)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return 0
+        key = os.path.normcase(str(path.resolve()))
+        with self._lock:
+            row = self._connection.execute("SELECT offset FROM text_offsets WHERE path = ?", (key,)).fetchone()
+        offset = row[0] if row else 0
+        if offset > size:
+            offset = 0  # 文件被重写过
+        if offset == size:
+            return 0
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = len(data) if complete else data.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        lines = data[:end].decode("utf-8", errors="replace").splitlines()
+        entries = [entry for entry in map(_normalize, lines) if entry]
+        dirty = self._dirty
+        added = self.add_entries(entries)
+        with self._lock:
+            if self.export_path is not None and path.resolve() == self.export_path.resolve():
+                self._dirty = dirty  # 这些记录本来就在导出文件里，不需要重新导出
+            self._connection.execute(
+                "INSERT OR REPLACE INTO text_offsets (path, offset) VALUES (?, ?)", (key, offset + end)
+            )
+            self._connection.commit()
+        if added:
+            logging.debug(f"从 {path} 读入 {added} 条下载记录")
+        return len(lines)
+
+    def _migrate(self, path):
+        """并入旧的文本记录，之后改名保留，不再作为另一份记录继续使用"""
+        lines = self.ingest_text(path, complete=True)
+        try:
+            path.replace(path.with_name(path.name + ".migrated"))
+            logging.info(f"旧的下载记录 {path} 已并入 {self.database}")
+        except OSError as e:
+            logging.warning(f"旧的下载记录改名失败: {e}")
+        return lines
+
+    def export_text(self, path=None):
+        """记录有变化时重写 yt-dlp 使用的文本文件，返回文件路径"""
+        path = Path(path) if path else self.export_path
+        with self._lock:
+            self._refresh()
+            if not self._dirty and path.exists():
+                return path
+            rows = self._connection.execute("SELECT entry FROM archive ORDER BY rowid").fetchall()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(path.name + ".partial")
+            with open(partial, "w", encoding="utf-8", newline="\n") as f:
+                f.writelines(f"{entry}\n" for (entry,) in rows)
+            os.replace(partial, path)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO text_offsets (path, offset) VALUES (?, ?)",
+                (os.path.normcase(str(path.resolve())), path.stat().st_size),
+            )
+            self._connection.commit()
+            self._dirty = False
+        return path
+
+    def compact(self):
+        """去掉文本文件中的重复行和空行，并整理数据库文件"""
+        self._dirty = True
+        if self.export_path is not None:
+            self.export_text()
+        with self._lock:
+            self._connection.execute("VACUUM")
+        logging.info(f"下载记录已整理，共 {len(self._entries)} 条")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _refresh(self):
+        """增量读取其他连接（包括其他进程）写入的记录；调用方持有锁"""
+        rows = self._connection.execute(
+            "SELECT rowid, entry FROM archive WHERE rowid > ? ORDER BY rowid", (self._max_rowid,)
+        ).fetchall()
+        if rows:
+            self._max_rowid = rows[-1][0]
+            self._entries.update(entry for _, entry in rows)
+
+
+def open_archive(config):
+    """打开程序的下载记录；旧版本的播放列表模式在程序根目录另有一份文本记录，首次打开时并入"""
+    root_dir = Path(__file__).resolve().parent.parent.parent
+    return ArchiveStore(
+        config.config_dir / "archive.sqlite3",
+        export_path=config.archive_file,
+        legacy_paths=[root_dir / "downloaded_videos_list.txt"],
+    )
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+_PROBE_TIMEOUT_SECONDS = 30
+
+# 名称 -> (bin 目录下的文件名, 查询版本的参数)
+DEFAULT_BINARIES = {
+    "yt-dlp": ("yt-dlp.exe", ["--version"]),
+    "ffmpeg": ("ffmpeg.exe", ["-version"]),
+    "deno": ("deno.exe", ["--version"]),
+}
+
+
+class BinaryInfo(NamedTuple):
+    """一次版本探测的结果；size/mtime_ns 用于判断文件是否被替换过"""
+    path: str
+    size: int
+    mtime_ns: int
+    ok: bool
+    version: str
+    error: str
+
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+def _run_version(path, args, env):
+    creationflags = 0
+    startupinfo = None
+    if os.name == "nt":
+        creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        result = subprocess.run(
+            [str(path), *args],
+            env=env,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=_PROBE_TIMEOUT_SECONDS,
+            creationflags=creationflags,
+            startupinfo=startupinfo,
+        )
+    except subprocess.TimeoutExpired:
+        return False, "", f"查询版本超时（>{_PROBE_TIMEOUT_SECONDS} 秒）"
+    except Exception as exc:  # noqa: BLE001
+        return False, "", f"无法执行: {exc}"
+
+    lines = (result.stdout or "").strip().splitlines()
+    version = lines[0].strip() if lines else ""
+    if result.returncode != 0:
+        details = (result.stderr or result.stdout or "").strip().splitlines()
+        return False, version, f"退出码 {result.returncode}" + (f": {details[-1]}" if details else "")
+    return True, version, ""
+
+
+class BinaryRegistry:
+    """bin 目录下外部程序（yt-dlp、ffmpeg、deno）的版本探测缓存。
+
+    启动时在后台线程对每个程序执行一次版本查询，结果按 (路径, 大小, 修改时间)
+    写入磁盘缓存；文件没有变化时下次启动直接沿用，不再启动进程。
+    check 只比较文件状态：与缓存一致时返回缓存结果，文件被替换（例如运行了
+    bin/更新内核.bat）时在后台重新探测，探测完成前按文件存在视为可用。
+    """
+
+    def __init__(self, bin_dir, cache_path, binaries=None, env=None):
+        self.bin_dir = Path(bin_dir)
+        self.cache_path = Path(cache_path)
+        self.binaries = dict(DEFAULT_BINARIES if binaries is None else binaries)
+        self._env = env
+        self._lock = threading.Lock()
+        self._probing = set()
+        self._results = self._load()  # 名称 -> BinaryInfo
+
+    def path(self, name) -> Path:
+        return self.bin_dir / self.binaries[name][0]
+
+    def refresh_async(self):
+        """在后台探测所有文件状态与缓存不一致的程序"""
+        self._schedule([name for name in self.binaries if self._stale(name)])
+
+    def refresh(self):
+        """同步探测所有需要更新的程序（测试和命令行工具使用）"""
+        for name in self.binaries:
+            if self._stale(name):
+                self._probe(name)
+
+    def info(self, name) -> Optional[BinaryInfo]:
+        """返回与当前文件一致的探测结果，没有时返回 None"""
+        key = _stat_key(self.path(name))
+        with self._lock:
+            result = self._results.get(name)
+        if key is None or result is None or result[:3] != key:
+            return None
+        return result
+
+    def check(self, name):
+        """返回 (是否可用, 错误信息)；只做一次 stat，不启动进程"""
+        path = self.path(name)
+        key = _stat_key(path)
+        if key is None:
+            return False, f"未找到 {path}"
+        with self._lock:
+            result = self._results.get(name)
+        if result is not None and result[:3] == key:
+            return result.ok, result.error
+        # 文件是新的或被替换过：后台重新探测，这次先按可用处理，真正的错误由下载进程报告
+        self._schedule([name])
+        return True, ""
+
+    def _stale(self, name):
+        return self.info(name) is None and _stat_key(self.path(name)) is not None
+
+    def _schedule(self, names):
+        with self._lock:
+            names = [name for name in names if name not in self._probing]
+            self._probing.update(names)
+        if names:
+            threading.Thread(target=self._probe_all, args=(names,), name="binary-probe", daemon=True).start()
+
+    def _probe_all(self, names):
+        for name in names:
+            try:
+                self._probe(name)
+            finally:
+                with self._lock:
+                    self._probing.discard(name)
+
+    def _probe(self, name):
+        path = self.path(name)
+        key = _stat_key(path)
+        if key is None:
+            return None
+        ok, version, error = _run_version(path, self.binaries[name][1], self._env)
+        result = BinaryInfo(*key, ok=ok, version=version, error=error)
+        if ok:
+            logging.info(f"{name} 版本: {version}")
+        else:
+            logging.error(f"{name} 检查失败: {error}")
+        with self._lock:
+            self._results[name] = result
+            self._save()
+        return result
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {name: BinaryInfo(**entry) for name, entry in data.items() if name in self.binaries}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _save(self):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            partial = self.cache_path.with_name(self.cache_path.name + ".partial")
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump({name: result._asdict() for name, result in self._results.items()}, f,
+                          ensure_ascii=False, indent=2)
+            os.replace(partial, self.cache_path)
+        except OSError as e:
+            logging.warning(f"保存程序版本缓存失败: {e}")
@@ -0,0 +1,228 @@
+import glob
+import logging
+import os
+import shutil
+import string
+import threading
+
+try:
+    import winreg
+except ImportError:  # 非 Windows 环境（如在 Linux 上跑测试）没有注册表
+    winreg = None
+
+# 标准安装版配置文件目录的匹配顺序
+_PROFILE_PATTERNS = (
+    '*.default-release',  # 最常见
+    '*.default',          # 老版本
+    '*.default-*',        # 其他变体
+)
+_PORTABLE_PATTERNS = (
+    # 标准便携版路径
+    os.path.join('Data', 'profile', 'cookies.sqlite'),
+    # 某些便携版的变体
+    os.path.join('Data', 'Browser', 'profile', 'cookies.sqlite'),
+    os.path.join('FirefoxPortable', 'Data', 'profile', 'cookies.sqlite'),
+    # 用户自定义配置文件夹
+    os.path.join('Data', 'Profiles', '*', 'cookies.sqlite'),
+)
+_PORTABLE_SEARCH_DEPTH = 5
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class BrowserDiscovery:
+    """查找火狐浏览器和 cookies 文件，结果缓存。
+
+    首次查找会遍历配置文件目录（便携版还要向上查找若干层目录）；之后只检查
+    配置文件目录和已找到的 cookies.sqlite 的修改时间，没有变化就直接返回缓存，
+    新建配置文件、换用其他配置文件或删除 cookies 时自动重新查找。
+    多个配置文件都有 cookies 时与 yt-dlp 一致，取最近修改的那个。
+    """
+
+    def __init__(self, appdata=None, search_root=None, registry=winreg):
+        self._appdata = appdata
+        self._search_root = search_root
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._cookies_path = None
+        self._watched = None  # ((路径, 修改时间), ...)，任何一项变化都重新查找
+        self._executable = None
+        self._executable_resolved = False
+
+    def firefox_cookies_path(self):
+        """返回 Firefox 的 cookies.sqlite 路径，找不到时返回 None"""
+        with self._lock:
+            if self._watched is not None and all(_mtime(path) == mtime for path, mtime in self._watched):
+                return self._cookies_path
+
+            cookies_path, watched_paths = self._find_cookies()
+            # 先取修改时间再记录，查找期间的改动会在下次调用时触发重新查找
+            self._watched = tuple((path, _mtime(path)) for path in watched_paths)
+            self._cookies_path = cookies_path
+            return cookies_path
+
+    def firefox_executable(self):
+        """返回 firefox.exe 路径；安装位置很少变化，只查找一次"""
+        with self._lock:
+            if not self._executable_resolved:
+                self._executable = self._find_executable()
+                self._executable_resolved = True
+            return self._executable
+
+    def invalidate(self):
+        with self._lock:
+            self._watched = None
+            self._executable_resolved = False
+
+    def _profiles_dir(self):
+        appdata = self._appdata if self._appdata is not None else os.getenv('APPDATA')
+        if not appdata:
+            return None
+        return os.path.join(appdata, 'Mozilla', 'Firefox', 'Profiles')
+
+    def _find_cookies(self):
+        """返回 (cookies 路径, 需要监视修改时间的路径列表)"""
+        try:
+            # 1. 检查标准安装版的所有可能路径
+            profiles_dir = self._profiles_dir()
+            if profiles_dir:
+                candidates = []
+                for pattern in _PROFILE_PATTERNS:
+                    for profile in glob.glob(os.path.join(profiles_dir, pattern)):
+                        cookies_path = os.path.join(profile, 'cookies.sqlite')
+                        if cookies_path not in candidates and os.path.exists(cookies_path):
+                            candidates.append(cookies_path)
+                watched = [profiles_dir, *candidates]
+                if candidates:
+                    cookies_path = max(candidates, key=lambda path: _mtime(path) or 0)
+                    logging.debug(f"找到Firefox cookies: {cookies_path}")
+                    return cookies_path, watched
+            else:
+                watched = []
+
+            # 2. 检查便携版的可能路径，从当前目录开始向上查找5层
+            current = self._search_root if self._search_root is not None else os.getcwd()
+            for _ in range(_PORTABLE_SEARCH_DEPTH):
+                for pattern in _PORTABLE_PATTERNS:
+                    for match in glob.glob(os.path.join(current, pattern)):
+                        if os.path.exists(match):
+                            logging.debug(f"找到便携版Firefox cookies: {match}")
+                            return match, [*watched, match]
+                current = os.path.dirname(current)
+
+            # 3. 如果找不到，给出明确的错误提示
+            logging.warning("""未找到Firefox cookies文件。可能的原因：
+1. Firefox未安装或未运行过
+2. 未使用Firefox登录过YouTube
+3. 使用了非标准的Firefox安装方式
+4. Firefox配置文件位置不标准""")
+            return None, watched
+
+        except Exception as e:
+            logging.error(f"查找Firefox cookies时出错: {str(e)}")
+            return None, []
+
+    def _find_executable(self):
+        try:
+            # 1. 在 PATH 中查找
+            firefox_path = shutil.which('firefox')
+            if firefox_path:
+                logging.debug(f"在 PATH 中找到火狐: {firefox_path}")
+                return firefox_path
+
+            # 2. 检查注册表的所有可能位置
+            firefox_path = self._find_executable_in_registry()
+            if firefox_path:
+                return firefox_path
+
+            # 3. 搜索所有可能的安装位置
+            search_paths = [
+                os.path.expandvars(r'%ProgramFiles%\Mozilla Firefox\firefox.exe'),
+                os.path.expandvars(r'%ProgramFiles(x86)%\Mozilla Firefox\firefox.exe'),
+                os.path.expandvars(r'%LocalAppData%\Mozilla Firefox\firefox.exe'),
+                os.path.expandvars(r'%ProgramFiles%\Firefox\firefox.exe'),
+                os.path.expandvars(r'%ProgramFiles(x86)%\Firefox\firefox.exe'),
+                r'C:\Program Files\Mozilla Firefox\firefox.exe',
+                r'C:\Program Files (x86)\Mozilla Firefox\firefox.exe'
+            ]
+            if os.name == 'nt':
+                # 添加所有盘符的搜索
+                drives = [f'{d}:' for d in string.ascii_uppercase if os.path.exists(f'{d}:')]
+                for drive in drives:
+                    search_paths.extend([
+                        f'{drive}\\Program Files\\Mozilla Firefox\\firefox.exe',
+                        f'{drive}\\Program Files (x86)\\Mozilla Firefox\\firefox.exe',
+                        f'{drive}\\Firefox\\firefox.exe'
+                    ])
+
+            for path in search_paths:
+                if os.path.exists(path):
+                    logging.debug(f"在路径中找到火狐: {path}")
+                    return path
+
+            # 4. 如果还是找不到，记录错误并返回
+            logging.error("未能找到火狐浏览器，但系统可能已安装")
+            return None
+
+        except Exception as e:
+            logging.error(f"查找火狐浏览器时出错: {str(e)}")
+            return None
+
+    def _find_executable_in_registry(self):
+        registry = self._registry
+        if registry is None:
+            return None
+
+        registry_paths = [
+            (registry.HKEY_LOCAL_MACHINE, r'SOFTWARE\Mozilla\Mozilla Firefox'),
+            (registry.HKEY_LOCAL_MACHINE, r'SOFTWARE\Mozilla\Mozilla Firefox ESR'),
+            (registry.HKEY_LOCAL_MACHINE, r'SOFTWARE\Wow6432Node\Mozilla\Mozilla Firefox'),
+            (registry.HKEY_CURRENT_USER, r'SOFTWARE\Mozilla\Mozilla Firefox'),
+            (registry.HKEY_LOCAL_MACHINE, r'SOFTWARE\Microsoft\Windows\CurrentVersion\App Paths\firefox.exe'),
+            (registry.HKEY_LOCAL_MACHINE, r'SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall\Mozilla Firefox')
+        ]
+        for root_key, sub_key in registry_paths:
+            try:
+                with registry.OpenKey(root_key, sub_key) as key:
+                    path = self._registry_firefox_path(key)
+                    if path:
+                        return path
+            except OSError:
+                continue
+        return None
+
+    def _registry_firefox_path(self, key):
+        registry = self._registry
+        try:
+            path = registry.QueryValue(key, None)
+            if path and os.path.isfile(path):
+                logging.debug(f"从注册表找到火狐: {path}")
+                return path
+            if path and os.path.isdir(path) and os.path.exists(os.path.join(path, 'firefox.exe')):
+                firefox_path = os.path.join(path, 'firefox.exe')
+                logging.debug(f"从注册表找到火狐: {firefox_path}")
+                return firefox_path
+        except OSError:
+            pass
+        # 尝试读取 PathToExe 或 InstallLocation
+        try:
+            path = registry.QueryValueEx(key, 'PathToExe')[0]
+            if os.path.exists(path):
+                logging.debug(f"从注册表 PathToExe 找到火狐: {path}")
+                return path
+        except OSError:
+            pass
+        try:
+            install_dir = registry.QueryValueEx(key, 'InstallLocation')[0]
+            firefox_path = os.path.join(install_dir, 'firefox.exe')
+            if os.path.exists(firefox_path):
+                logging.debug(f"从注册表 InstallLocation 找到火狐: {firefox_path}")
+                return firefox_path
+        except OSError:
+            pass
+        return None
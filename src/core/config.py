@@ -4,6 +4,7 @@ import logging
 from pathlib import Path
 from datetime import datetime
 import sys
+from core import app_logging
 
 class Config:
     def __init__(self):
@@ -22,11 +23,11 @@ class Config:
         self.log_file = self.config_dir / "debug.log"
         self.ensure_config_dir()
         
-        # 初始化日志
-        self.setup_logging()
-        
         self.load_config()
         
+        # 初始化日志（级别和轮转大小来自配置）
+        self.setup_logging()
+        
         # 添加下载记录文件路径
         self.archive_file = self.config_dir / "downloaded_videos_list.txt"
         
@@ -38,38 +39,18 @@ class Config:
         self.config_dir.mkdir(parents=True, exist_ok=True)
         
     def setup_logging(self):
-        """设置日志"""
-        # 创建格式化器
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
+        """设置日志：后台线程写入、按大小轮转、可分模块设置级别（重复创建 Config 时只更新级别）"""
+        app_logging.setup_logging(
+            self.log_file,
+            levels=self.config.get('log_levels'),
+            max_mb=self.config.get('log_max_mb', app_logging.DEFAULT_MAX_MB),
+            backup_count=self.config.get('log_backup_count', app_logging.DEFAULT_BACKUP_COUNT),
         )
         
-        # 设置文件处理器
-        file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        
-        # 设置控制台处理器
-        console = logging.StreamHandler()
-        console.setLevel(logging.DEBUG)
-        console.setFormatter(formatter)
-        
-        # 配置根日志记录器
-        root_logger = logging.getLogger()
-        root_logger.setLevel(logging.DEBUG)
-        
-        # 移除所有现有的处理器
-        for handler in root_logger.handlers[:]:
-            root_logger.removeHandler(handler)
-        
-        # 添加新的处理器
-        root_logger.addHandler(file_handler)
-        root_logger.addHandler(console)
-        
     def log(self, message, level=logging.INFO):
-        """记录日志"""
-        logging.log(level, message)
+        """记录日志；使用调用方模块名的 logger，文件名和行号也记为调用处"""
+        name = sys._getframe(1).f_globals.get('__name__', '')
+        logging.getLogger(name).log(level, message, stacklevel=2)
         
     def load_config(self):
         if self.config_file.exists():
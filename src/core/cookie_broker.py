@@ -0,0 +1,166 @@
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+_HEADER = "# Netscape HTTP Cookie File\n# 由 Firefox cookies.sqlite 导出，请勿手动编辑\n\n"
+# 与 yt-dlp --cookies-from-browser firefox 一致：不读取容器标签页中的 cookies
+_QUERY = ("SELECT host, path, isSecure, expiry, name, value FROM moz_cookies "
+          "WHERE NOT INSTR(originAttributes, 'userContextId=')")
+_LEGACY_QUERY = "SELECT host, path, isSecure, expiry, name, value FROM moz_cookies"
+# 新版 Firefox 的 expiry 以毫秒记录
+_MILLISECOND_EXPIRY = 10 ** 11
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _netscape_line(host, path, secure, expiry, name, value):
+    expiry = int(expiry or 0)
+    if expiry > _MILLISECOND_EXPIRY:
+        expiry //= 1000
+    include_subdomains = "TRUE" if host.startswith(".") else "FALSE"
+    return "\t".join((
+        host, include_subdomains, path or "/", "TRUE" if secure else "FALSE",
+        str(expiry), name, value,
+    )) + "\n"
+
+
+def _open_private(path, mode):
+    """cookies 等同登录凭据，文件只允许当前用户读写"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8", "newline": "\n"}))
+
+
+def export_firefox_cookies(source, destination):
+    """把 cookies.sqlite 导出为 Netscape 格式的 cookies.txt，返回导出的条数。
+
+    火狐运行时数据库可能被锁定且新写入在 -wal 文件中，先把两者复制到临时目录再读；
+    结果先写临时文件再替换，读取方不会看到写了一半的文件。
+    """
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="cookies-") as temp_dir:
+        database = os.path.join(temp_dir, "cookies.sqlite")
+        shutil.copyfile(source, database)
+        if os.path.exists(f"{source}-wal"):
+            shutil.copyfile(f"{source}-wal", f"{database}-wal")
+
+        connection = sqlite3.connect(database)
+        try:
+            try:
+                rows = connection.execute(_QUERY).fetchall()
+            except sqlite3.OperationalError:
+                rows = connection.execute(_LEGACY_QUERY).fetchall()
+        finally:
+            connection.close()
+
+    partial = destination.with_name(destination.name + ".partial")
+    with _open_private(partial, "w") as f:
+        f.write(_HEADER)
+        f.writelines(_netscape_line(*row) for row in rows)
+    os.replace(partial, destination)
+    return len(rows)
+
+
+class CookieBroker:
+    """浏览器 cookies 的共享导出。
+
+    火狐的 cookies.sqlite 只导出一次为 cookies.txt，源数据库（含 -wal）的修改时间
+    或大小变化时才重新导出；每个 yt-dlp 进程用 --cookies 读取。yt-dlp 退出时会
+    直接覆盖写回 --cookies 指定的文件，多个进程共用同一文件会互相截断，所以每个
+    进程拿到的是导出文件的一份副本，进程结束后由 release 删除。
+    导出失败时保持原来的 --cookies-from-browser 参数。
+    """
+
+    SUPPORTED_BROWSERS = ("firefox",)
+
+    def __init__(self, directory, discovery):
+        self.directory = Path(directory)
+        self.jars_dir = self.directory / "jars"
+        self._discovery = discovery  # BrowserDiscovery
+        # 探测进程和下载任务都会取用，导出需互斥
+        self._lock = threading.Lock()
+        self._exports = {}  # 浏览器 -> (源数据库, 导出时的源文件标记)
+        self._jars = {}  # 使用者 -> 副本路径
+        # 上次异常退出残留的副本
+        shutil.rmtree(self.jars_dir, ignore_errors=True)
+
+    def export_path(self, browser):
+        """返回最新的导出文件路径，不支持该浏览器或导出失败时返回 None"""
+        with self._lock:
+            return self._export(browser)
+
+    def _export(self, browser):
+        if browser not in self.SUPPORTED_BROWSERS:
+            return None
+        source = self._discovery.firefox_cookies_path()
+        if not source:
+            return None
+        stamp = (_stamp(source), _stamp(f"{source}-wal"))
+        destination = self.directory / f"{browser}.txt"
+        if self._exports.get(browser) == (source, stamp) and destination.exists():
+            return destination
+        try:
+            count = export_firefox_cookies(source, destination)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"导出 {browser} cookies 失败，改为由 yt-dlp 直接读取浏览器: {e}")
+            self._exports.pop(browser, None)
+            return None
+        logging.debug(f"已导出 {browser} cookies {count} 条: {destination}")
+        self._exports[browser] = (source, stamp)
+        return destination
+
+    def rewrite_args(self, args, owner):
+        """把参数中的 --cookies-from-browser <浏览器> 换成 --cookies <owner 专用副本>"""
+        try:
+            index = args.index("--cookies-from-browser")
+        except ValueError:
+            return args
+        if index + 1 >= len(args):
+            return args
+        jar = self.acquire(owner, args[index + 1])
+        if jar is None:
+            return args
+        return [*args[:index], "--cookies", jar, *args[index + 2:]]
+
+    def acquire(self, owner, browser):
+        """复制一份导出文件给 owner 独占使用，返回副本路径；再次调用会用最新导出覆盖"""
+        jar = self.jars_dir / f"{owner}.txt"
+        # 复制期间不能重新导出，Windows 上替换正被读取的文件会失败
+        with self._lock:
+            source = self._export(browser)
+            if source is None:
+                return None
+            try:
+                self.jars_dir.mkdir(parents=True, exist_ok=True)
+                with _open_private(jar, "wb") as f:
+                    f.write(source.read_bytes())
+            except OSError as e:
+                logging.warning(f"复制 cookies 失败: {e}")
+                return None
+            self._jars[owner] = jar
+        return str(jar)
+
+    def release(self, owner):
+        with self._lock:
+            jar = self._jars.pop(owner, None)
+        if jar is not None:
+            try:
+                jar.unlink()
+            except OSError:
+                pass
+
+    def release_all(self):
+        with self._lock:
+            owners = list(self._jars)
+        for owner in owners:
+            self.release(owner)
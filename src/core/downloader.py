@@ -3,30 +3,408 @@ import shlex
 import sys
 import os
 import logging
+import re
 from .config import Config
+from .archive_store import open_archive
+from .binary_registry import BinaryRegistry
+from .browser_discovery import BrowserDiscovery
+from .cookie_broker import CookieBroker
+from .format_probe import FormatProbe
+from . import log_dispatch, progress_protocol, verbosity, worker_pool
+from .info_cache import InfoCache, key_from_url
+from .io_engine import ProcessExited, ProcessIOEngine
+from .log_dispatch import LineDispatcher
+from .metadata_probe import DEFAULT_BATCH_SIZE, DEFAULT_MAX_CONCURRENT, MetadataProbe
+from .platform_index import PlatformIndex
+from .url_canonical import XIAOHONGSHU_PROFILE_PATTERN, XIAOHONGSHU_USER_VIDEO_PATTERN
+from .progress_protocol import format_eta, format_size
+from .process_stream import LineFramer, MarkerMatcher, StreamDecoder, TailBuffer
 from pathlib import Path
-import winreg  # 添加这行到文件顶部
-import glob
+import heapq
+import itertools
+from typing import NamedTuple
 from PyQt6.QtWidgets import QMessageBox
 
+
+# 这些输出说明 YouTube 初始化（PO Token、播放器脚本）失败，首次失败时值得自动重试
+YOUTUBE_RETRY_ERROR_MARKERS = (
+    "po token",
+    "bgutil",
+    "requested format is not available",
+    "failed to check script version",
+    "timeoutexpired",
+    "timed out",
+    "script-deno",
+    "gvs po token",
+    "generate_once.ts",
+)
+# 格式不可用说明拿到的信息本身不完整，重试时不复用缓存
+FORMAT_UNAVAILABLE_MARKER = "requested format is not available"
+
+
+class DownloadScheduler(QObject):
+    """有界、带优先级的下载任务调度器。
+
+    同时受全局并发上限和平台并发上限约束；优先级高的任务先启动，
+    同优先级按预估代价（默认 0，可由 update_cost 设置）从小到大，再按提交顺序先进先出。
+    """
+    job_state_changed = pyqtSignal(str, str)  # task_id, state
+
+    STATE_QUEUED = "queued"
+    STATE_RUNNING = "running"
+    STATE_DONE = "done"
+
+    def __init__(self, max_concurrent=3, platform_limits=None, parent=None):
+        super().__init__(parent)
+        self.max_concurrent = max(1, int(max_concurrent or 1))
+        self.platform_limits = {
+            platform: int(limit)
+            for platform, limit in (platform_limits or {}).items()
+            if limit
+        }
+        self._queues = {}            # platform -> [(-priority, cost, seq, task_id)]
+        self._queued_platform = {}   # task_id -> platform（排队中）
+        self._launchers = {}         # task_id -> 启动回调
+        self._running = {}           # task_id -> platform
+        self._running_per_platform = {}
+        self._seq = itertools.count()
+
+    def submit(self, task_id, platform, launch, priority=0):
+        """提交任务；launch 为无参回调，返回 True 表示已成功启动。"""
+        heapq.heappush(
+            self._queues.setdefault(platform, []),
+            (-int(priority), 0, next(self._seq), task_id),
+        )
+        self._queued_platform[task_id] = platform
+        self._launchers[task_id] = launch
+        self.job_state_changed.emit(task_id, self.STATE_QUEUED)
+        self._dispatch()
+
+    def finish(self, task_id):
+        """任务结束（成功/失败/取消）后释放名额并继续派发。"""
+        platform = self._running.pop(task_id, None)
+        if platform is None:
+            return
+        self._running_per_platform[platform] -= 1
+        self.job_state_changed.emit(task_id, self.STATE_DONE)
+        self._dispatch()
+
+    def cancel_pending(self):
+        """清空排队中的任务，返回被取消的任务ID列表。"""
+        cancelled = [
+            entry[-1]
+            for queue in self._queues.values()
+            for entry in sorted(queue)
+        ]
+        self._queues.clear()
+        self._queued_platform.clear()
+        self._launchers.clear()
+        for task_id in cancelled:
+            self.job_state_changed.emit(task_id, self.STATE_DONE)
+        return cancelled
+
+    def update_cost(self, task_id, cost):
+        """更新排队任务的预估代价（如预计下载字节数），返回任务是否仍在排队"""
+        queue = self._queues.get(self._queued_platform.get(task_id))
+        if not queue:
+            return False
+        for index, entry in enumerate(queue):
+            if entry[-1] == task_id:
+                queue[index] = (entry[0], cost, entry[2], task_id)
+                heapq.heapify(queue)
+                return True
+        return False
+
+    def set_max_concurrent(self, max_concurrent):
+        """调整全局并发上限，调大时立即派发排队任务。"""
+        self.max_concurrent = max(1, int(max_concurrent or 1))
+        self._dispatch()
+
+    def pending_count(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def running_count(self):
+        return len(self._running)
+
+    def is_queued(self, task_id):
+        return task_id in self._queued_platform
+
+    def has_work(self):
+        return bool(self._running) or self.pending_count() > 0
+
+    def _platform_has_slot(self, platform):
+        limit = self.platform_limits.get(platform)
+        return limit is None or self._running_per_platform.get(platform, 0) < limit
+
+    def _next_entry(self):
+        """在仍有平台名额的队列头部中挑出优先级最高、最早提交的任务。"""
+        best_platform = None
+        for platform, queue in self._queues.items():
+            if not queue or not self._platform_has_slot(platform):
+                continue
+            if best_platform is None or queue[0] < self._queues[best_platform][0]:
+                best_platform = platform
+        if best_platform is None:
+            return None, None
+        return best_platform, heapq.heappop(self._queues[best_platform])
+
+    def _dispatch(self):
+        while len(self._running) < self.max_concurrent:
+            platform, entry = self._next_entry()
+            if entry is None:
+                return
+            task_id = entry[-1]
+            self._queued_platform.pop(task_id, None)
+            launch = self._launchers.pop(task_id, None)
+            if launch is None:
+                continue
+
+            self._running[task_id] = platform
+            self._running_per_platform[platform] = self._running_per_platform.get(platform, 0) + 1
+            self.job_state_changed.emit(task_id, self.STATE_RUNNING)
+
+            try:
+                started = launch()
+            except Exception as e:
+                logging.error(f"启动排队任务 {task_id} 失败: {str(e)}")
+                started = False
+            if not started:
+                # 启动失败时回调方已发出失败信号，这里只负责释放名额
+                self._running.pop(task_id, None)
+                self._running_per_platform[platform] -= 1
+                self.job_state_changed.emit(task_id, self.STATE_DONE)
+
+
+class TaskOutput(NamedTuple):
+    task_id: str
+    message: str
+
+
+class TaskTitle(NamedTuple):
+    task_id: str
+    title: str
+
+
+class DownloadJob:
+    """单个下载任务的运行状态，与具体执行后端无关"""
+
+    def __init__(self, task_id, url, platform, output_path, args):
+        self.task_id = task_id
+        self.url = url
+        self.platform = platform
+        self.output_path = output_path
+        self.base_args = args  # 组装好的完整命令，URL 在最后
+        self.args = args       # 实际启动的命令，命中信息缓存时 URL 换成 --load-info-json
+        self.info_key = None   # 信息缓存的 (提取器, 视频ID)
+        self.title = "未知视频"
+        self.title_set = False
+        self.filepath = None  # 结构化模式下由 yt-dlp 直接给出的最终文件路径
+        self.retry_count = 0
+        self.saw_download_progress = False
+        self.cancel_requested = False
+        # 每条流一个增量解码器，编码检测结果在任务内共享
+        self.stdout_decoder, self.stderr_decoder = StreamDecoder.pair()
+        # 按流切行，只保留尾部若干行用于错误分类，长时间下载内存也不会增长
+        self.stdout_framer = LineFramer()
+        self.stderr_framer = LineFramer()
+        self.stdout_tail = TailBuffer()
+        self.stderr_tail = TailBuffer()
+        # 重试判断用的标记在输出流过时即记下，不受尾部缓冲长度限制
+        self.retry_markers = MarkerMatcher(YOUTUBE_RETRY_ERROR_MARKERS)
+        self.backend = None
+        self.handle = None  # 后端私有句柄（如 QProcess）
+        # 在 I/O 线程解析输出时，界面消息先收集到这里，随批次交回界面线程
+        self.pending_events = None
+
+    def reset_output(self):
+        """重试前清空输出状态"""
+        self.stdout_decoder.reset()
+        self.stderr_decoder.reset()
+        self.stdout_framer.reset()
+        self.stderr_framer.reset()
+        self.stdout_tail.clear()
+        self.stderr_tail.clear()
+        self.retry_markers.clear()
+
+
+class ProcessIOBackend(QObject):
+    """默认执行后端：每个任务单独启动一次 yt-dlp.exe。
+
+    子进程由后台 I/O 线程管理，读取、解码和解析都不占用界面线程，
+    界面线程只按批次接收解析好的事件。
+    """
+    name = "process"
+    _batch_ready = pyqtSignal(object)
+
+    def __init__(self, downloader):
+        super().__init__(downloader)
+        self.downloader = downloader
+        self._jobs = {}
+        # on_batch 在 I/O 线程调用，经信号排队回到界面线程处理
+        self._batch_ready.connect(self._handle_batch)
+        self._engine = ProcessIOEngine(on_batch=self._batch_ready.emit)
+
+    def start(self, job):
+        self._jobs[job.task_id] = job
+        self._engine.spawn(
+            job.task_id,
+            job.args,
+            job.output_path,
+            self.downloader.process_environment(),
+            lambda lines, is_error: self.downloader._parse_output_lines(job, lines, is_error),
+            decoders=(job.stdout_decoder, job.stderr_decoder),
+        )
+
+    def cancel(self, job):
+        self._engine.kill(job.task_id)
+
+    def shutdown(self):
+        self._engine.shutdown()
+
+    def _handle_batch(self, events):
+        for event in events:
+            if isinstance(event, ProcessExited):
+                job = self._jobs.pop(event.key, None)
+                if job is not None:
+                    self.downloader._job_finished(job, event.exit_code)
+            else:
+                self.downloader._deliver_event(event)
+
+
+class QProcessBackend:
+    """旧执行后端：在界面线程里用 QProcess 读取和解析输出，保留作回退"""
+    name = "qprocess"
+
+    def __init__(self, downloader):
+        self.downloader = downloader
+
+    def start(self, job):
+        process = self._create_download_process(job)
+        job.handle = process
+        process.start(job.args[0], job.args[1:])
+
+    def cancel(self, job):
+        process = job.handle
+        if process is not None and process.state() == QProcess.ProcessState.Running:
+            process.kill()  # 强制结束进程
+
+    def shutdown(self):
+        pass
+
+    def _create_download_process(self, job):
+        """创建并配置下载进程，便于失败后原参数重试。"""
+        process = QProcess()
+        process.setProcessEnvironment(self.downloader.env)
+        process.setWorkingDirectory(job.output_path)
+
+        def handle_stdout():
+            data = process.readAllStandardOutput()
+            self._forward_output(job, data, is_error=False)
+
+        def handle_stderr():
+            data = process.readAllStandardError()
+            self._forward_output(job, data, is_error=True)
+
+        def handle_finished(exit_code, exit_status):
+            # 获取剩余输出后再交给下载器收尾
+            self._forward_output(job, process.readAllStandardOutput(), is_error=False)
+            self._forward_output(job, process.readAllStandardError(), is_error=True)
+            self._forward_text(job, job.stdout_decoder.flush(), is_error=False)
+            self._forward_text(job, job.stderr_decoder.flush(), is_error=True)
+            if job.handle is process:
+                job.handle = None
+            process.deleteLater()
+            self.downloader._job_finished(job, exit_code)
+
+        process.readyReadStandardOutput.connect(handle_stdout)
+        process.readyReadStandardError.connect(handle_stderr)
+        process.finished.connect(handle_finished)
+        return process
+
+    def _forward_output(self, job, data, is_error):
+        decoder = job.stderr_decoder if is_error else job.stdout_decoder
+        self._forward_text(job, decoder.decode(data.data()), is_error)
+
+    def _forward_text(self, job, text, is_error):
+        if text:
+            self.downloader._handle_process_output(job, text, is_error=is_error)
+
+
+class WorkerPoolBackend(QObject):
+    """常驻 worker 进程池后端：yt-dlp 以库形式运行，省去每个任务的冷启动"""
+    name = "worker_pool"
+    _event_received = pyqtSignal(object)
+
+    def __init__(self, downloader, pool_size, plugin_archives):
+        super().__init__(downloader)
+        self.downloader = downloader
+        self._jobs = {}
+        # 事件来自后台监听线程，经信号排队回到界面线程处理
+        self._event_received.connect(self._handle_event)
+        self._pool = worker_pool.WorkerPool(
+            pool_size,
+            plugin_archives=plugin_archives,
+            on_event=self._event_received.emit,
+        )
+
+    def start(self, job):
+        self._jobs[job.task_id] = job
+        self._pool.submit(job.task_id, job.args[1:], job.output_path)
+
+    def cancel(self, job):
+        self._pool.cancel(job.task_id)
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+    def _handle_event(self, event):
+        kind, task_id = event[0], event[1]
+        job = self._jobs.get(task_id)
+        if job is None:
+            return
+
+        if kind == "log":
+            # logger 每次给出的是不带换行的整行消息
+            self.downloader._handle_process_output(job, event[2] + "\n", is_error=event[3])
+        elif kind == "progress":
+            self.downloader._handle_progress_hook(job, event[2])
+        elif kind == "postprocess":
+            self.downloader._handle_postprocess(job, event[2].get("status"), event[2].get("postprocessor"))
+        elif kind == "finished":
+            self._jobs.pop(task_id, None)
+            self.downloader._job_finished(job, event[2])
+
+
 class Downloader(QObject):
     # 修改信号，添加任务ID
     output_received = pyqtSignal(str, str)  # task_id, message
     download_finished = pyqtSignal(bool, str, str, str)  # success, message, title, task_id
     title_updated = pyqtSignal(str, str)  # task_id, title
+    task_state_changed = pyqtSignal(str, str)  # task_id, queued/running/done
+    metadata_received = pyqtSignal(str, object)  # task_id, VideoMetadata
+    formats_received = pyqtSignal(str, object)  # url, FormatTable（失败时为 None）
     
-    def __init__(self):
+    def __init__(self, config=None):
         super().__init__()
-        self.processes = []
+        self.jobs = {}  # task_id -> DownloadJob（运行中的任务）
         self.task_count = 0
+        # 文本输出按行首前缀分发（没有结构化记录时的回退解析）
+        self._line_dispatcher = LineDispatcher({
+            log_dispatch.DESTINATION: self._on_destination_line,
+            log_dispatch.PROGRESS: self._on_progress_line,
+            log_dispatch.MERGING: self._on_merging_line,
+            log_dispatch.ALREADY_MERGED: self._on_already_merged_line,
+            log_dispatch.ALREADY_DOWNLOADED: self._on_already_downloaded_line,
+        })
         
         # 获取二进制文件路径
         self.bin_dir = Path(__file__).parent.parent.parent / "bin"
         self.ytdlp_path = self.bin_dir / "yt-dlp.exe"
         self.ffmpeg_path = self.bin_dir / "ffmpeg.exe"
         
+        # 与主窗口共用同一个 Config：save_config() 写出整个字典，两个实例会互相覆盖对方的修改
+        self.config = config if config is not None else Config()
         # 记录启动日志
-        self.config = Config()
         self.config.log(f"二进制文件目录: {self.bin_dir}", logging.DEBUG)
         self.config.log(f"yt-dlp路径: {self.ytdlp_path}", logging.DEBUG)
         self.config.log(f"ffmpeg路径: {self.ffmpeg_path}", logging.DEBUG)
@@ -40,6 +418,13 @@ class Downloader(QObject):
         # 设置环境变量
         self.env = QProcessEnvironment.systemEnvironment()
         self.env.insert("PATH", str(self.bin_dir) + os.pathsep + os.environ.get("PATH", ""))
+
+        # 外部程序版本探测：启动时在后台查询一次，结果按文件大小和修改时间缓存，
+        # 之后每个任务只比较文件状态，不再先启动一次 yt-dlp --version
+        self.binary_registry = BinaryRegistry(
+            self.bin_dir, self.config.config_dir / "binaries.json", env=self.process_environment()
+        )
+        self.binary_registry.refresh_async()
         
         # bgutil PO Token 脚本路径（SABR 协议需要 PO Token 才能获取具体分辨率）
         self.pot_server_home = self.bin_dir / "bgutil-ytdlp-pot-provider" / "server"
@@ -54,7 +439,8 @@ class Downloader(QObject):
                     '--extractor-args',
                     f'youtubepot-bgutilscript:server_home={self.pot_server_home}'
                 ],
-                'default_format': None  # 使用用户选择的格式
+                'default_format': None,  # 使用用户选择的格式
+                'max_concurrent': 3  # 同时运行的任务上限，避免触发限流
             },
             'xiaohongshu': {
                 'domains': ['xiaohongshu.com', 'xhslink.com'],
@@ -65,6 +451,7 @@ class Downloader(QObject):
                 ],
                 'default_format': 'best[ext=mp4]/best',  # 优先选择mp4格式，否则选择最好的
                 'user_profile_support': False,  # 当前版本不支持用户主页批量下载
+                'max_concurrent': 2,
                 'supported_patterns': [
                     '/explore/',           # 标准视频链接
                     '/discovery/item/',    # 发现页面视频
@@ -76,7 +463,8 @@ class Downloader(QObject):
                 'require_cookies': False,
                 'default_browser': None,
                 'special_args': [],
-                'default_format': 'best[ext=mp4]/best'  # B站也优先mp4
+                'default_format': 'best[ext=mp4]/best',  # B站也优先mp4
+                'max_concurrent': 3
             },
             'douyin': {
                 'domains': ['douyin.com', 'iesdouyin.com'],
@@ -85,63 +473,121 @@ class Downloader(QObject):
                 'special_args': [
                     '--user-agent', 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15'
                 ],
-                'default_format': 'best[ext=mp4]/best'  # 抖音也优先mp4
+                'default_format': 'best[ext=mp4]/best',  # 抖音也优先mp4
+                'max_concurrent': 2
             }
         }
 
-    _YOUTUBE_RETRY_ERROR_MARKERS = (
-        "po token",
-        "bgutil",
-        "requested format is not available",
-        "failed to check script version",
-        "timeoutexpired",
-        "timed out",
-        "script-deno",
-        "gvs po token",
-        "generate_once.ts",
-    )
+        # 平台识别索引：按主机名后缀查找，结果按主机名缓存
+        self.platform_index = PlatformIndex(
+            {platform: platform_config['domains'] for platform, platform_config in self.platform_configs.items()}
+        )
+
+        # 火狐与 cookies 文件的查找结果缓存，每次下载前检查只需比较修改时间
+        self.browser_discovery = BrowserDiscovery()
+
+        # 下载调度器：粘贴大量链接时按并发上限排队启动，而不是一次性拉起全部进程
+        self.scheduler = DownloadScheduler(
+            max_concurrent=self.config.config.get(
+                'max_concurrent_downloads', self.DEFAULT_MAX_CONCURRENT_DOWNLOADS
+            ),
+            platform_limits={
+                platform: platform_config.get('max_concurrent')
+                for platform, platform_config in self.platform_configs.items()
+            },
+            parent=self,
+        )
+        self.scheduler.job_state_changed.connect(self.task_state_changed)
+
+        # 执行后端：默认每任务一个进程（后台线程读取）；可在配置中切换为常驻 worker 进程池
+        self.backends = {
+            ProcessIOBackend.name: ProcessIOBackend(self),
+            QProcessBackend.name: QProcessBackend(self),
+        }
+        self.engine = self.config.config.get('download_engine', ProcessIOBackend.name)
+        if self.engine == WorkerPoolBackend.name:
+            if worker_pool.is_available():
+                self.backends[WorkerPoolBackend.name] = WorkerPoolBackend(
+                    self,
+                    pool_size=self.config.config.get('worker_pool_size', self.scheduler.max_concurrent),
+                    plugin_archives=worker_pool.find_plugin_archives(self.bin_dir),
+                )
+            else:
+                self.config.log("未找到可导入的 yt_dlp 模块，worker 进程池不可用，改用独立进程模式", logging.WARNING)
+                self.engine = ProcessIOBackend.name
+        elif self.engine not in self.backends:
+            self.config.log(f"未知的下载执行方式 {self.engine}，改用独立进程模式", logging.WARNING)
+            self.engine = ProcessIOBackend.name
+
+        # 结构化进度：让 yt-dlp 按约定模板输出进度/标题/路径记录，不再依赖文本正则
+        self.structured_progress = bool(self.config.config.get('structured_progress', False))
+
+        # 视频信息缓存：重试或再次下载同一视频时用 --load-info-json 跳过网页、播放器和 PO Token 解析
+        self.info_cache = None
+        if self.config.config.get('info_cache', True):
+            self.info_cache = InfoCache(
+                self.config.config_dir / "info_cache",
+                max_bytes=int(self.config.config.get('info_cache_max_mb', 200)) * 1024 * 1024,
+            )
+            self.info_cache.evict()
+
+        # 下载记录：主窗口和播放列表窗口共用，播放列表下载时导出为 yt-dlp 的 --download-archive 文本
+        self.archive = open_archive(self.config)
+
+        # 浏览器 cookies 只导出一次供所有任务读取，每个进程用各自的副本，避免退出时写回互相覆盖
+        self.cookie_broker = None
+        if self.config.config.get('cookie_export', True):
+            self.cookie_broker = CookieBroker(self.config.config_dir / "cookies", self.browser_discovery)
+
+        # 元数据预取：任务排队时先批量 -J 探测标题、时长和大小，界面立即显示标题；
+        # 开启 order_by_size 后同优先级的排队任务按预估大小从小到大启动
+        self.task_metadata = {}  # task_id -> VideoMetadata
+        self.order_by_size = bool(self.config.config.get('order_by_size', False))
+        self.metadata_probe = None
+        if self.config.config.get('metadata_probe', True):
+            self.metadata_probe = MetadataProbe(
+                self.process_environment,
+                batch_size=self.config.config.get('metadata_probe_batch_size', DEFAULT_BATCH_SIZE),
+                max_concurrent=self.config.config.get('metadata_probe_concurrency', DEFAULT_MAX_CONCURRENT),
+                info_cache=self.info_cache,
+                cookie_broker=self.cookie_broker,
+                parent=self,
+            )
+            self.metadata_probe.metadata_ready.connect(self._handle_metadata)
+
+        # 格式探测：输入框里只有一个链接时在后台获取真实存在的格式，界面据此调整画质选项
+        self.format_probe = None
+        if self.config.config.get('format_probe', True):
+            self.format_probe = FormatProbe(
+                self.process_environment,
+                info_cache=self.info_cache,
+                cookie_broker=self.cookie_broker,
+                parent=self,
+            )
+            self.format_probe.formats_ready.connect(self.formats_received)
+
     _MAX_YOUTUBE_RECOVERY_RETRIES = 2
+    DEFAULT_MAX_CONCURRENT_DOWNLOADS = 3
         
     def reset_state(self):
         """重置下载器状态"""
         self.task_count = 0
         # 取消所有正在进行的下载
         self.cancel_download()
-        # 清理进程列表
-        self.processes.clear()
+        # 清理任务列表
+        self.jobs.clear()
         
     def detect_platform(self, url):
         """检测URL所属的视频平台"""
-        import urllib.parse as urlparse
-        
-        try:
-            parsed_url = urlparse.urlparse(url.lower())
-            domain = parsed_url.netloc.replace('www.', '').replace('m.', '')
-            
-            # 检查每个平台的域名
-            for platform, config in self.platform_configs.items():
-                for platform_domain in config['domains']:
-                    if platform_domain in domain:
-                        self.config.log(f"检测到平台: {platform} (URL: {url})", logging.DEBUG)
-                        return platform
-            
-            # 如果没有匹配到已知平台，默认使用通用配置
-            self.config.log(f"未识别的平台，使用通用配置 (URL: {url})", logging.DEBUG)
-            return 'generic'
-            
-        except Exception as e:
-            self.config.log(f"URL解析错误: {str(e)}", logging.ERROR)
-            return 'generic'
+        return self.platform_index.classify(url)
     
     def normalize_xiaohongshu_url(self, url):
         """将小红书用户视频URL规范化为标准格式"""
         try:
-            import re
             import urllib.parse as urlparse
             
             # 检查是否为用户视频URL格式: /user/profile/{user_id}/{video_id}
-            user_video_pattern = r'/user/profile/[a-fA-F0-9]+/([a-fA-F0-9]+)'
-            match = re.search(user_video_pattern, url)
+            match = XIAOHONGSHU_USER_VIDEO_PATTERN.search(url)
             
             if match:
                 video_id = match.group(1)
@@ -168,11 +614,9 @@ class Downloader(QObject):
         """检测是否为用户主页/个人资料URL（不是具体视频）"""
         try:
             if platform == 'xiaohongshu':
-                import re
                 # 匹配用户主页格式：/user/profile/{user_id} (结尾没有视频ID)
                 # 具体视频格式：/user/profile/{user_id}/{video_id} (有视频ID，应该支持下载)
-                pattern = r'/user/profile/[a-fA-F0-9]+/?(\?|$)'
-                if re.search(pattern, url):
+                if XIAOHONGSHU_PROFILE_PATTERN.search(url):
                     # 是纯用户主页，没有具体视频ID
                     return True
                 else:
@@ -201,95 +645,8 @@ class Downloader(QObject):
             }
         
     def _get_firefox_path_from_registry(self):
-        """查找火狐浏览器的安装路径"""
-        try:
-            # 1. 使用 where 命令查找
-            try:
-                import subprocess
-                result = subprocess.run(['where', 'firefox'], capture_output=True, text=True)
-                if result.returncode == 0:
-                    firefox_path = result.stdout.strip().split('\n')[0]
-                    if os.path.exists(firefox_path):
-                        self.config.log(f"通过 where 命令找到火狐: {firefox_path}", logging.DEBUG)
-                        return firefox_path
-            except Exception as e:
-                self.config.log(f"where 命令查找失败: {str(e)}", logging.DEBUG)
-
-            # 2. 检查注册表的所有可能位置
-            registry_paths = [
-                (winreg.HKEY_LOCAL_MACHINE, r'SOFTWARE\Mozilla\Mozilla Firefox'),
-                (winreg.HKEY_LOCAL_MACHINE, r'SOFTWARE\Mozilla\Mozilla Firefox ESR'),
-                (winreg.HKEY_LOCAL_MACHINE, r'SOFTWARE\Wow6432Node\Mozilla\Mozilla Firefox'),
-                (winreg.HKEY_CURRENT_USER, r'SOFTWARE\Mozilla\Mozilla Firefox'),
-                (winreg.HKEY_LOCAL_MACHINE, r'SOFTWARE\Microsoft\Windows\CurrentVersion\App Paths\firefox.exe'),
-                (winreg.HKEY_LOCAL_MACHINE, r'SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall\Mozilla Firefox')
-            ]
-            
-            for root_key, sub_key in registry_paths:
-                try:
-                    with winreg.OpenKey(root_key, sub_key) as key:
-                        try:
-                            path = winreg.QueryValue(key, None)
-                            if path and os.path.exists(path):
-                                if os.path.isfile(path):
-                                    self.config.log(f"从注册表找到火狐: {path}", logging.DEBUG)
-                                    return path
-                                elif os.path.isdir(path) and os.path.exists(os.path.join(path, 'firefox.exe')):
-                                    firefox_path = os.path.join(path, 'firefox.exe')
-                                    self.config.log(f"从注册表找到火狐: {firefox_path}", logging.DEBUG)
-                                    return firefox_path
-                        except:
-                            # 尝试读取 PathToExe 或 InstallLocation
-                            try:
-                                path = winreg.QueryValueEx(key, 'PathToExe')[0]
-                                if os.path.exists(path):
-                                    self.config.log(f"从注册表 PathToExe 找到火狐: {path}", logging.DEBUG)
-                                    return path
-                            except:
-                                try:
-                                    install_dir = winreg.QueryValueEx(key, 'InstallLocation')[0]
-                                    firefox_path = os.path.join(install_dir, 'firefox.exe')
-                                    if os.path.exists(firefox_path):
-                                        self.config.log(f"从注册表 InstallLocation 找到火狐: {firefox_path}", logging.DEBUG)
-                                        return firefox_path
-                                except:
-                                    pass
-                except WindowsError:
-                    continue
-
-            # 3. 搜索所有可能的安装位置
-            search_paths = [
-                os.path.expandvars(r'%ProgramFiles%\Mozilla Firefox\firefox.exe'),
-                os.path.expandvars(r'%ProgramFiles(x86)%\Mozilla Firefox\firefox.exe'),
-                os.path.expandvars(r'%LocalAppData%\Mozilla Firefox\firefox.exe'),
-                os.path.expandvars(r'%ProgramFiles%\Firefox\firefox.exe'),
-                os.path.expandvars(r'%ProgramFiles(x86)%\Firefox\firefox.exe'),
-                r'C:\Program Files\Mozilla Firefox\firefox.exe',
-                r'C:\Program Files (x86)\Mozilla Firefox\firefox.exe'
-            ]
-            
-            # 添加所有盘符的搜索
-            import string
-            drives = [f'{d}:' for d in string.ascii_uppercase if os.path.exists(f'{d}:')]
-            for drive in drives:
-                search_paths.extend([
-                    f'{drive}\\Program Files\\Mozilla Firefox\\firefox.exe',
-                    f'{drive}\\Program Files (x86)\\Mozilla Firefox\\firefox.exe',
-                    f'{drive}\\Firefox\\firefox.exe'
-                ])
-
-            for path in search_paths:
-                if os.path.exists(path):
-                    self.config.log(f"在路径中找到火狐: {path}", logging.DEBUG)
-                    return path
-
-            # 4. 如果还是找不到，记录错误并返回
-            self.config.log("未能找到火狐浏览器，但系统可能已安装", logging.ERROR)
-            return None
-
-        except Exception as e:
-            self.config.log(f"查找火狐浏览器时出错: {str(e)}", logging.ERROR)
-            return None
+        """查找火狐浏览器的安装路径（首次查找后缓存）"""
+        return self.browser_discovery.firefox_executable()
 
     def _check_browser_available(self, browser):
         """检查浏览器是否可用"""
@@ -339,8 +696,8 @@ class Downloader(QObject):
         new_env.insert("PATH", str(self.bin_dir) + os.pathsep + os.environ.get("PATH", ""))
         self.env = new_env
 
-    def start_download(self, url, output_path, format_options, browser):
-        """开始下载"""
+    def start_download(self, url, output_path, format_options, browser, priority=0):
+        """校验参数并把下载任务提交给调度器，实际启动由调度器按并发上限决定"""
         try:
             # 检测平台并获取配置
             platform = self.detect_platform(url)
@@ -403,10 +760,11 @@ class Downloader(QObject):
                 "--progress",
                 "--no-overwrites",
                 "--ffmpeg-location", str(self.ffmpeg_path),
-                "--verbose",
                 "--no-restrict-filenames",  # 添加这个参数,允许文件名包含特殊字符
                 "--encoding", "utf-8"        # 强制使用 UTF-8 编码
             ]
+            if self.structured_progress:
+                args.extend(progress_protocol.build_args())
 
             # 添加平台特殊参数
             if platform_config['special_args']:
@@ -461,20 +819,36 @@ class Downloader(QObject):
             output_template = os.path.join(output_path, "%(title)s.%(ext)s")
             args.extend(["-o", output_template])
 
+            # 提取到的视频信息写入缓存目录，播放列表本身的信息不写
+            if self.info_cache is not None:
+                args.extend([
+                    "--write-info-json",
+                    "--no-write-playlist-metafiles",
+                    "-o", f"infojson:{self.info_cache.incoming_template()}",
+                ])
+
             # 添加URL
             args.append(url)
+
+            # 勾选了“调试日志”或重试失败的任务时输出 yt-dlp 调试信息
+            if format_options.get('capture_debug'):
+                args = verbosity.with_debug(args, 1)
+                self.config.log(f"任务 {task_id} 输出调试日志", logging.DEBUG)
             
             # 记录完整命令（用于调试）
             self.config.log(f"执行命令: {' '.join(args)}", logging.DEBUG)
-            
-            process = self._create_download_process(
-                task_id=task_id,
-                url=url,
-                output_path=output_path,
-                args=args,
+
+            self.scheduler.submit(
+                task_id,
+                platform,
+                lambda: self._launch_task(task_id, url, output_path, args),
+                priority=priority,
             )
-            process.start(args[0], args[1:])
-            self.processes.append(process)
+
+            # 仍在排队的任务才预取元数据（与下载使用相同的平台参数和 cookies）；
+            # 已经启动的任务由下载进程自己提取，不再重复
+            if self.metadata_probe is not None and self.scheduler.is_queued(task_id):
+                self.metadata_probe.enqueue(task_id, url, self._probe_base_args(platform_config, browser))
             return True
             
         except Exception as e:
@@ -483,319 +857,386 @@ class Downloader(QObject):
             self.download_finished.emit(False, error_msg, "未知视频", task_id)
             return False
         
-    def cancel_download(self):
-        """取消所有正在进行的下载"""
-        for process in self.processes:
-            if process.state() == QProcess.ProcessState.Running:
-                process.setProperty("cancel_requested", True)
-                process.kill()  # 强制结束进程
-        self.processes.clear()  # 清空进程列表
+    def _launch_task(self, task_id, url, output_path, args):
+        """由调度器在有空闲名额时调用，交给当前执行后端真正启动。"""
+        try:
+            if self.metadata_probe is not None:
+                self.metadata_probe.discard(task_id)
+            job = DownloadJob(task_id, url, self.detect_platform(url), output_path, args)
+            job.backend = self.backends[self.engine]
+            metadata = self.task_metadata.get(task_id)
+            if metadata and metadata.title:
+                job.title = self._display_title(metadata.title)
+            self._apply_info_cache(job)
+            self._apply_cookie_jar(job)
+            self.jobs[task_id] = job
+            job.backend.start(job)
+            return True
+        except Exception as e:
+            error_msg = f"启动下载失败: {str(e)}"
+            self.config.log(error_msg, logging.ERROR)
+            self.download_finished.emit(False, error_msg, "未知视频", task_id)
+            return False
 
-    def _create_download_process(self, task_id, url, output_path, args):
-        """创建并配置下载进程，便于失败后原参数重试。"""
-        process = QProcess()
-        process.setProcessEnvironment(self.env)
-        process.setWorkingDirectory(output_path)
-
-        process.setProperty("url", url)
-        process.setProperty("task_id", task_id)
-        process.setProperty("title", "未知视频")
-        process.setProperty("title_set", False)
-        process.setProperty("retry_count", 0)
-        process.setProperty("saw_download_progress", False)
-        process.setProperty("cancel_requested", False)
-        process.setProperty("command_args", args)
-        process.setProperty("working_directory", output_path)
-        process.setProperty("stdout_buffer", "")
-        process.setProperty("stderr_buffer", "")
-
-        process.finished.connect(
-            lambda exit_code, exit_status: self._process_finished(exit_code, exit_status)
-        )
+    def process_environment(self):
+        """以 dict 形式返回子进程环境变量，供非 QProcess 的后端使用"""
+        return {key: self.env.value(key) for key in self.env.keys()}
 
-        def handle_stdout():
-            data = process.readAllStandardOutput()
-            self._handle_process_output(process, data, is_error=False)
+    def set_max_concurrent_downloads(self, max_concurrent):
+        """设置全局并发下载上限并持久化。"""
+        self.scheduler.set_max_concurrent(max_concurrent)
+        self.config.config['max_concurrent_downloads'] = self.scheduler.max_concurrent
+        self.config.save_config()
 
-        def handle_stderr():
-            data = process.readAllStandardError()
-            self._handle_process_output(process, data, is_error=True)
+    def has_active_tasks(self):
+        """是否还有运行中或排队中的任务。"""
+        return bool(self.jobs) or self.scheduler.has_work()
 
-        process.readyReadStandardOutput.connect(handle_stdout)
-        process.readyReadStandardError.connect(handle_stderr)
-        return process
+    def cancel_download(self):
+        """取消所有正在进行的下载"""
+        # 先清空排队任务，避免杀掉运行中的进程后调度器继续派发
+        self.scheduler.cancel_pending()
+        if self.metadata_probe is not None:
+            self.metadata_probe.cancel_all()
+        self.task_metadata.clear()
+        for job in list(self.jobs.values()):
+            job.cancel_requested = True
+            job.backend.cancel(job)
+        self.jobs.clear()  # 清空任务列表
+
+    def shutdown(self):
+        """程序退出时取消任务并关闭执行后端"""
+        self.cancel_download()
+        if self.metadata_probe is not None:
+            self.metadata_probe.shutdown()
+        if self.format_probe is not None:
+            self.format_probe.shutdown()
+        for backend in self.backends.values():
+            backend.shutdown()
+        if self.cookie_broker is not None:
+            self.cookie_broker.release_all()
 
-    def _should_retry_youtube_failure(self, process, output, error):
+    def _should_retry_youtube_failure(self, job):
         """仅对首次、无实质进度的 YouTube 初始化类失败补一次重试。"""
-        if process.property("cancel_requested"):
+        if job.cancel_requested:
             return False
 
-        platform = self.detect_platform(process.property("url") or "")
+        platform = self.detect_platform(job.url or "")
         if platform != "youtube":
             return False
 
-        retry_count = int(process.property("retry_count") or 0)
-        if retry_count >= self._MAX_YOUTUBE_RECOVERY_RETRIES:
+        if job.retry_count >= self._MAX_YOUTUBE_RECOVERY_RETRIES:
             return False
 
-        if process.property("saw_download_progress"):
+        if job.saw_download_progress:
             return False
 
-        combined = f"{output}\n{error}".lower()
-        return any(marker in combined for marker in self._YOUTUBE_RETRY_ERROR_MARKERS)
+        return bool(job.retry_markers.matched)
 
-    def _restart_process(self, process):
-        """使用原参数自动补救重试。"""
-        args = process.property("command_args")
-        if not args:
-            return False
-
-        retry_count = int(process.property("retry_count") or 0) + 1
-        task_id = process.property("task_id")
-        title = process.property("title") or "未知视频"
+    def _restart_job(self, job, reuse_info=True):
+        """使用原参数自动补救重试，任务继续占用调度器名额。
 
-        new_process = self._create_download_process(
-            task_id=task_id,
-            url=process.property("url"),
-            output_path=process.property("working_directory"),
-            args=args,
-        )
-        new_process.setProperty("retry_count", retry_count)
-        new_process.setProperty("title", title)
-        new_process.setProperty("title_set", bool(process.property("title_set")))
+        上一次已经拿到的视频信息直接复用，重试不再重新解析网页和生成 PO Token。
+        """
+        if not job.args:
+            return False
 
-        if process in self.processes:
-            index = self.processes.index(process)
-            self.processes[index] = new_process
-        else:
-            self.processes.append(new_process)
+        if not reuse_info and self.info_cache is not None and job.info_key:
+            self.info_cache.invalidate(*job.info_key)
+        # 重试时输出调试信息，万一再次失败便于排查
+        job.base_args = verbosity.with_debug(job.base_args, 1)
+        self._apply_info_cache(job)
+        self._apply_cookie_jar(job)
+        job.retry_count += 1
+        job.saw_download_progress = False
+        job.reset_output()
 
         total_attempts = self._MAX_YOUTUBE_RECOVERY_RETRIES + 1
         self.output_received.emit(
-            task_id,
-            f"YouTube 初始化失败，正在自动重试（第 {retry_count + 1}/{total_attempts} 次尝试）...",
+            job.task_id,
+            f"YouTube 初始化失败，正在自动重试（第 {job.retry_count + 1}/{total_attempts} 次尝试）...",
         )
-        process.deleteLater()
-        new_process.start(args[0], args[1:])
+        job.backend.start(job)
         return True
         
-    def _handle_process_output(self, process, data, is_error=False):
-        """处理下载进程的输出"""
+    def _apply_info_cache(self, job):
+        """命中信息缓存时把末尾的 URL 换成 --load-info-json，跳过提取直接下载"""
+        job.args = job.base_args
+        if self.info_cache is None:
+            return
+
+        metadata = self.task_metadata.get(job.task_id)
+        if metadata and metadata.extractor_key and metadata.video_id and metadata.entry_count is None:
+            job.info_key = (metadata.extractor_key, metadata.video_id)
+        else:
+            job.info_key = key_from_url(job.url)
+        if job.info_key is None:
+            return
+
+        path = self.info_cache.lookup(*job.info_key)
+        if path:
+            job.args = job.base_args[:-1] + ["--load-info-json", path]
+            self.config.log(f"使用缓存的视频信息，跳过提取: {path}", logging.DEBUG)
+
+    def _record_download(self, job):
+        """把下载成功的视频写入下载记录（播放列表链接不记录）"""
+        key = job.info_key
+        if key is None:
+            metadata = self.task_metadata.get(job.task_id)
+            if metadata and metadata.extractor_key and metadata.video_id and metadata.entry_count is None:
+                key = (metadata.extractor_key, metadata.video_id)
+            else:
+                key = key_from_url(job.url)
+        if key:
+            self.archive.add(*key)
+
+    def _apply_cookie_jar(self, job):
+        """把 --cookies-from-browser 换成该任务专用的 cookies 副本，每次启动前重新复制最新导出"""
+        if self.cookie_broker is not None:
+            job.args = self.cookie_broker.rewrite_args(job.args, job.task_id)
+
+    def _release_cookie_jar(self, task_id):
+        if self.cookie_broker is not None:
+            self.cookie_broker.release(task_id)
+
+    @staticmethod
+    def _display_title(title):
+        """标题长度限制和截断处理"""
+        max_length = 50  # 设置最大长度
+        if len(title) > max_length:
+            # 保留前后部分，中间用省略号，注意处理多字节字符
+            title = title[:max_length//2-2] + "..." + title[-max_length//2+1:]
+        return title
+
+    def _set_job_title(self, job, title):
+        """设置任务标题（只设置一次），并通知界面"""
+        title = self._display_title(title)
+        job.title = title
+        job.title_set = True  # 标记标题已设置
+        self._emit_output(job, f"开始下载: {title}")
+        self._emit_title(job, title)
+        self.config.log(f"成功设置标题: '{title}'", logging.DEBUG)
+
+    def _handle_progress_hook(self, job, progress):
+        """处理 yt-dlp progress hook（worker 进程池）或结构化记录上报的进度"""
+        title = progress.get("title")
+        if title and not job.title_set:
+            self._set_job_title(job, title)
+
+        status = progress.get("status")
+        if status == "finished":
+            self._emit_output(job, "下载完成")
+            return
+        if status != "downloading":
+            return
+
+        job.saw_download_progress = True
+        downloaded = progress.get("downloaded_bytes") or 0
+        total = progress.get("total_bytes") or progress.get("total_bytes_estimate")
+        percent = downloaded * 100.0 / total if total else 0.0
+        speed = progress.get("speed")
+        speed_text = f"{format_size(speed)}/s" if speed else "未知"
+        self._emit_output(
+            job,
+            f"下载进度: {percent:.1f}% (大小: {format_size(total)}, 速度: {speed_text}, 剩余: {format_eta(progress.get('eta'))})",
+        )
+
+    def _handle_postprocess(self, job, status, postprocessor):
+        if postprocessor == "Merger" and status == "started":
+            self._emit_output(job, "正在合并视频和音频...")
+
+    def _handle_protocol_event(self, job, event):
+        """处理结构化模式下 yt-dlp 输出的记录"""
+        if isinstance(event, progress_protocol.ProgressEvent):
+            self._handle_progress_hook(job, event._asdict())
+        elif isinstance(event, progress_protocol.VideoEvent):
+            # 模板给出的是真实标题，不必再从 Destination 文件名猜
+            if not job.title_set and event.title:
+                self._set_job_title(job, event.title)
+        elif isinstance(event, progress_protocol.FileEvent):
+            job.filepath = event.filepath
+            self.config.log(f"任务 {job.task_id} 输出文件: {event.filepath}", logging.DEBUG)
+        elif isinstance(event, progress_protocol.PostprocessEvent):
+            self._handle_postprocess(job, event.status, event.postprocessor)
+
+    def _handle_metadata(self, task_id, metadata):
+        """元数据探测结果：先显示标题，按需调整排队顺序"""
+        job = self.jobs.get(task_id)
+        if job is None and not self.scheduler.is_queued(task_id):
+            return  # 任务已结束或已取消
+        self.task_metadata[task_id] = metadata
+
+        if metadata.title and (job is None or not job.title_set):
+            title = self._display_title(metadata.title)
+            if job is not None:
+                job.title = title
+            self.title_updated.emit(task_id, title)
+
+        if self.order_by_size and metadata.estimated_bytes:
+            self.scheduler.update_cost(task_id, metadata.estimated_bytes)
+        self.metadata_received.emit(task_id, metadata)
+
+    def _emit_output(self, job, message):
+        """发出任务输出；在 I/O 线程解析时先收集，随批次交回界面线程"""
+        if job.pending_events is not None:
+            job.pending_events.append(TaskOutput(job.task_id, message))
+        else:
+            self.output_received.emit(job.task_id, message)
+
+    def _emit_title(self, job, title):
+        if job.pending_events is not None:
+            job.pending_events.append(TaskTitle(job.task_id, title))
+        else:
+            self.title_updated.emit(job.task_id, title)
+
+    def _deliver_event(self, event):
+        """在界面线程发出 I/O 线程解析得到的事件"""
+        if isinstance(event, TaskTitle):
+            self.title_updated.emit(event.task_id, event.title)
+        else:
+            self.output_received.emit(event.task_id, event.message)
+
+    def _parse_output_lines(self, job, lines, is_error):
+        """在 I/O 线程中解析一批完整行，返回要交给界面线程的事件"""
+        events = []
+        job.pending_events = events
         try:
-            # 改进编码处理逻辑
-            try:
-                # 首先尝试 UTF-8 解码
-                text = data.data().decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    # 如果失败，尝试 CP949 (韩文编码)
-                    text = data.data().decode('cp949')
-                except UnicodeDecodeError:
-                    try:
-                        # 再尝试 GB18030 (支持中日韩字符)
-                        text = data.data().decode('gb18030')
-                    except UnicodeDecodeError:
-                        # 最后使用 replace 错误处理方式
-                        text = data.data().decode('utf-8', errors='replace')
-        
-            if not text:
-                return
+            self._handle_output_lines(job, lines, is_error)
+        finally:
+            job.pending_events = None
+        return events
 
-            buffer_key = "stderr_buffer" if is_error else "stdout_buffer"
-            existing = process.property(buffer_key) or ""
-            process.setProperty(buffer_key, existing + text)
-            
-            task_id = process.property("task_id")
-            
-            # 发送原生日志到日志窗口（在处理之前发送，确保完整性）
-            # 这样高级用户可以看到完整的yt-dlp和ffmpeg输出
-            self.output_received.emit(task_id, f"[RAW_LOG]{text.rstrip()}")
-            
-            # 处理下载信息
-            if '[download]' in text:
-                # 处理标题 - 更精确地识别真正的文件名
-                if 'Destination:' in text and not process.property("title_set"):
-                    # 只有当标题尚未设置时才处理，避免被后续的临时文件信息覆盖
-                    # 检查是否是真正的视频文件路径（不是临时文件或部分下载文件）
-                    destination_line = text.strip()
-                    if 'Destination:' in destination_line:
-                        # 提取文件名并保持原始编码
-                        # 先找到"Destination:"的确切位置
-                        dest_index = destination_line.find('Destination:')
-                        if dest_index != -1:
-                            # 从"Destination:"之后提取内容
-                            title_part = destination_line[dest_index + len('Destination:'):].strip()
-                            # 移除可能的额外信息（如进度信息）
-                            # 按顺序处理各种可能的进度信息分隔符
-                            progress_separators = [' [download]', ' ETA ', ' at ', ' of ']
-                            for separator in progress_separators:
-                                if separator in title_part:
-                                    title_part = title_part.split(separator)[0]
-                            
-                            # 进一步清理可能的数字和百分比信息
-                            import re
-                            # 移除类似 "0.0%" 的百分比信息
-                            title_part = re.sub(r'\s*\d+\.\d+%\s*.*$', '', title_part)
-                            # 移除类似 ".f123" 的临时文件扩展名
-                            title_part = re.sub(r'\.f\d+', '', title_part)
-                            
-                            title = os.path.splitext(os.path.basename(title_part))[0]
-                            
-                            # 检查是否是字幕文件，如果是则跳过（我们只关心视频文件的标题）
-                            subtitle_extensions = ['.vtt', '.srt', '.ass', '.lrc', '.sbv', '.sub', '.txt']
-                            is_subtitle_file = any(ext in title_part for ext in subtitle_extensions)
-                            if is_subtitle_file:
-                                self.config.log(f"跳过字幕文件标题: '{title}'", logging.DEBUG)
-                                title = ""
-                        else:
-                            title = ""
-                        
-                        # 添加调试信息
-                        self.config.log(f"提取到标题: '{title}'", logging.DEBUG)
-                        
-                        # 过滤掉明显不是视频标题的信息
-                        if title and len(title) > 1:
-                            # 检查是否包含明显的进度信息关键词
-                            progress_keywords = ['ETA', 'at', 'of', '%', 'MiB', 'KiB', 'GiB']
-                            is_progress_info = any(keyword in title for keyword in progress_keywords)
-                            
-                            # 添加调试信息
-                            self.config.log(f"是否为进度信息: {is_progress_info}", logging.DEBUG)
-                            
-                            # 如果标题有效且尚未设置，更新标题
-                            # 即使看起来像进度信息，也可能是真实的短标题
-                            if not process.property("title_set"):
-                                # 对于非常短的标题（如"s"），需要额外验证
-                                if len(title) <= 3:
-                                    # 检查是否是合理的标题（不是纯数字或特殊字符）
-                                    is_valid_title = not title.replace('.', '').replace('_', '').replace('-', '').isdigit()
-                                    # 如果是单个字母，很可能是错误的标题
-                                    if len(title) == 1 and title.isalpha():
-                                        is_valid_title = False
-                                    
-                                    if not is_valid_title:
-                                        self.config.log(f"标题被过滤（不合理）: '{title}'", logging.DEBUG)
-                                        title = None
-                                
-                                if title:
-                                    # 标题长度限制和截断处理
-                                    max_length = 50  # 设置最大长度
-                                    if len(title) > max_length:
-                                        # 保留前后部分，中间用省略号，注意处理多字节字符
-                                        title = title[:max_length//2-2] + "..." + title[-max_length//2+1:]
-                                    
-                                    process.setProperty("title", title)
-                                    process.setProperty("title_set", True)  # 标记标题已设置
-                                    self.output_received.emit(task_id, f"开始下载: {title}")
-                                    self.title_updated.emit(task_id, title)
-                                    self.config.log(f"成功设置标题: '{title}'", logging.DEBUG)
-                            else:
-                                self.config.log(f"标题已设置，跳过更新", logging.DEBUG)
-                        else:
-                            self.config.log(f"标题被过滤（长度不足或为空）: '{title}'", logging.DEBUG)
-                # 处理进度
-                elif '%' in text and 'of' in text:
-                    try:
-                        import re
-                        # 兼容普通格式和 SABR 格式（带流编号前缀如 "2:"）
-                        # 示例1: [download]  23.4% of 50.75MiB at 2.52MiB/s ETA 00:15
-                        # 示例2: 2: [download]  18.8% of 210.43MiB at 902.64KiB/s ETA 03:12 (frag 20/119)
-                        # 示例3: [download]   1.4% of ~   4.36MiB at   13.74KiB/s ETA 00:23 (frag 0/144)
-                        match = re.search(
-                            r'\[download\]\s+([\d.]+)%\s+of\s+~?\s*([\d.]+\S+)\s+at\s+([\d.]+\S+)\s+ETA\s+(\S+)',
-                            text
-                        )
-                        if match:
-                            percent = match.group(1)
-                            size = match.group(2)
-                            speed = match.group(3)
-                            eta = match.group(4)
-                            process.setProperty("saw_download_progress", True)
-                            
-                            if float(percent) >= 100:
-                                self.output_received.emit(task_id, "下载完成")
-                            else:
-                                progress_text = f"下载进度: {percent}% (大小: {size}, 速度: {speed}, 剩余: {eta})"
-                                self.output_received.emit(task_id, progress_text)
-                        else:
-                            # 100% 完成行可能格式不同
-                            if '100%' in text or '100.0%' in text:
-                                self.output_received.emit(task_id, "下载完成")
-                    except Exception:
-                        # 如果解析失败，显示原始进度信息
-                        self.output_received.emit(task_id, text.strip())
-                # 处理合并信息
-                elif 'Merging formats into' in text:
-                    self.output_received.emit(task_id, "正在合并视频和音频...")
-                # 处理已存在文件
-                elif 'has already been downloaded' in text:
-                    self.output_received.emit(task_id, "文件已存在")
-                # 处理完成信息
-                elif 'has already been downloaded and merged' in text:
-                    self.output_received.emit(task_id, "下载完成")
-                
-        except Exception as e:
-            self.config.log(f"处理输出时出错: {str(e)}", logging.ERROR)
-            
-    def analyze_formats(self, url):
-        """分析视频可用格式"""
-        process = QProcess()
-        args = ["--cookies-from-browser", "safari", "-F", url]
-        process.start("yt-dlp", args)
-        process.waitForFinished()
-        
-        # 获取输出
-        stdout = process.readAllStandardOutput().data().decode()
-        stderr = process.readAllStandardError().data().decode()
-        
-        # 返回完整输出
-        return stdout + stderr
-        
-    def _parse_format_list(self, output):
-        """解析yt-dlp -F的输出"""
-        formats = []
-        for line in output.split('\n'):
-            if line.startswith('format code') or not line.strip():
-                continue
-            try:
-                parts = line.split()
-                if len(parts) < 3:
-                    continue
-                    
-                code = parts[0]
-                ext = parts[1] if len(parts) > 1 else ""
-                desc = line  # 保存完整的格式描述
-                
-                # 分类格式
-                is_video = "video only" in line or ("p," in line and "audio only" not in line)
-                is_audio = "audio only" in line
-                
-                formats.append({
-                    'code': code,
-                    'ext': ext,
-                    'description': desc,
-                    'is_video': is_video,
-                    'is_audio': is_audio
-                })
-            except:
-                continue
-        return formats 
+    def _handle_process_output(self, job, text, is_error=False):
+        """处理下载任务的输出（已由执行后端解码为文本），按完整行解析"""
+        framer = job.stderr_framer if is_error else job.stdout_framer
+        self._handle_output_lines(job, framer.feed(text), is_error)
 
-    def _check_yt_dlp_available(self):
-        """检查 yt-dlp 是否可用"""
+    def _flush_job_output(self, job):
+        """任务结束时处理残留的最后半行"""
+        self._handle_output_lines(job, job.stdout_framer.flush(), False)
+        self._handle_output_lines(job, job.stderr_framer.flush(), True)
+
+    def _handle_output_lines(self, job, lines, is_error):
+        if not lines:
+            return
+
+        (job.stderr_tail if is_error else job.stdout_tail).extend(lines)
+        job.retry_markers.feed(lines)
+
+        # 发送原生日志到日志窗口（在处理之前发送，确保完整性）
+        # 这样高级用户可以看到完整的yt-dlp和ffmpeg输出
+        self._emit_output(job, "[RAW_LOG]" + "\n".join(lines))
+
+        for line in lines:
+            self._handle_output_line(job, line)
+
+    def _handle_output_line(self, job, text):
+        """解析单行输出，提取标题、进度和状态"""
         try:
-            process = QProcess()
-            process.setProcessEnvironment(self.env)
-            process.start(str(self.ytdlp_path), ["--version"])
-            process.waitForFinished()
-            success = process.exitCode() == 0
-            if not success:
-                self.config.log(f"yt-dlp 检查失败，退出码: {process.exitCode()}", logging.ERROR)
-                self.config.log(f"错误输出: {process.readAllStandardError().data().decode()}", logging.ERROR)
-            return success
+            event = progress_protocol.parse_record(text)
+            if event is not None:
+                self._handle_protocol_event(job, event)
+                return
+            self._line_dispatcher.dispatch(text, job)
         except Exception as e:
-            self.config.log(f"检查 yt-dlp 时出错: {str(e)}", logging.ERROR)
+            self.config.log(f"处理输出时出错: {str(e)}", logging.ERROR)
+
+    def _on_destination_line(self, match, job):
+        """处理标题 - 更精确地识别真正的文件名"""
+        # 只有当标题尚未设置时才处理，避免被后续的临时文件信息覆盖
+        if job.title_set:
+            return
+        # 从"Destination:"之后提取内容并保持原始编码
+        title_part = match.group(1).strip()
+        # 移除可能的额外信息（如进度信息）
+        # 按顺序处理各种可能的进度信息分隔符
+        progress_separators = [' [download]', ' ETA ', ' at ', ' of ']
+        for separator in progress_separators:
+            if separator in title_part:
+                title_part = title_part.split(separator)[0]
+
+        # 进一步清理可能的数字和百分比信息
+        # 移除类似 "0.0%" 的百分比信息
+        title_part = re.sub(r'\s*\d+\.\d+%\s*.*$', '', title_part)
+        # 移除类似 ".f123" 的临时文件扩展名
+        title_part = re.sub(r'\.f\d+', '', title_part)
+
+        title = os.path.splitext(os.path.basename(title_part))[0]
+
+        # 检查是否是字幕文件，如果是则跳过（我们只关心视频文件的标题）
+        subtitle_extensions = ['.vtt', '.srt', '.ass', '.lrc', '.sbv', '.sub', '.txt']
+        is_subtitle_file = any(ext in title_part for ext in subtitle_extensions)
+        if is_subtitle_file:
+            self.config.log(f"跳过字幕文件标题: '{title}'", logging.DEBUG)
+            title = ""
+
+        # 添加调试信息
+        self.config.log(f"提取到标题: '{title}'", logging.DEBUG)
+
+        # 过滤掉明显不是视频标题的信息
+        if not title or len(title) <= 1:
+            self.config.log(f"标题被过滤（长度不足或为空）: '{title}'", logging.DEBUG)
+            return
+
+        # 检查是否包含明显的进度信息关键词
+        progress_keywords = ['ETA', 'at', 'of', '%', 'MiB', 'KiB', 'GiB']
+        is_progress_info = any(keyword in title for keyword in progress_keywords)
+        # 添加调试信息
+        self.config.log(f"是否为进度信息: {is_progress_info}", logging.DEBUG)
+
+        # 即使看起来像进度信息，也可能是真实的短标题
+        # 对于非常短的标题（如"s"），需要额外验证
+        if len(title) <= 3:
+            # 检查是否是合理的标题（不是纯数字或特殊字符）
+            is_valid_title = not title.replace('.', '').replace('_', '').replace('-', '').isdigit()
+            # 如果是单个字母，很可能是错误的标题
+            if len(title) == 1 and title.isalpha():
+                is_valid_title = False
+            if not is_valid_title:
+                self.config.log(f"标题被过滤（不合理）: '{title}'", logging.DEBUG)
+                return
+
+        self._set_job_title(job, title)
+
+    def _on_progress_line(self, match, job):
+        percent, size, speed, eta = match.groups()
+        if speed is not None:
+            job.saw_download_progress = True
+        if float(percent) >= 100:
+            self._emit_output(job, "下载完成")
+        elif speed is not None:
+            self._emit_output(job, f"下载进度: {percent}% (大小: {size}, 速度: {speed}, 剩余: {eta})")
+
+    def _on_merging_line(self, match, job):
+        self._emit_output(job, "正在合并视频和音频...")
+
+    def _on_already_merged_line(self, match, job):
+        self._emit_output(job, "下载完成")
+
+    def _on_already_downloaded_line(self, match, job):
+        self._emit_output(job, "文件已存在")
+
+    def analyze_formats(self, url, browser='firefox'):
+        """在后台获取视频的可用格式，结果经 formats_received 发出（命中缓存时立即发出）"""
+        if self.format_probe is None:
             return False
+        platform_config = self.get_platform_config(self.detect_platform(url))
+        self.format_probe.request(url, self._probe_base_args(platform_config, browser))
+        return True
+
+    def _probe_base_args(self, platform_config, browser):
+        """探测用的 yt-dlp 参数：与下载使用相同的平台参数和 cookies"""
+        args = [str(self.ytdlp_path), "--encoding", "utf-8", *platform_config['special_args']]
+        if platform_config['require_cookies'] and browser:
+            args.extend(["--cookies-from-browser", browser])
+        return args
+
+    def _check_yt_dlp_available(self):
+        """检查 yt-dlp 是否可用（使用后台探测的缓存结果）"""
+        ok, error = self.binary_registry.check("yt-dlp")
+        if not ok:
+            self.config.log(f"yt-dlp 检查失败: {error}", logging.ERROR)
+        return ok
 
     def _format_progress(self, data):
         """格式化进度信息"""
@@ -812,77 +1253,21 @@ class Downloader(QObject):
             return data.strip() 
 
     def _get_firefox_cookies_path(self):
-        """查找 Firefox cookies 文件路径"""
-        try:
-            # 1. 检查标准安装版的所有可能路径
-            appdata = os.getenv('APPDATA')
-            if appdata:
-                standard_path = os.path.join(appdata, 'Mozilla', 'Firefox', 'Profiles')
-                if os.path.exists(standard_path):
-                    # 检查所有可能的配置文件
-                    profile_patterns = [
-                        '*.default-release',  # 最常见
-                        '*.default',          # 老版本
-                        '*.default-*',        # 其他变体
-                    ]
-                    for pattern in profile_patterns:
-                        profiles = glob.glob(os.path.join(standard_path, pattern))
-                        for profile in profiles:
-                            cookies_path = os.path.join(profile, 'cookies.sqlite')
-                            if os.path.exists(cookies_path):
-                                self.config.log(f"找到Firefox cookies: {cookies_path}", logging.DEBUG)
-                                return cookies_path
-
-            # 2. 检查便携版的可能路径
-            portable_patterns = [
-                # 标准便携版路径
-                os.path.join('Data', 'profile', 'cookies.sqlite'),
-                # 某些便携版的变体
-                os.path.join('Data', 'Browser', 'profile', 'cookies.sqlite'),
-                os.path.join('FirefoxPortable', 'Data', 'profile', 'cookies.sqlite'),
-                # 用户自定义配置文件夹
-                os.path.join('Data', 'Profiles', '*', 'cookies.sqlite')
-            ]
+        """查找 Firefox cookies 文件路径；配置文件没有变化时直接返回缓存结果"""
+        return self.browser_discovery.firefox_cookies_path()
 
-            # 从当前目录开始向上查找5层
-            current = os.getcwd()
-            for _ in range(5):
-                for pattern in portable_patterns:
-                    full_pattern = os.path.join(current, pattern)
-                    matches = glob.glob(full_pattern)
-                    for match in matches:
-                        if os.path.exists(match):
-                            self.config.log(f"找到便携版Firefox cookies: {match}", logging.DEBUG)
-                            return match
-                current = os.path.dirname(current)
-
-            # 3. 如果找不到，给出明确的错误提示
-            self.config.log("""未找到Firefox cookies文件。可能的原因：
-1. Firefox未安装或未运行过
-2. 未使用Firefox登录过YouTube
-3. 使用了非标准的Firefox安装方式
-4. Firefox配置文件位置不标准""", logging.WARNING)
-            return None
-
-        except Exception as e:
-            self.config.log(f"查找Firefox cookies时出错: {str(e)}", logging.ERROR)
-            return None 
-
-    def _process_finished(self, exit_code, exit_status):
-        """处理进程完成事件"""
+    def _job_finished(self, job, exit_code):
+        """处理任务结束事件（由执行后端回调）"""
+        task_id = job.task_id
         try:
-            process = self.sender()
-            task_id = process.property("task_id")
-            url = process.property("url")
-            
-            # 获取剩余输出并合并已缓存日志
-            remaining_output = process.readAllStandardOutput().data().decode('utf-8', errors='ignore')
-            remaining_error = process.readAllStandardError().data().decode('utf-8', errors='ignore')
-            output = (process.property("stdout_buffer") or "") + remaining_output
-            error = (process.property("stderr_buffer") or "") + remaining_error
+            url = job.url
+            self._flush_job_output(job)
+            error = job.stderr_tail.text()
+            if self.info_cache is not None:
+                self.info_cache.adopt_incoming()
             
             # 获取视频标题
-            title = process.property("title") or url
+            title = job.title or url
             # 如果标题仍然是默认值"未知视频"或明显不合理的标题，尝试从URL中提取信息
             if (title == "未知视频" or (isinstance(title, str) and len(title) <= 3 and (title.replace('.', '').replace('_', '').replace('-', '').isdigit() or (len(title) == 1 and title.isalpha())))) and url:
                 # 尝试从URL中提取视频ID作为标题
@@ -925,31 +1310,35 @@ class Downloader(QObject):
             # 检查是否成功
             success = exit_code == 0
 
-            if not success and self._should_retry_youtube_failure(process, output, error):
-                self._restart_process(process)
+            if not success and self._should_retry_youtube_failure(job):
+                # 格式不可用通常说明拿到的信息本身不完整，这种情况丢弃缓存重新提取
+                reuse_info = FORMAT_UNAVAILABLE_MARKER not in job.retry_markers.matched
+                self._restart_job(job, reuse_info=reuse_info)
                 return
             
             # 发送完成信号
             if success:
+                self._record_download(job)
                 self.download_finished.emit(True, "", title, task_id)
             else:
                 error_msg = self._format_platform_error(error, platform, url, exit_code)
                 self.download_finished.emit(False, error_msg, title, task_id)
             
-            # 从进程列表中移除
-            if process in self.processes:
-                self.processes.remove(process)
-            process.deleteLater()
+            # 从任务列表中移除
+            if self.jobs.get(task_id) is job:
+                del self.jobs[task_id]
+            self.task_metadata.pop(task_id, None)
+            self._release_cookie_jar(task_id)
+            self.scheduler.finish(task_id)
             
         except Exception as e:
             self.config.log(f"处理进程完成时出错: {str(e)}", logging.ERROR)
             # 确保在出错时也发送失败信号
-            try:
-                process = self.sender()
-                task_id = process.property("task_id")
-                self.download_finished.emit(False, str(e), "未知视频", task_id)
-            except Exception:
-                pass
+            self.jobs.pop(task_id, None)
+            self.task_metadata.pop(task_id, None)
+            self._release_cookie_jar(task_id)
+            self.download_finished.emit(False, str(e), "未知视频", task_id)
+            self.scheduler.finish(task_id)
     
     def _format_platform_error(self, error, platform, url, exit_code):
         """根据平台类型格式化错误信息，提供用户友好的提示"""
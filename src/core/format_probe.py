@@ -0,0 +1,262 @@
+import itertools
+import json
+import logging
+import time
+from typing import NamedTuple, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .info_cache import DEFAULT_TTL_SECONDS, key_from_url
+from .io_engine import ProcessExited, ProcessIOEngine
+
+# -J 输出带完整格式列表时可达数 MB
+_MAX_JSON_LINE_CHARS = 64 * 1024 * 1024
+
+
+class FormatRow(NamedTuple):
+    """格式表中的一行，对应 yt-dlp -F 的一行"""
+    format_id: str
+    ext: Optional[str]
+    width: Optional[int]
+    height: Optional[int]
+    fps: Optional[float]
+    vcodec: Optional[str]
+    acodec: Optional[str]
+    tbr: Optional[float]  # 总码率 kbps
+    filesize: Optional[float]
+
+    @property
+    def has_video(self) -> bool:
+        return self.vcodec not in (None, "none")
+
+    @property
+    def has_audio(self) -> bool:
+        return self.acodec not in (None, "none")
+
+    @property
+    def resolution(self) -> str:
+        if self.width and self.height:
+            return f"{self.width}x{self.height}"
+        if self.height:
+            return f"{self.height}p"
+        return "audio only" if self.has_audio and not self.has_video else "unknown"
+
+
+class FormatTable(NamedTuple):
+    extractor_key: Optional[str]
+    video_id: Optional[str]
+    title: Optional[str]
+    rows: tuple  # FormatRow
+
+
+class QualityPreset(NamedTuple):
+    """画质下拉框的一个选项；按 yt-dlp 选择器的规则判断能否选中格式"""
+    label: str
+    format: str
+    video_ext: Optional[str] = None  # bv[ext=...]
+    audio_ext: Optional[str] = None  # ba[ext=...]
+    max_height: Optional[int] = None  # [height<=...]，高度未知的格式不满足
+    video_only: bool = True  # bv 只选纯视频流，bv* 也可以选带音频的
+    audio_only: bool = False  # 仅音频（ba/b），任何带音频的格式都可以
+
+
+# 顺序即下拉框顺序，配置中保存的是序号
+QUALITY_PRESETS = (
+    QualityPreset("最高画质", "bv*+ba", video_only=False),
+    QualityPreset("最高画质MP4", "bv[ext=mp4]+ba[ext=m4a]", video_ext="mp4", audio_ext="m4a"),
+    QualityPreset("4K MP4", "bv[ext=mp4][height<=2160]+ba[ext=m4a]", video_ext="mp4", audio_ext="m4a", max_height=2160),
+    QualityPreset("1080P MP4", "bv[ext=mp4][height<=1080]+ba[ext=m4a]", video_ext="mp4", audio_ext="m4a", max_height=1080),
+    QualityPreset("480P MP4", "bv[ext=mp4][height<=480]+ba[ext=m4a]", video_ext="mp4", audio_ext="m4a", max_height=480),
+    QualityPreset("仅MP3音频", "ba/b", audio_only=True),
+)
+
+
+class PresetAvailability(NamedTuple):
+    available: bool
+    height: Optional[int]  # 会选中的最高分辨率；仅音频或高度未知时为 None
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else None
+
+
+def parse_formats(info) -> FormatTable:
+    """把 yt-dlp 的信息字典整理为格式表，跳过故事板等既无音频也无视频的格式"""
+    rows = []
+    for fmt in info.get("formats") or ():
+        if fmt.get("format_id") is None:
+            continue
+        row = FormatRow(
+            format_id=str(fmt["format_id"]),
+            ext=fmt.get("ext"),
+            width=_number(fmt.get("width")),
+            height=_number(fmt.get("height")),
+            fps=_number(fmt.get("fps")),
+            vcodec=fmt.get("vcodec"),
+            acodec=fmt.get("acodec"),
+            tbr=_number(fmt.get("tbr")),
+            filesize=_number(fmt.get("filesize")) or _number(fmt.get("filesize_approx")),
+        )
+        if row.vcodec == "none" and row.acodec == "none":
+            continue
+        rows.append(row)
+    return FormatTable(info.get("extractor_key"), info.get("id"), info.get("title"), tuple(rows))
+
+
+def evaluate_preset(table, preset) -> PresetAvailability:
+    """判断画质选项在该视频上能否选中格式，避免下载时才报 requested format is not available"""
+    if preset.audio_only:
+        return PresetAvailability(any(row.has_audio for row in table.rows), None)
+
+    audio = [
+        row for row in table.rows
+        if row.has_audio and not row.has_video and (preset.audio_ext is None or row.ext == preset.audio_ext)
+    ]
+    videos = [
+        row for row in table.rows
+        if row.has_video
+        and not (preset.video_only and row.has_audio)
+        and (preset.video_ext is None or row.ext == preset.video_ext)
+        and (preset.max_height is None or (row.height is not None and row.height <= preset.max_height))
+    ]
+    if not audio or not videos:
+        return PresetAvailability(False, None)
+    heights = [row.height for row in videos if row.height]
+    return PresetAvailability(True, max(heights) if heights else None)
+
+
+def build_args(url) -> list[str]:
+    return ["--dump-single-json", "--no-playlist", "--no-warnings", "--", url]
+
+
+class _Probed(NamedTuple):
+    key: str
+    url: str
+    table: Optional[FormatTable]
+
+
+class FormatProbe(QObject):
+    """在后台获取单个链接的格式表。
+
+    结果按 (提取器, 视频ID) 缓存 ttl 秒，同一视频的不同写法共用缓存；
+    信息缓存（InfoCache）里已有该视频的 info.json 时直接读取，不启动进程。
+    同一时间只探测一个链接，新的请求会结束还在运行的旧探测。
+    """
+
+    formats_ready = pyqtSignal(str, object)  # url, FormatTable；失败时为 None
+    _batch_ready = pyqtSignal(object)
+
+    def __init__(self, environment, info_cache=None, cookie_broker=None, ttl=DEFAULT_TTL_SECONDS, parent=None):
+        super().__init__(parent)
+        self._environment = environment  # 返回子进程环境变量 dict 的回调
+        self._info_cache = info_cache
+        self._cookie_broker = cookie_broker
+        self.ttl = ttl
+        self._tables = {}  # (提取器, 视频ID) -> (过期时间, FormatTable)
+        self._url_keys = {}  # url -> (提取器, 视频ID)
+        self._running = None  # (进程键, url)
+        self._probe_ids = itertools.count(1)
+        self._batch_ready.connect(self._handle_batch)
+        self._engine = ProcessIOEngine(on_batch=self._batch_ready.emit)
+
+    def cached(self, url) -> Optional[FormatTable]:
+        """返回缓存中仍然有效的格式表"""
+        key = self._url_keys.get(url) or key_from_url(url)
+        if key is None:
+            return None
+        entry = self._tables.get(key)
+        if entry is not None:
+            expires, table = entry
+            if expires > time.time():
+                return table
+            del self._tables[key]
+        table = self._load_info_cache(key)
+        if table is not None:
+            self._remember(url, table)
+        return table
+
+    def request(self, url, base_args):
+        """获取 url 的格式表，结果经 formats_ready 发出；命中缓存时立即发出"""
+        table = self.cached(url)
+        if table is not None:
+            self.formats_ready.emit(url, table)
+            return
+        if self._running is not None and self._running[1] == url:
+            return
+        self.cancel()
+        key = f"format-probe-{next(self._probe_ids)}"
+        self._running = (key, url)
+        args = list(base_args)
+        if self._cookie_broker is not None:
+            args = self._cookie_broker.rewrite_args(args, key)
+        self._engine.spawn(
+            key,
+            [*args, *build_args(url)],
+            None,
+            self._environment(),
+            lambda lines, is_error, key=key, url=url: self._parse_lines(key, url, lines, is_error),
+            max_line_chars=_MAX_JSON_LINE_CHARS,
+        )
+
+    def cancel(self):
+        if self._running is not None:
+            self._engine.kill(self._running[0])
+            self._running = None
+
+    def shutdown(self):
+        self._running = None
+        self._engine.shutdown()
+
+    def _load_info_cache(self, key):
+        if self._info_cache is None:
+            return None
+        path = self._info_cache.lookup(*key)
+        if not path:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return parse_formats(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def _remember(self, url, table):
+        if table.extractor_key and table.video_id:
+            key = (table.extractor_key, table.video_id)
+            self._tables[key] = (time.time() + self.ttl, table)
+            self._url_keys[url] = key
+
+    def _parse_lines(self, key, url, lines, is_error):
+        """在 I/O 线程中解析 -J 输出"""
+        if is_error:
+            for line in lines:
+                if line.startswith("ERROR:"):
+                    logging.debug(f"格式探测失败: {line}")
+            return []
+        results = []
+        for line in lines:
+            if not line.startswith("{"):
+                continue
+            try:
+                info = json.loads(line)
+            except ValueError:
+                continue
+            table = parse_formats(info)
+            if self._info_cache is not None and table.rows and table.extractor_key and table.video_id:
+                self._info_cache.store(table.extractor_key, table.video_id, line)
+            results.append(_Probed(key, url, table))
+        return results
+
+    def _handle_batch(self, events):
+        for event in events:
+            if isinstance(event, ProcessExited) and self._cookie_broker is not None:
+                self._cookie_broker.release(event.key)
+            if self._running is None or event.key != self._running[0]:
+                continue  # 已被取消或被新的请求取代
+            url = self._running[1]
+            self._running = None
+            if isinstance(event, ProcessExited):
+                # 没有输出 JSON 就结束：链接无效或需要登录
+                self.formats_ready.emit(url, None)
+                continue
+            self._remember(url, event.table)
+            self.formats_ready.emit(url, event.table)
@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+# 信息里找不到媒体链接过期时间时的保留时长
+DEFAULT_TTL_SECONDS = 6 * 3600
+# 距离媒体链接过期不足该时长的缓存视为失效，留出下载本身需要的时间
+EXPIRY_MARGIN_SECONDS = 15 * 60
+
+_SUFFIX = ".info.json"
+# googlevideo 等 CDN 链接里的过期时间戳：?expire=1700000000 或 /expire/1700000000/
+_EXPIRE_PATTERN = re.compile(r"[?&/]expire[=/](\d{9,11})")
+_YOUTUBE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def cache_key(extractor_key, video_id) -> str:
+    """按提取器（平台）和视频ID生成缓存文件名使用的摘要"""
+    return hashlib.sha1(f"{extractor_key.lower()}:{video_id}".encode("utf-8")).hexdigest()[:32]
+
+
+def key_from_url(url):
+    """不经提取直接从链接得出 (提取器, 视频ID)；目前只识别 YouTube 单视频链接"""
+    try:
+        parsed = urllib.parse.urlparse(url)
+    except ValueError:
+        return None
+    host = (parsed.hostname or "").lower()
+    if "list=" in parsed.query:
+        return None  # 带 list 参数时 yt-dlp 默认下载整个播放列表
+    video_id = None
+    if host == "youtu.be":
+        video_id = parsed.path.strip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            video_id = urllib.parse.parse_qs(parsed.query).get("v", [None])[0]
+        elif parsed.path.startswith(("/shorts/", "/live/", "/embed/")):
+            video_id = parsed.path.split("/")[2]
+    if video_id and _YOUTUBE_ID_PATTERN.match(video_id):
+        return "Youtube", video_id
+    return None
+
+
+def expiry_from_text(text, now, default_ttl=DEFAULT_TTL_SECONDS) -> int:
+    """按信息中最早过期的媒体链接计算缓存失效时间"""
+    expires = [int(value) for value in _EXPIRE_PATTERN.findall(text)]
+    if expires:
+        return min(expires) - EXPIRY_MARGIN_SECONDS
+    return int(now + default_ttl)
+
+
+class InfoCache:
+    """yt-dlp 信息字典（info.json）的磁盘缓存。
+
+    文件名为 <摘要>.<失效时间>.info.json，查找只需列目录不用读文件；
+    过期的条目在写入和启动时清理，总大小超过上限时先删最早写入的。
+    下载进程把 info.json 写到 incoming 目录，任务结束后由 adopt_incoming 收入缓存。
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, default_ttl=DEFAULT_TTL_SECONDS):
+        self.directory = Path(directory)
+        self.incoming_dir = self.directory / "incoming"
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # 探测结果在 I/O 线程写入，任务结束时在界面线程收入，写操作需互斥
+        self._lock = threading.Lock()
+
+    def incoming_template(self) -> str:
+        """供 -o "infojson:..." 使用的输出模板，yt-dlp 会自动追加 .info.json"""
+        return str(self.incoming_dir / "%(extractor_key)s-%(id)s")
+
+    def lookup(self, extractor_key, video_id, now=None) -> Optional[str]:
+        """返回仍然有效的缓存文件路径，没有时返回 None"""
+        now = time.time() if now is None else now
+        for path, expires in self._entries(cache_key(extractor_key, video_id)):
+            if expires > now:
+                return str(path)
+        return None
+
+    def store(self, extractor_key, video_id, text, now=None) -> Optional[Path]:
+        """写入一条信息字典（JSON 文本），替换同一视频的旧条目"""
+        if not extractor_key or not video_id:
+            return None
+        now = time.time() if now is None else now
+        expires = expiry_from_text(text, now, self.default_ttl)
+        if expires <= now:
+            return None
+        digest = cache_key(extractor_key, video_id)
+        path = self.directory / f"{digest}.{expires}{_SUFFIX}"
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                temp_path = path.with_name(path.name + ".tmp")
+                temp_path.write_text(text, encoding="utf-8")
+                os.replace(temp_path, path)
+            except OSError as e:
+                logging.warning(f"写入信息缓存失败: {e}")
+                return None
+            for old_path, _ in self._entries(digest):
+                if old_path != path:
+                    self._remove(old_path)
+            self._evict_locked(now)
+        return path
+
+    def invalidate(self, extractor_key, video_id):
+        with self._lock:
+            for path, _ in self._entries(cache_key(extractor_key, video_id)):
+                self._remove(path)
+
+    def adopt_incoming(self, now=None) -> int:
+        """把下载进程写到 incoming 目录的 info.json 收入缓存，返回收入的数量。
+
+        yt-dlp 先写临时文件再改名，目录里以 .info.json 结尾的都是完整文件。
+        """
+        try:
+            paths = list(self.incoming_dir.glob(f"*{_SUFFIX}"))
+        except OSError:
+            return 0
+        adopted = 0
+        for path in paths:
+            extractor_key, _, video_id = path.name[:-len(_SUFFIX)].partition("-")
+            try:
+                text = path.read_text(encoding="utf-8")
+            except OSError:
+                continue
+            if self.store(extractor_key, video_id, text, now) is not None:
+                adopted += 1
+            self._remove(path)
+        return adopted
+
+    def evict(self, now=None) -> int:
+        """清理过期条目并把总大小压到上限以内，返回删除的文件数"""
+        with self._lock:
+            return self._evict_locked(time.time() if now is None else now)
+
+    def _evict_locked(self, now):
+        removed = 0
+        live = []
+        for path, expires in self._entries():
+            if expires <= now:
+                removed += self._remove(path)
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            live.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in live)
+        for _, size, path in sorted(live):
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+        return removed
+
+    def _entries(self, digest=None):
+        """列出 (路径, 失效时间)；digest 为空时列出全部"""
+        try:
+            paths = self.directory.glob(f"{digest or '*'}.*{_SUFFIX}")
+            entries = []
+            for path in paths:
+                _, _, expires = path.name[:-len(_SUFFIX)].partition(".")
+                if expires.isdigit():
+                    entries.append((path, int(expires)))
+            return sorted(entries, key=lambda entry: entry[1], reverse=True)
+        except OSError:
+            return []
+
+    @staticmethod
+    def _remove(path) -> int:
+        try:
+            path.unlink()
+            return 1
+        except OSError:
+            return 0
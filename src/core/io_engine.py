@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import subprocess
+import threading
+from typing import NamedTuple
+
+from .process_stream import LineFramer, StreamDecoder
+
+_READ_CHUNK_BYTES = 64 * 1024
+_FLUSH_INTERVAL_SECONDS = 0.05
+
+
+class ProcessExited(NamedTuple):
+    """子进程结束；总是排在该进程所有输出事件之后"""
+    key: str
+    exit_code: int
+
+
+def _popen_kwargs() -> dict:
+    """Windows 下隐藏子进程的控制台窗口"""
+    if os.name != "nt":
+        return {}
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return {
+        "creationflags": getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        "startupinfo": startupinfo,
+    }
+
+
+class ProcessIOEngine:
+    """在后台线程的 asyncio 事件循环里管理子进程。
+
+    读取、解码、切行以及调用方提供的 parse_lines 都在 I/O 线程执行；
+    parse_lines 返回的事件与进程结束事件按固定间隔打包，通过 on_batch
+    一次性交出（on_batch 也在 I/O 线程调用，调用方负责转回界面线程）。
+    """
+
+    def __init__(self, on_batch, flush_interval=_FLUSH_INTERVAL_SECONDS):
+        self._on_batch = on_batch
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        # 以下状态只在 I/O 线程内访问
+        self._processes = {}
+        self._kill_requested = set()
+        self._pending_events = []
+        self._flush_handle = None
+
+    def start(self):
+        """启动 I/O 线程；重复调用无副作用"""
+        with self._lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run_loop, args=(self._loop, ready), name="process-io", daemon=True
+            )
+            self._thread.start()
+        ready.wait()
+
+    def spawn(self, key, argv, cwd, env, parse_lines, decoders=None, max_line_chars=None):
+        """启动子进程（线程安全）。
+
+        parse_lines(lines, is_error) 在 I/O 线程中对每批完整行调用，返回要交给界面的事件列表；
+        decoders 为 (stdout, stderr) 解码器，传入可复用任务已检测出的编码；
+        max_line_chars 为单行上限，输出整段 JSON 的进程需要调大。
+        """
+        self.start()
+        # 清掉同名进程以前遗留的结束请求；必须先于 _run_process 排队，
+        # 紧接着调用的 kill() 排在其后，不会被清掉
+        self._loop.call_soon_threadsafe(self._kill_requested.discard, key)
+        asyncio.run_coroutine_threadsafe(
+            self._run_process(key, list(argv), cwd, env, parse_lines, decoders, max_line_chars), self._loop
+        )
+
+    def kill(self, key):
+        """结束指定子进程（线程安全）"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._kill, key)
+
+    def shutdown(self):
+        """结束全部子进程并停止 I/O 线程"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(self._stop, loop)
+        thread.join(timeout=2)
+
+    def _run_loop(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _stop(self, loop):
+        for process in self._processes.values():
+            if process.returncode is None:
+                process.kill()
+        loop.stop()
+
+    def _kill(self, key):
+        process = self._processes.get(key)
+        if process is None:
+            # 进程还在创建中，创建完成后立即结束
+            self._kill_requested.add(key)
+        elif process.returncode is None:
+            process.kill()
+
+    async def _run_process(self, key, argv, cwd, env, parse_lines, decoders, max_line_chars):
+        stdout_decoder, stderr_decoder = decoders or StreamDecoder.pair()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                cwd=cwd,
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                **_popen_kwargs(),
+            )
+        except OSError as exc:
+            self._parse(parse_lines, [f"ERROR: 无法启动进程 {argv[0]}: {exc}"], True)
+            self._post([ProcessExited(key, -1)])
+            return
+
+        self._processes[key] = process
+        if key in self._kill_requested:
+            self._kill_requested.discard(key)
+            process.kill()
+        try:
+            await asyncio.gather(
+                self._pump(process.stdout, stdout_decoder, False, parse_lines, max_line_chars),
+                self._pump(process.stderr, stderr_decoder, True, parse_lines, max_line_chars),
+            )
+            exit_code = await process.wait()
+        finally:
+            self._processes.pop(key, None)
+        self._post([ProcessExited(key, exit_code)])
+
+    async def _pump(self, stream, decoder, is_error, parse_lines, max_line_chars):
+        framer = LineFramer(max_line_chars) if max_line_chars else LineFramer()
+        while True:
+            data = await stream.read(_READ_CHUNK_BYTES)
+            if not data:
+                break
+            self._parse(parse_lines, framer.feed(decoder.decode(data)), is_error)
+        self._parse(parse_lines, framer.feed(decoder.flush()) + framer.flush(), is_error)
+
+    def _parse(self, parse_lines, lines, is_error):
+        if not lines:
+            return
+        try:
+            events = parse_lines(lines, is_error)
+        except Exception:  # noqa: BLE001
+            logging.exception("解析进程输出时出错")
+            return
+        if events:
+            self._post(events)
+
+    def _post(self, events):
+        self._pending_events.extend(events)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self._flush_interval, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        batch, self._pending_events = self._pending_events, []
+        if batch:
+            self._on_batch(batch)
@@ -0,0 +1,102 @@
+import re
+
+# yt-dlp 文本输出的行类型；LineDispatcher 按类型把匹配结果交给注册的处理函数
+BIND = "bind"                              # 开始处理某个视频（提取链接、[info]/[youtube] 步骤）
+ITEM = "item"                              # 播放列表的下一个条目：Downloading item N of M
+DESTINATION = "destination"                # 下载目标文件
+PROGRESS = "progress"                      # 下载进度
+MERGING = "merging"                        # 开始合并音视频
+DELETING = "deleting"                      # 合并完成后删除分离的原始文件
+ALREADY_MERGED = "already_merged"          # 已下载并合并过
+ALREADY_DOWNLOADED = "already_downloaded"  # 文件已存在
+RETRY_LAST = "retry_last"                  # 最后一次重试
+GIVE_UP = "give_up"                        # 重试次数用尽
+
+_VIDEO_ID = r'([A-Za-z0-9_-]{10,20})'
+
+
+def _at_start(pattern):
+    return re.compile(pattern).match
+
+
+def _anywhere(pattern):
+    return re.compile(pattern).search
+
+
+_RETRY_RULES = (
+    (RETRY_LAST, _anywhere(r'Retrying \(10/10\)')),
+    (GIVE_UP, _anywhere(r'Giving up after 10 retries')),
+)
+
+# 行首前缀 -> 依次尝试的 (类型, 匹配函数)；同一行只取第一条匹配且有处理函数的规则。
+# 进度行占绝大多数，放在 [download] 的最前面
+ROUTES = {
+    "[download]": (
+        # 示例1: [download]  23.4% of 50.75MiB at 2.52MiB/s ETA 00:15
+        # 示例2: [download]   1.4% of ~   4.36MiB at   13.74KiB/s ETA 00:23 (frag 0/144)
+        # 示例3: [download] 100% of 5.04MiB in 00:00:03 at 1.20MiB/s（没有速度和剩余时间分组）
+        (PROGRESS, _at_start(r'\[download\]\s+([\d.]+)%\s+of\s+~?\s*([\d.]+\S+)(?:\s+at\s+([\d.]+\S+)\s+ETA\s+(\S+))?')),
+        # --lazy-playlist 时总数未知，显示为 N/A
+        (ITEM, _at_start(r'\[download\] Downloading item (\d+) of (\d+|N/A)')),
+        (DESTINATION, _at_start(r'\[download\] Destination: (.*)')),
+        (ALREADY_MERGED, _anywhere(r'has already been downloaded and merged')),
+        (ALREADY_DOWNLOADED, _anywhere(r'has already been downloaded')),
+        *_RETRY_RULES,
+    ),
+    "[youtube]": (
+        (BIND, _at_start(r'\[youtube\]\s+Extracting URL:\s+https?://[^\s]+[?&]v=' + _VIDEO_ID)),
+        (BIND, _at_start(r'\[youtube\]\s+' + _VIDEO_ID + ':')),
+    ),
+    "[info]": (
+        (BIND, _at_start(r'\[info\]\s+' + _VIDEO_ID + ':')),
+    ),
+    "[Merger]": (
+        (MERGING, _at_start(r'\[Merger\] Merging formats into (.*)')),
+    ),
+    "Deleting": (
+        (DELETING, _at_start(r'Deleting original file ')),
+    ),
+    "WARNING:": _RETRY_RULES,
+    "ERROR:": _RETRY_RULES,
+}
+
+# SABR 格式的多路下载在行首带流编号，如 "2: [download]  18.8% of ..."
+_STREAM_PREFIX = re.compile(r'\d+: ')
+
+
+def line_prefix(line) -> str:
+    """行首的 [标签] 或第一个词"""
+    if line.startswith("["):
+        return line[:line.find("]") + 1]
+    return line.partition(" ")[0]
+
+
+class LineDispatcher:
+    """按行首前缀把 yt-dlp 输出行分发给处理函数。
+
+    handlers 为 {类型: 函数(match, *args)}，只注册关心的类型；
+    每行先按前缀查表，只尝试该前缀下的规则，其余行不做任何正则匹配。
+    """
+
+    def __init__(self, handlers):
+        self._routes = {}
+        for prefix, rules in ROUTES.items():
+            bound = tuple((matcher, handlers[kind]) for kind, matcher in rules if kind in handlers)
+            if bound:
+                self._routes[prefix] = bound
+
+    def dispatch(self, line, *args) -> bool:
+        """处理一行，返回是否有规则匹配；处理函数收到的 match.string 为去掉流编号后的行"""
+        if line[:1].isdigit():
+            stream = _STREAM_PREFIX.match(line)
+            if stream:
+                line = line[stream.end():]
+        rules = self._routes.get(line_prefix(line))
+        if rules is None:
+            return False
+        for matcher, handler in rules:
+            match = matcher(line)
+            if match:
+                handler(match, *args)
+                return True
+        return False
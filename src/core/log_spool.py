@@ -0,0 +1,334 @@
+import gzip
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+DEFAULT_RING_LINES = 500
+DEFAULT_MAX_AGE_DAYS = 7
+DEFAULT_MAX_TOTAL_MB = 200
+
+_UNSAFE_NAME = re.compile(r'[^\w.-]')
+
+
+class LogRecord(NamedTuple):
+    """任务日志中的一行；kind 为 raw（yt-dlp 原生输出）或 message（界面消息，带时间戳）"""
+    kind: str
+    timestamp: str
+    text: str
+
+    @property
+    def display(self) -> str:
+        return self.text if self.kind == "raw" else f"[{self.timestamp}] {self.text}"
+
+
+def _encode(record) -> bytes:
+    return f"{'R' if record.kind == 'raw' else 'M'}\t{record.timestamp}\t{record.text}\n".encode("utf-8")
+
+
+def _decode(raw) -> LogRecord:
+    kind, timestamp, text = raw.decode("utf-8", errors="replace").rstrip("\n").split("\t", 2)
+    return LogRecord("raw" if kind == "R" else "message", timestamp, text)
+
+
+def _display(raw) -> str:
+    """编码后一行的显示文本（与 LogRecord.display 相同），筛选时不必构造 LogRecord"""
+    text = raw.decode("utf-8", errors="replace").rstrip("\n")
+    if text.startswith("R"):
+        return text[3:]
+    _, timestamp, text = text.split("\t", 2)
+    return f"[{timestamp}] {text}"
+
+
+def _split(kind, timestamp, text):
+    """多行文本拆成多条记录，每条记录在文件中正好占一行"""
+    return [LogRecord(kind, timestamp, line) for line in (text.splitlines() or [""])]
+
+
+# 按 yt-dlp 的行首前缀判断级别，用于日志窗口按级别筛选和着色
+_LEVEL_PREFIXES = (
+    (b"ERROR:", logging.ERROR),
+    (b"WARNING:", logging.WARNING),
+    (b"[debug]", logging.DEBUG),
+)
+
+
+def _level(raw) -> int:
+    """编码后一行的级别；正文从第二个制表符之后开始"""
+    text_start = raw.find(b"\t", 2) + 1
+    for prefix, level in _LEVEL_PREFIXES:
+        if raw.startswith(prefix, text_start):
+            return level
+    return logging.INFO
+
+
+def scan_index(path, start=0, max_lines=None):
+    """从 start 偏移处读文件，返回 (行偏移, 行级别, 读到的位置)；最后不完整的一行留到下次。
+
+    max_lines 限制一次读的行数，日志窗口在后台线程分段建立索引。
+    """
+    offsets = array("Q")
+    levels = array("B")
+    position = start
+    with open(path, "rb") as file:
+        file.seek(start)
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            offsets.append(position)
+            levels.append(_level(line))
+            position += len(line)
+            if max_lines is not None and len(offsets) >= max_lines:
+                break
+    return offsets, levels, position
+
+
+class SpoolReader:
+    """按行号随机读取一个任务日志文件。
+
+    offsets/levels 为每行的起始偏移和级别，end 为已建立索引的字节数；
+    scan() 或 extend() 追加新写入的行。读过的行按页缓存，日志窗口滚动时只读可见的几页。
+    """
+
+    PAGE_LINES = 256
+    MAX_PAGES = 64
+
+    def __init__(self, path, offsets=None, levels=None, end=0):
+        self.path = Path(path)
+        self.offsets = offsets if offsets is not None else array("Q")
+        self.levels = levels if levels is not None else array("B")
+        self.end = end
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def extend(self, offsets, levels, end):
+        self.offsets.extend(offsets)
+        self.levels.extend(levels)
+        self.end = end
+
+    def scan(self, max_lines=None) -> int:
+        """为文件中新写入的行建立索引，返回新增行数"""
+        if not self.path.exists():
+            return 0
+        offsets, levels, end = scan_index(self.path, self.end, max_lines)
+        self.extend(offsets, levels, end)
+        return len(offsets)
+
+    def read(self, start, count) -> list:
+        """读取第 start 行起的 count 行"""
+        start = max(0, start)
+        end = min(len(self.offsets), start + count)
+        if start >= end:
+            return []
+        with open(self.path, "rb") as file:
+            file.seek(self.offsets[start])
+            return [_decode(file.readline()) for _ in range(end - start)]
+
+    def line(self, index) -> LogRecord:
+        """读取一行（按页缓存）"""
+        number, offset = divmod(index, self.PAGE_LINES)
+        page = self._pages.get(number)
+        # 最后一页读取时可能还没写满
+        if page is None or (len(page) <= offset and len(page) < self.PAGE_LINES):
+            page = self.read(number * self.PAGE_LINES, self.PAGE_LINES)
+            self._pages[number] = page
+            if len(self._pages) > self.MAX_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        return page[offset]
+
+    def search(self, pattern=None, min_level=0, start=0, stop=None) -> array:
+        """返回 [start, stop) 中级别不低于 min_level、且显示文本匹配 pattern（已编译的正则）的行号。
+
+        顺序读文件，只解码级别符合的行。
+        """
+        stop = len(self.offsets) if stop is None else min(stop, len(self.offsets))
+        matches = array("L")
+        if start >= stop:
+            return matches
+        levels = self.levels
+        with open(self.path, "rb") as file:
+            file.seek(self.offsets[start])
+            for index in range(start, stop):
+                raw = file.readline()
+                if levels[index] < min_level:
+                    continue
+                if pattern is None or pattern.search(_display(raw)):
+                    matches.append(index)
+        return matches
+
+
+class _TaskSpool:
+    """运行中任务的日志：追加写文件，同时维护行偏移、级别和最近若干行"""
+
+    def __init__(self, path, ring_lines):
+        self.path = path
+        # 已结束的任务又有输出时重新打开，已有内容的索引需要先补上
+        if path.exists():
+            self.offsets, self.levels, self.size = scan_index(path)
+        else:
+            self.offsets, self.levels, self.size = array("Q"), array("B"), 0
+        self.ring = deque(maxlen=ring_lines)
+        self.file = open(path, "ab")
+
+    def append(self, records):
+        for record in records:
+            data = _encode(record)
+            self.file.write(data)
+            self.offsets.append(self.size)
+            self.levels.append(_level(data))
+            self.size += len(data)
+            self.ring.append(record)
+
+    def close(self):
+        self.file.close()
+
+
+class LogSpool:
+    """每个任务一个只追加的日志文件（config/logs 下），内存中只保留运行中任务的最近若干行。
+
+    任务结束后 finish() 关闭文件并释放内存，查看日志时再从文件读取。
+    文件名带本次启动的时间，程序重启后任务编号重新从 1 开始也不会冲突；
+    prune() 把以前的日志压缩为 .gz，删除超过保留天数的日志，总大小超出上限时从最旧的删起。
+    """
+
+    def __init__(self, directory, ring_lines=DEFAULT_RING_LINES,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS, max_total_mb=DEFAULT_MAX_TOTAL_MB):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ring_lines = max(1, int(ring_lines))
+        self.max_age_days = max_age_days
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.session = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self._paths = {}  # task_id -> 文件路径（包括已结束的任务）
+        self._open = {}   # task_id -> _TaskSpool（运行中的任务）
+        self._lock = threading.Lock()
+
+    def path_for(self, task_id) -> Path:
+        path = self._paths.get(task_id)
+        if path is None:
+            path = self.directory / f"{self.session}-{_UNSAFE_NAME.sub('_', str(task_id))}.log"
+            self._paths[task_id] = path
+        return path
+
+    def append_raw(self, task_id, text):
+        self._append(task_id, _split("raw", "", text))
+
+    def append_message(self, task_id, text, timestamp):
+        self._append(task_id, _split("message", timestamp, text))
+
+    def _append(self, task_id, records):
+        with self._lock:
+            spool = self._open.get(task_id)
+            if spool is None:
+                spool = self._open[task_id] = _TaskSpool(self.path_for(task_id), self.ring_lines)
+            spool.append(records)
+
+    def recent(self, task_id) -> list:
+        """运行中任务的最近若干行；已结束的任务返回空列表"""
+        with self._lock:
+            spool = self._open.get(task_id)
+            return list(spool.ring) if spool else []
+
+    def finish(self, task_id):
+        """任务结束：关闭文件，释放内存中的行和偏移"""
+        with self._lock:
+            spool = self._open.pop(task_id, None)
+        if spool is not None:
+            spool.close()
+
+    def flush(self, task_id):
+        """把运行中任务已写的内容刷到文件，供读取"""
+        with self._lock:
+            spool = self._open.get(task_id)
+            if spool is not None:
+                spool.file.flush()
+
+    def reader(self, task_id):
+        """返回任务日志的 SpoolReader。
+
+        运行中的任务直接复制已有的索引；已结束的任务返回尚未建立索引的读取器，
+        由调用方 scan()（日志窗口在后台线程分段进行）。
+        """
+        with self._lock:
+            spool = self._open.get(task_id)
+            if spool is not None:
+                spool.file.flush()
+                return SpoolReader(spool.path, array("Q", spool.offsets), array("B", spool.levels), spool.size)
+        return SpoolReader(self.path_for(task_id))
+
+    def records(self, task_id):
+        """按顺序逐行读出任务的全部日志"""
+        reader = self.reader(task_id)
+        reader.scan()
+        for start in range(0, len(reader), reader.PAGE_LINES):
+            yield from reader.read(start, reader.PAGE_LINES)
+
+    def close(self):
+        with self._lock:
+            spools, self._open = list(self._open.values()), {}
+        for spool in spools:
+            spool.close()
+
+    def prune_async(self):
+        threading.Thread(target=self.prune, name="log-spool-prune", daemon=True).start()
+
+    def prune(self, now=None):
+        """压缩以前的日志，按保留天数和总大小删除旧日志；本次启动的日志不动"""
+        now = time.time() if now is None else now
+        files = []
+        for path in self.directory.iterdir():
+            if not path.name.endswith((".log", ".log.gz")) or path.name.startswith(self.session):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if self.max_age_days and now - stat.st_mtime > self.max_age_days * 86400:
+                self._remove(path)
+                continue
+            if path.suffix == ".log":
+                path = self._compress(path, stat.st_mtime) or path
+            try:
+                files.append((path.stat().st_mtime, path.stat().st_size, path))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in files) + sum(
+            path.stat().st_size for path in self.directory.glob(f"{self.session}-*.log")
+        )
+        for _, size, path in sorted(files):
+            if total <= self.max_total_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _compress(path, mtime):
+        target = path.with_name(path.name + ".gz")
+        try:
+            with open(path, "rb") as source, gzip.open(target, "wb") as compressed:
+                shutil.copyfileobj(source, compressed)
+            os.utime(target, (mtime, mtime))
+            path.unlink()
+            return target
+        except OSError as exc:
+            logging.warning(f"压缩任务日志失败: {path}: {exc}")
+            return None
+
+    @staticmethod
+    def _remove(path):
+        try:
+            path.unlink()
+        except OSError as exc:
+            logging.warning(f"删除任务日志失败: {path}: {exc}")
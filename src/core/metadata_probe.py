@@ -0,0 +1,248 @@
+import itertools
+import json
+import logging
+from typing import NamedTuple, Optional
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from .info_cache import key_from_url
+from .io_engine import ProcessExited, ProcessIOEngine
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_CONCURRENT = 2
+# -J 把整个信息字典输出为一行，带完整格式列表时可达数 MB
+_MAX_JSON_LINE_CHARS = 64 * 1024 * 1024
+# 只有时长没有大小时按约 4Mbps 估算，仅用于排序
+_ESTIMATED_BYTES_PER_SECOND = 512 * 1024
+
+
+class FormatSummary(NamedTuple):
+    format_id: str
+    ext: Optional[str]
+    height: Optional[int]
+    vcodec: Optional[str]
+    acodec: Optional[str]
+    filesize: Optional[float]
+
+
+class VideoMetadata(NamedTuple):
+    url: str
+    extractor_key: Optional[str]
+    video_id: Optional[str]
+    title: Optional[str]
+    duration: Optional[float]
+    filesize_approx: Optional[float]
+    formats: tuple  # FormatSummary
+    entry_count: Optional[int]  # 播放列表条目数；单个视频为 None
+
+    @property
+    def estimated_bytes(self) -> Optional[float]:
+        """用于调度排序的预估下载量"""
+        if self.filesize_approx:
+            return self.filesize_approx
+        if self.duration:
+            return self.duration * _ESTIMATED_BYTES_PER_SECOND
+        return None
+
+
+class _ProbeResult(NamedTuple):
+    batch_id: int
+    index: int
+    metadata: Optional[VideoMetadata]
+
+
+def build_args(urls) -> list[str]:
+    """返回一次探测多个 URL 的参数。
+
+    -J 对每个 URL 输出一行 JSON，失败的 URL 输出 null，顺序与参数一致；
+    --flat-playlist 让播放列表只列出条目而不逐个解析。
+    """
+    return ["--dump-single-json", "--flat-playlist", "--ignore-errors", "--no-warnings", "--", *urls]
+
+
+def _estimate_filesize(info) -> Optional[float]:
+    size = info.get("filesize") or info.get("filesize_approx")
+    if size:
+        return float(size)
+    # 分离的音视频流合并下载时，大小为各流之和
+    requested = info.get("requested_formats") or ()
+    sizes = [fmt.get("filesize") or fmt.get("filesize_approx") for fmt in requested]
+    if sizes and all(sizes):
+        return float(sum(sizes))
+    return None
+
+
+def parse_info(url, info) -> VideoMetadata:
+    """把 yt-dlp 的信息字典整理为 VideoMetadata"""
+    formats = tuple(
+        FormatSummary(
+            str(fmt.get("format_id")),
+            fmt.get("ext"),
+            fmt.get("height"),
+            fmt.get("vcodec"),
+            fmt.get("acodec"),
+            fmt.get("filesize") or fmt.get("filesize_approx"),
+        )
+        for fmt in info.get("formats") or ()
+        if fmt.get("format_id") is not None
+    )
+    entry_count = None
+    if info.get("_type") == "playlist":
+        entry_count = info.get("playlist_count") or len(info.get("entries") or ())
+    duration = info.get("duration")
+    return VideoMetadata(
+        url=url,
+        extractor_key=info.get("extractor_key"),
+        video_id=info.get("id"),
+        title=info.get("title"),
+        duration=float(duration) if duration else None,
+        filesize_approx=_estimate_filesize(info),
+        formats=formats,
+        entry_count=entry_count,
+    )
+
+
+def parse_line(url, line, info_cache=None) -> Optional[VideoMetadata]:
+    """解析 -J 输出的一行；失败的 URL（null）或无法解析时返回 None。
+
+    传入 info_cache 时，单个视频的完整信息同时写入缓存，之后下载可跳过提取。
+    """
+    try:
+        info = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(info, dict):
+        return None
+    metadata = parse_info(info.get("original_url") or url, info)
+    if info_cache is not None and metadata.formats and info.get("_type", "video") == "video":
+        info_cache.store(metadata.extractor_key, metadata.video_id, line)
+    return metadata
+
+
+class MetadataProbe(QObject):
+    """下载前的元数据探测阶段。
+
+    排队中的 URL 按相同的 yt-dlp 参数（平台参数、cookies）分组，每批一个
+    yt-dlp -J 进程，与正在进行的下载并行；进程读取和 JSON 解析在后台 I/O
+    线程完成，结果经 metadata_ready 回到界面线程。
+    """
+
+    metadata_ready = pyqtSignal(str, object)  # task_id, VideoMetadata
+    _batch_ready = pyqtSignal(object)
+
+    def __init__(self, environment, batch_size=DEFAULT_BATCH_SIZE,
+                 max_concurrent=DEFAULT_MAX_CONCURRENT, info_cache=None, cookie_broker=None, parent=None):
+        super().__init__(parent)
+        self._environment = environment  # 返回子进程环境变量 dict 的回调
+        self._info_cache = info_cache
+        self._cookie_broker = cookie_broker
+        self.batch_size = max(1, int(batch_size or 1))
+        self.max_concurrent = max(1, int(max_concurrent or 1))
+        self._pending = {}  # 基础参数 -> [(task_id, url)]
+        self._running = {}  # batch_id -> [(task_id, url)]
+        self._batch_ids = itertools.count(1)
+        self._batch_ready.connect(self._handle_batch)
+        self._engine = ProcessIOEngine(on_batch=self._batch_ready.emit)
+        # 同一轮事件中连续加入的 URL 攒成一批再启动
+        self._dispatch_timer = QTimer(self)
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.setInterval(0)
+        self._dispatch_timer.timeout.connect(self._dispatch)
+
+    def enqueue(self, task_id, url, base_args):
+        """加入探测队列；base_args 为 yt-dlp 程序路径及平台相关参数。
+
+        信息缓存中已有该视频时不再探测，返回 False。
+        """
+        if self._info_cache is not None:
+            key = key_from_url(url)
+            if key and self._info_cache.lookup(*key):
+                return False
+        self._pending.setdefault(tuple(base_args), []).append((task_id, url))
+        if not self._dispatch_timer.isActive():
+            self._dispatch_timer.start()
+        return True
+
+    def discard(self, task_id):
+        """任务已开始下载时移出待探测队列，避免与下载同时提取同一链接"""
+        for base_args, items in list(self._pending.items()):
+            items[:] = [item for item in items if item[0] != task_id]
+            if not items:
+                del self._pending[base_args]
+
+    def cancel_all(self):
+        """清空待探测队列并结束正在运行的探测进程"""
+        self._pending.clear()
+        for batch_id in list(self._running):
+            self._engine.kill(self._batch_key(batch_id))
+        self._running.clear()
+
+    def shutdown(self):
+        self._pending.clear()
+        self._running.clear()
+        self._engine.shutdown()
+
+    def pending_count(self):
+        return sum(len(items) for items in self._pending.values())
+
+    @staticmethod
+    def _batch_key(batch_id):
+        return f"probe-{batch_id}"
+
+    def _dispatch(self):
+        while len(self._running) < self.max_concurrent and self._pending:
+            base_args = next(iter(self._pending))
+            items = self._pending[base_args]
+            batch, self._pending[base_args] = items[:self.batch_size], items[self.batch_size:]
+            if not self._pending[base_args]:
+                del self._pending[base_args]
+
+            batch_id = next(self._batch_ids)
+            self._running[batch_id] = batch
+            urls = [url for _, url in batch]
+            logging.debug(f"元数据探测批次 {batch_id}: {len(urls)} 个链接")
+            args = list(base_args)
+            if self._cookie_broker is not None:
+                # 同时运行的探测进程各用一份 cookies 副本，进程结束后删除
+                args = self._cookie_broker.rewrite_args(args, self._batch_key(batch_id))
+            self._engine.spawn(
+                self._batch_key(batch_id),
+                [*args, *build_args(urls)],
+                None,
+                self._environment(),
+                lambda lines, is_error, batch_id=batch_id, urls=urls, counter=itertools.count(): (
+                    self._parse_lines(batch_id, urls, counter, lines, is_error)
+                ),
+                max_line_chars=_MAX_JSON_LINE_CHARS,
+            )
+
+    def _parse_lines(self, batch_id, urls, counter, lines, is_error):
+        """在 I/O 线程中解析 -J 输出；第 n 行 JSON 对应第 n 个 URL"""
+        if is_error:
+            for line in lines:
+                if line.startswith("ERROR:"):
+                    logging.debug(f"元数据探测失败: {line}")
+            return []
+
+        results = []
+        for line in lines:
+            if not (line.startswith("{") or line == "null"):
+                continue
+            index = next(counter)
+            if index < len(urls):
+                results.append(_ProbeResult(batch_id, index, parse_line(urls[index], line, self._info_cache)))
+        return results
+
+    def _handle_batch(self, events):
+        for event in events:
+            if isinstance(event, ProcessExited):
+                self._running.pop(int(event.key.rsplit("-", 1)[1]), None)
+                if self._cookie_broker is not None:
+                    self._cookie_broker.release(event.key)
+                continue
+            batch = self._running.get(event.batch_id)
+            if batch is None or event.metadata is None:
+                continue
+            task_id, _ = batch[event.index]
+            self.metadata_ready.emit(task_id, event.metadata)
+        self._dispatch()
@@ -0,0 +1,86 @@
+import logging
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+RAW_LOG_PREFIX = "[RAW_LOG]"
+PROGRESS_PREFIX = "下载进度"
+DEFAULT_FLUSH_INTERVAL_MS = 100  # 10 Hz
+
+
+class OutputCoalescer(QObject):
+    """在 Downloader 与界面之间合并输出消息，按固定帧率批量刷新。
+
+    - 原生日志：同一任务一帧内的多段合并为一条；
+    - 进度消息：连续的进度只保留最新一条，其他状态消息按原顺序保留，
+      不会把“下载完成”排到旧进度前面；
+    - 没有待刷新的消息时定时器停止，空闲时不占用界面线程。
+    """
+
+    output_ready = pyqtSignal(str, str)
+
+    def __init__(self, interval_ms=DEFAULT_FLUSH_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self._raw_logs = {}
+        self._messages = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self.received_count = 0
+        self.emitted_count = 0
+        self.dropped_count = 0  # 被更新的进度覆盖而丢弃的进度消息
+        self.merged_count = 0   # 合并进同一条的原生日志片段
+
+    def push(self, task_id, message):
+        """接收 Downloader.output_received 的消息，等下一帧再统一发出"""
+        self.received_count += 1
+        if message.startswith(RAW_LOG_PREFIX):
+            chunks = self._raw_logs.setdefault(task_id, [])
+            if chunks:
+                self.merged_count += 1
+            chunks.append(message[len(RAW_LOG_PREFIX):])
+        else:
+            queue = self._messages.setdefault(task_id, [])
+            if message.startswith(PROGRESS_PREFIX) and queue and queue[-1].startswith(PROGRESS_PREFIX):
+                queue[-1] = message
+                self.dropped_count += 1
+            else:
+                queue.append(message)
+
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self, task_id=None):
+        """立即发出待刷新的消息；指定 task_id 时只刷新该任务（任务结束前调用）"""
+        if task_id is None:
+            task_ids = list(dict.fromkeys([*self._raw_logs, *self._messages]))
+        else:
+            task_ids = [task_id]
+
+        for current_id in task_ids:
+            chunks = self._raw_logs.pop(current_id, None)
+            if chunks:
+                self._emit(current_id, RAW_LOG_PREFIX + "\n".join(chunks))
+            for message in self._messages.pop(current_id, ()):
+                self._emit(current_id, message)
+
+        if not self._raw_logs and not self._messages:
+            self._timer.stop()
+
+    def stats(self):
+        return {
+            "received": self.received_count,
+            "emitted": self.emitted_count,
+            "dropped": self.dropped_count,
+            "merged": self.merged_count,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(
+            f"界面消息合并统计: 收到 {stats['received']} 条, 实际刷新 {stats['emitted']} 条, "
+            f"丢弃过期进度 {stats['dropped']} 条, 合并原生日志 {stats['merged']} 条"
+        )
+
+    def _emit(self, task_id, message):
+        self.emitted_count += 1
+        self.output_ready.emit(task_id, message)
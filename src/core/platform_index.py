@@ -0,0 +1,100 @@
+import functools
+import logging
+import time
+
+DEFAULT_CACHE_SIZE = 4096
+GENERIC_PLATFORM = 'generic'
+# 同类日志最短间隔，批量粘贴大量链接时不会逐条刷屏
+_LOG_INTERVAL_SECONDS = 1.0
+
+_logger = logging.getLogger(__name__)
+
+
+def extract_host(url):
+    """从 URL 中取出规范化的主机名（小写、去掉用户信息、端口和末尾的点）。
+
+    与 urllib.parse.urlparse 一致：没有 “//” 的字符串没有主机名。
+    """
+    start = url.find("//")
+    if start < 0:
+        return ""
+    start += 2
+    end = len(url)
+    for separator in "/?#":
+        index = url.find(separator, start, end)
+        if index >= 0:
+            end = index
+    netloc = url[start:end]
+    at = netloc.rfind("@")
+    if at >= 0:
+        netloc = netloc[at + 1:]
+    if netloc.startswith("["):
+        # IPv6 字面量，端口在方括号之后
+        return netloc[1:netloc.find("]")].lower() if "]" in netloc else ""
+    colon = netloc.find(":")
+    if colon >= 0:
+        netloc = netloc[:colon]
+    return netloc.rstrip(".").lower()
+
+
+class _RateLimitedLogger:
+    """按时间间隔限流的日志：间隔内的后续消息只计数，下一条输出时一并说明"""
+
+    def __init__(self, interval=_LOG_INTERVAL_SECONDS):
+        self.interval = interval
+        self._last = float("-inf")
+        self._suppressed = 0
+
+    def log(self, message, level=logging.DEBUG):
+        if not _logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            self._suppressed += 1
+            return
+        if self._suppressed:
+            message = f"{message}（此前 {self._suppressed} 条同类日志已省略）"
+            self._suppressed = 0
+        self._last = now
+        _logger.log(level, message)
+
+
+class PlatformIndex:
+    """按主机名后缀识别视频平台。
+
+    主机名逐级去掉最左边的标签在索引里查找（m.youtube.com → youtube.com），
+    只匹配完整的域名标签，不会把 notyoutube.com 认成 youtube.com；
+    识别结果按主机名缓存，重复的链接只需取一次主机名、查一次缓存。
+    """
+
+    def __init__(self, domains_by_platform, cache_size=DEFAULT_CACHE_SIZE):
+        self._suffixes = {}
+        for platform, domains in domains_by_platform.items():
+            for domain in domains:
+                self._suffixes.setdefault(domain.lower().strip("."), platform)
+        self._log = _RateLimitedLogger()
+        self.classify_host = functools.lru_cache(maxsize=cache_size)(self._classify_host)
+
+    def classify(self, url):
+        """返回 URL 所属平台，未识别时返回 'generic'"""
+        return self.classify_host(extract_host(url or ""))
+
+    def cache_info(self):
+        return self.classify_host.cache_info()
+
+    def _classify_host(self, host):
+        # 只在缓存未命中（新主机名）时执行，日志也只在这里输出
+        if host.startswith("www."):
+            host = host[4:]
+        suffix = host
+        while suffix:
+            platform = self._suffixes.get(suffix)
+            if platform is not None:
+                self._log.log(f"检测到平台: {platform} (主机: {host})")
+                return platform
+            dot = suffix.find(".")
+            if dot < 0:
+                break
+            suffix = suffix[dot + 1:]
+        self._log.log(f"未识别的平台，使用通用配置 (主机: {host or '无'})")
+        return GENERIC_PLATFORM
@@ -0,0 +1,140 @@
+import json
+import math
+import os
+import tempfile
+from collections import deque
+from typing import NamedTuple, Optional
+
+from .archive_store import archive_id
+
+# 每个下载进程一次领取的条目上限；进程启动（含 PO Token 初始化）有固定开销，太小会被启动时间拖慢
+DEFAULT_BATCH_SIZE = 20
+MAX_PARALLELISM = 8
+# 内存中最多保留的待下载条目；列举远快于下载，超出的条目暂存到临时文件
+DEFAULT_MEMORY_ENTRIES = 2000
+
+# 列举时每个条目输出一行；filename 按下载用的输出模板生成，取其目录即可得到
+# 与单进程模式一致（已经过 yt-dlp 文件名清理）的播放列表文件夹
+ENTRY_TEMPLATE = "%(ie_key|)s\t%(id)s\t%(url)s\t%(filename)s"
+NAME_TEMPLATE = "%(title)s [%(id)s].%(ext)s"
+
+
+class PlaylistEntry(NamedTuple):
+    extractor_key: str
+    video_id: str
+    url: str
+    directory: str  # 该条目所属播放列表的保存目录
+
+    @property
+    def archive_id(self) -> Optional[str]:
+        return archive_id(self.extractor_key, self.video_id) if self.extractor_key else None
+
+
+def enumerate_args(url, output_template) -> list[str]:
+    """只列出播放列表条目（--flat-playlist 不提取每个视频），每个条目一行"""
+    return ["--flat-playlist", "--print", ENTRY_TEMPLATE, "-o", output_template, "--", url]
+
+
+def parse_entry(line) -> Optional[PlaylistEntry]:
+    """解析 ENTRY_TEMPLATE 输出的一行；不是条目的行返回 None"""
+    parts = line.rstrip("\r\n").split("\t", 3)
+    if len(parts) != 4:
+        return None
+    extractor_key, video_id, url, filename = parts
+    if video_id in ("", "NA") or url in ("", "NA"):
+        return None
+    return PlaylistEntry(extractor_key if extractor_key != "NA" else "", video_id, url, os.path.dirname(filename))
+
+
+def worker_output_template(directory) -> str:
+    """下载进程直接传入视频链接，拿不到 playlist_title，改为使用列举时得到的目录"""
+    return os.path.join(directory.replace("%", "%%"), NAME_TEMPLATE)
+
+
+def worker_args(base_args, batch) -> list[str]:
+    """一批条目（同一目录）的下载参数"""
+    return [*base_args, "-o", worker_output_template(batch[0].directory), "--", *(entry.url for entry in batch)]
+
+
+class FanoutQueue:
+    """等待分配给下载进程的播放列表条目（先进先出）。
+
+    条目不预先按进程数切分，空闲的进程每次领取一批：剩余条目较多时每批
+    batch_size 个，接近结束时按进程数平分，避免最后只剩一个进程在下载。
+    列举还没结束时有多少领多少，第一个条目列出后即可开始下载。
+    内存中只保留队首的 memory_entries 个条目，之后的按顺序写入临时文件，
+    队首取空一半时再读回，条目数量再多内存占用也不变。
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.batch_size = max(1, int(batch_size))
+        self.memory_entries = max(self.batch_size, int(memory_entries))
+        self.closed = False  # 列举已结束，不会再有新条目
+        self.discovered = 0
+        self._pending = deque()
+        self._spill = None  # 临时文件，写在末尾，从 _spill_offset 处读
+        self._spill_offset = 0
+        self._spilled = 0  # 临时文件中尚未读回的条目数
+
+    def __len__(self):
+        return len(self._pending) + self._spilled
+
+    @property
+    def done(self) -> bool:
+        return self.closed and not len(self)
+
+    def add(self, entries):
+        for entry in entries:
+            self.discovered += 1
+            if self._spilled or len(self._pending) >= self.memory_entries:
+                self._spill_entry(entry)
+            else:
+                self._pending.append(entry)
+
+    def close(self):
+        self.closed = True
+
+    def discard(self):
+        """删除临时文件；之后不能再使用"""
+        self._pending.clear()
+        self._spilled = 0
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def next_batch(self, workers=1) -> list:
+        """取出一批同一目录的条目，没有可分配的条目时返回空列表"""
+        if len(self._pending) < self.memory_entries // 2:
+            self._refill()
+        if not self._pending:
+            return []
+        if self.closed:
+            size = min(self.batch_size, max(1, math.ceil(len(self) / max(1, workers))))
+        else:
+            size = self.batch_size
+        directory = self._pending[0].directory
+        batch = []
+        while self._pending and len(batch) < size and self._pending[0].directory == directory:
+            batch.append(self._pending.popleft())
+        return batch
+
+    def _spill_entry(self, entry):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile("w+", encoding="utf-8", prefix="playlist-")
+        self._spill.seek(0, os.SEEK_END)
+        self._spill.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._spilled += 1
+
+    def _refill(self):
+        if not self._spilled:
+            return
+        self._spill.seek(self._spill_offset)
+        while self._spilled and len(self._pending) < self.memory_entries:
+            self._pending.append(PlaylistEntry(*json.loads(self._spill.readline())))
+            self._spilled -= 1
+        self._spill_offset = self._spill.tell()
+        if not self._spilled:
+            # 全部读回，下次溢出时从头写
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._spill_offset = 0
@@ -0,0 +1,127 @@
+import re
+import urllib.parse
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from .progress_protocol import RECORD_PREFIX
+
+# --break-on-existing / --break-match-filters 触发时 yt-dlp 的退出码
+BREAK_EXIT_CODE = 101
+# 按上传日期停止时往前多留的天数：首播、定时发布的视频上传日期可能早于已下载的视频
+DATE_MARGIN_DAYS = 7
+
+# 新视频总在最前面的来源：YouTube 频道（视频/短视频/直播标签页、UU 开头的上传列表）和 B 站个人空间投稿
+_YOUTUBE_CHANNEL_PATH = re.compile(r'^/(?:@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)(?:/(?:videos|shorts|streams|featured))?/?$')
+_BILIBILI_SPACE_PATH = re.compile(r'^/\d+(?:/(?:video|upload/video))?/?$')
+
+# 每个下载完成（移动到最终位置）的视频输出一行，用于统计下载数并取得上传日期
+_SEEN_TEMPLATE = f"after_move:{RECORD_PREFIX}W|%(id)s|%(upload_date)s"
+_SEEN_RECORD = f"{RECORD_PREFIX}W|"
+_ITEM_LINE = re.compile(r'^\[download\] Downloading item \d+ of ')
+_RECORDED_LINE = re.compile(r'^\[download\] ([A-Za-z0-9_-]+): .*has already been recorded in the archive')
+
+
+class Watermark(NamedTuple):
+    """收藏播放列表上次同步到的位置：最新条目的视频ID和已下载视频中最新的上传日期"""
+    video_id: str
+    upload_date: Optional[str]  # YYYYMMDD
+    synced_at: str
+
+    @classmethod
+    def from_dict(cls, data) -> Optional["Watermark"]:
+        if not isinstance(data, dict) or not data.get("video_id"):
+            return None
+        return cls(data["video_id"], data.get("upload_date"), data.get("synced_at", ""))
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def is_newest_first(url) -> bool:
+    """该来源是否按发布时间从新到旧排列；只有这样遇到已下载的视频才能确定后面都是旧的"""
+    parsed = urllib.parse.urlsplit(url)
+    host = parsed.netloc.lower()
+    if host.endswith("youtube.com"):
+        if parsed.path == "/playlist":
+            return (urllib.parse.parse_qs(parsed.query).get("list") or [""])[0].startswith("UU")
+        return bool(_YOUTUBE_CHANNEL_PATH.match(parsed.path))
+    if host == "space.bilibili.com":
+        return bool(_BILIBILI_SPACE_PATH.match(parsed.path))
+    return False
+
+
+def sync_args(url, watermark, use_archive) -> list[str]:
+    """增量同步的 yt-dlp 参数。
+
+    --lazy-playlist 让 yt-dlp 边获取列表边处理，停止时不再获取剩余的分页；
+    有水位且来源从新到旧排列时，遇到下载记录中的视频（--break-on-existing）、
+    上次的最新条目或早于水位日期的视频即停止。第一次同步没有水位，完整检查一遍。
+    """
+    args = ["--lazy-playlist"]
+    if watermark is None or not is_newest_first(url):
+        return args
+    if use_archive:
+        args.append("--break-on-existing")
+    filters = [f"id!={watermark.video_id}"]
+    if watermark.upload_date:
+        try:
+            since = datetime.strptime(watermark.upload_date, "%Y%m%d") - timedelta(days=DATE_MARGIN_DAYS)
+            filters.append(f"upload_date>={since:%Y%m%d}")
+        except ValueError:
+            pass
+    args.extend(["--break-match-filters", " & ".join(filters)])
+    return args
+
+
+def record_args() -> list[str]:
+    """下载进程输出每个视频的上传日期；--print 默认隐含 --quiet 和 --simulate，这里关掉"""
+    return ["--no-quiet", "--no-simulate", "--print", _SEEN_TEMPLATE]
+
+
+def is_download_record(line) -> bool:
+    """是否为 record_args 输出的下载完成记录"""
+    return line.startswith(_SEEN_RECORD)
+
+
+class SyncTracker:
+    """从 yt-dlp 输出统计本次同步检查过的条目，并得出新的水位。
+
+    不加锁，只能在一个线程中使用：单进程模式下由 I/O 线程 feed，进程结束后界面线程读取；
+    并行模式下条目由列举进程统计（note_entries），下载进程只把下载完成记录送回界面线程再 feed。
+    """
+
+    def __init__(self):
+        self.scanned = 0
+        self.downloaded = 0
+        self.first_id = None  # 本次遇到的第一个（最新的）条目
+        self.newest_date = None
+
+    def note_entries(self, video_ids):
+        """并行模式下列举进程列出的条目"""
+        for video_id in video_ids:
+            self.scanned += 1
+            self.first_id = self.first_id or video_id
+
+    def feed(self, line):
+        if is_download_record(line):
+            video_id, _, upload_date = line[len(_SEEN_RECORD):].partition("|")
+            self.downloaded += 1
+            self.first_id = self.first_id or video_id
+            if upload_date.isdigit() and len(upload_date) == 8:
+                self.newest_date = max(self.newest_date or upload_date, upload_date)
+            return
+        if _ITEM_LINE.match(line):
+            self.scanned += 1
+            return
+        recorded = _RECORDED_LINE.match(line)
+        if recorded:
+            self.scanned += 1
+            self.first_id = self.first_id or recorded.group(1)
+
+    def advance(self, watermark, now=None) -> Optional[Watermark]:
+        """本次同步全部成功后的新水位；没有遇到任何条目时位置不变，只更新同步时间"""
+        video_id = self.first_id or (watermark.video_id if watermark else None)
+        if video_id is None:
+            return watermark
+        dates = [date for date in (self.newest_date, watermark.upload_date if watermark else None) if date]
+        return Watermark(video_id, max(dates) if dates else None, (now or datetime.now()).isoformat(timespec="seconds"))
@@ -0,0 +1,202 @@
+import codecs
+import locale
+from collections import deque
+
+# 单行最长保留的字符数；超过时强制切出，避免没有换行的输出让缓冲无限增长
+_MAX_PARTIAL_CHARS = 64 * 1024
+
+
+class LineFramer:
+    """增量切行器：把任意切分的输出块还原成完整的行。
+
+    同时把 \\r 视为行结束符，yt-dlp 非 --newline 模式下的进度刷新就是用 \\r 分隔的。
+    未结束的半行留在内部，下一块到达后再拼接。
+    """
+
+    def __init__(self, max_partial=_MAX_PARTIAL_CHARS):
+        self._partial = ""
+        self._max_partial = max_partial
+
+    def feed(self, text):
+        """喂入一块文本，返回其中已完整的非空行（已去除首尾空白）。"""
+        if not text:
+            return []
+
+        data = self._partial + text if self._partial else text
+        parts = data.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        self._partial = parts.pop()
+        if len(self._partial) > self._max_partial:
+            parts.append(self._partial)
+            self._partial = ""
+        return [line for line in (part.strip() for part in parts) if line]
+
+    def flush(self):
+        """取出残留的最后半行（进程结束时调用）。"""
+        line = self._partial.strip()
+        self._partial = ""
+        return [line] if line else []
+
+    def reset(self):
+        self._partial = ""
+
+
+class _EncodingHint:
+    """同一任务的多个输出流共享的编码检测结果。"""
+
+    def __init__(self):
+        self.encoding = None
+
+
+class StreamDecoder:
+    """有状态的增量解码器，每个进程的每条输出流各用一个。
+
+    跨块截断的多字节字符会留到下一块再解码，不会被误判成其他编码。
+    编码只检测一次：出现非 ASCII 内容且 UTF-8 解码成功即锁定 UTF-8；
+    UTF-8 解码失败则依次尝试系统首选编码、CP949、GB18030，结果在同一任务的
+    stdout/stderr 之间共享，之后都用锁定的编码带 replace 解码。
+    """
+
+    _FALLBACK_ENCODINGS = ('cp949', 'gb18030')
+
+    def __init__(self, hint=None, preferred_encoding=None):
+        self._hint = hint or _EncodingHint()
+        self._preferred_encoding = preferred_encoding
+        self._decoder = None
+        self._clean = True  # 锁定编码后，增量解码器内没有残留的半个字符
+        self._probe = codecs.getincrementaldecoder('utf-8')('strict')
+
+    @classmethod
+    def pair(cls, preferred_encoding=None):
+        """返回共享编码检测结果的 (stdout, stderr) 解码器"""
+        hint = _EncodingHint()
+        return cls(hint, preferred_encoding), cls(hint, preferred_encoding)
+
+    @property
+    def encoding(self):
+        return self._hint.encoding
+
+    def decode(self, data):
+        if not data:
+            return ""
+        if self._decoder is None and self._hint.encoding is not None:
+            self._lock(self._hint.encoding)
+        if self._decoder is not None:
+            return self._decode_locked(data)
+
+        pending = self._probe.getstate()[0]
+        try:
+            text = self._probe.decode(data)
+        except UnicodeDecodeError:
+            return self._detect_fallback(pending + data)
+
+        if not text.isascii():
+            self._hint.encoding = 'utf-8'
+            self._lock('utf-8', self._probe.getstate())
+        return text
+
+    def _decode_locked(self, data):
+        # 没有残留字节时直接整块解码（C 实现，比增量解码器快得多），
+        # 只有块尾截断或确有非法字节时才走增量解码器
+        if self._clean:
+            try:
+                return data.decode(self._hint.encoding)
+            except UnicodeDecodeError:
+                pass
+        text = self._decoder.decode(data)
+        self._clean = not self._decoder.getstate()[0]
+        return text
+
+    def flush(self):
+        """进程结束时取出残留字节"""
+        decoder = self._decoder or self._probe
+        try:
+            return decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return ""
+        finally:
+            decoder.reset()
+            self._clean = True
+
+    def reset(self):
+        """重试同一任务时清空未解码的字节，保留已检测出的编码"""
+        self._probe.reset()
+        if self._decoder is not None:
+            self._decoder.reset()
+        self._clean = True
+
+    def _lock(self, encoding, state=None):
+        self._decoder = codecs.getincrementaldecoder(encoding)('replace')
+        if state is not None:
+            self._decoder.setstate(state)
+        self._clean = not self._decoder.getstate()[0]
+
+    def _detect_fallback(self, raw):
+        candidates = []
+        preferred = self._preferred_encoding or locale.getpreferredencoding(False)
+        for encoding in (preferred, *self._FALLBACK_ENCODINGS):
+            try:
+                name = codecs.lookup(encoding).name
+            except LookupError:
+                continue
+            if name not in candidates and name != 'utf-8':
+                candidates.append(name)
+
+        for encoding in candidates:
+            decoder = codecs.getincrementaldecoder(encoding)('strict')
+            try:
+                text = decoder.decode(raw)
+            except UnicodeDecodeError:
+                continue
+            self._hint.encoding = encoding
+            self._decoder = decoder
+            self._decoder.errors = 'replace'
+            self._clean = not self._decoder.getstate()[0]
+            return text
+
+        self._hint.encoding = 'utf-8'
+        self._lock('utf-8')
+        return self._decode_locked(raw)
+
+
+class TailBuffer:
+    """只保留最近若干行的环形缓冲，供错误分类和重试判断使用。"""
+
+    def __init__(self, max_lines=200):
+        self._lines = deque(maxlen=max_lines)
+
+    def extend(self, lines):
+        self._lines.extend(lines)
+
+    def text(self):
+        return "\n".join(self._lines)
+
+    def clear(self):
+        self._lines.clear()
+
+    def __len__(self):
+        return len(self._lines)
+
+
+class MarkerMatcher:
+    """在输出流过时查找标记（不区分大小写），命中即记下，之后不再查找该标记。
+
+    判断不依赖尾部缓冲里还留着哪些行：早期出现、随后被大量日志挤出尾部的标记也不会漏掉。
+    标记不含换行，整批行合并后查找一次即可，结果与逐行查找相同。
+    """
+
+    def __init__(self, markers):
+        self._markers = tuple(marker.lower() for marker in markers)
+        self._remaining = list(self._markers)
+        self.matched = set()
+
+    def feed(self, lines):
+        if not self._remaining or not lines:
+            return
+        text = "\n".join(lines).lower()
+        for marker in [marker for marker in self._remaining if marker in text]:
+            self._remaining.remove(marker)
+            self.matched.add(marker)
+
+    def clear(self):
+        self._remaining = list(self._markers)
+        self.matched.clear()
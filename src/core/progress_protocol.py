@@ -0,0 +1,142 @@
+import json
+from typing import NamedTuple, Optional, Union
+
+# 结构化记录的行前缀；普通 yt-dlp 输出不会以它开头，判断一次 startswith 即可分流
+RECORD_PREFIX = "@@ytdlp-gui|"
+_PREFIX_LENGTH = len(RECORD_PREFIX)
+
+
+class ProgressEvent(NamedTuple):
+    video_id: Optional[str]
+    status: str
+    downloaded_bytes: Optional[float]
+    total_bytes: Optional[float]
+    total_bytes_estimate: Optional[float]
+    speed: Optional[float]
+    eta: Optional[float]
+
+    @property
+    def total(self) -> Optional[float]:
+        return self.total_bytes or self.total_bytes_estimate
+
+    @property
+    def percent(self) -> float:
+        total = self.total
+        if not total:
+            return 0.0
+        return min(100.0, (self.downloaded_bytes or 0) * 100.0 / total)
+
+
+class VideoEvent(NamedTuple):
+    """格式选定、即将开始下载某个视频"""
+    video_id: str
+    title: str
+
+
+class FileEvent(NamedTuple):
+    """视频处理完成并移动到最终位置"""
+    video_id: str
+    filepath: str
+
+
+class PostprocessEvent(NamedTuple):
+    video_id: Optional[str]
+    status: str
+    postprocessor: str
+
+
+ProtocolEvent = Union[ProgressEvent, VideoEvent, FileEvent, PostprocessEvent]
+
+
+def build_args() -> list[str]:
+    """返回让 yt-dlp 输出结构化记录的参数。
+
+    --print 默认隐含 --quiet 和 --simulate，这里显式关掉，保留原有日志并照常下载；
+    标题和路径用 j 转换输出为 JSON 字符串，不受分隔符和控制台编码影响。
+    """
+    prefix = RECORD_PREFIX
+    return [
+        "--newline",
+        "--progress",
+        "--no-quiet",
+        "--no-simulate",
+        "--progress-template",
+        f"download:{prefix}P|%(progress.status)s|%(progress.downloaded_bytes)s|%(progress.total_bytes)s"
+        f"|%(progress.total_bytes_estimate)s|%(progress.speed)s|%(progress.eta)s|%(info.id)s",
+        "--progress-template",
+        f"postprocess:{prefix}M|%(progress.status)s|%(progress.postprocessor)s|%(info.id)s",
+        "--print", f"video:{prefix}V|%(id)s|%(title)j",
+        "--print", f"after_move:{prefix}F|%(id)s|%(filepath)j",
+    ]
+
+
+def _number(value: str) -> Optional[float]:
+    if not value or value == "NA" or value == "None":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _optional(value: str) -> Optional[str]:
+    return None if not value or value == "NA" else value
+
+
+def parse_record(line: str) -> Optional[ProtocolEvent]:
+    """把一行输出解析为结构化事件；不是结构化记录时返回 None。"""
+    if not line.startswith(RECORD_PREFIX):
+        return None
+
+    kind = line[_PREFIX_LENGTH:_PREFIX_LENGTH + 1]
+    body = line[_PREFIX_LENGTH + 2:]
+    try:
+        if kind == "P":
+            status, downloaded, total, estimate, speed, eta, video_id = body.split("|", 6)
+            return ProgressEvent(
+                _optional(video_id), status, _number(downloaded), _number(total),
+                _number(estimate), _number(speed), _number(eta),
+            )
+        if kind == "V":
+            video_id, title = body.split("|", 1)
+            return VideoEvent(video_id, json.loads(title))
+        if kind == "F":
+            video_id, filepath = body.split("|", 1)
+            return FileEvent(video_id, json.loads(filepath))
+        if kind == "M":
+            status, postprocessor, video_id = body.split("|", 2)
+            return PostprocessEvent(_optional(video_id), status, postprocessor)
+    except ValueError:
+        # 字段数不对或 JSON 不完整，按普通输出处理
+        return None
+    return None
+
+
+def strip_records(text: str) -> str:
+    """去掉文本中的结构化记录行，只留下给人看的输出"""
+    if RECORD_PREFIX not in text:
+        return text
+    return "\n".join(line for line in text.splitlines() if not line.lstrip().startswith(RECORD_PREFIX))
+
+
+def format_size(num_bytes) -> str:
+    """按 yt-dlp 的习惯把字节数格式化为 50.75MiB 形式"""
+    if num_bytes is None:
+        return "未知"
+    size = float(num_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.2f}{unit}"
+        size /= 1024
+
+
+def format_eta(seconds) -> str:
+    """把剩余秒数格式化为 00:15 / 01:02:03"""
+    if seconds is None:
+        return "未知"
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
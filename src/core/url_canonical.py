@@ -0,0 +1,126 @@
+import re
+import urllib.parse
+from typing import NamedTuple
+
+# 预编译的链接模式；Downloader.normalize_xiaohongshu_url / is_user_profile_url 也使用这里的模式
+XIAOHONGSHU_USER_VIDEO_PATTERN = re.compile(r'/user/profile/[a-fA-F0-9]+/([a-fA-F0-9]+)')
+XIAOHONGSHU_PROFILE_PATTERN = re.compile(r'/user/profile/[a-fA-F0-9]+/?(\?|$)')
+_XIAOHONGSHU_NOTE_PATTERN = re.compile(r'/(?:explore|discovery/item)/([a-fA-F0-9]+)')
+
+_YOUTUBE_PATH_PATTERN = re.compile(r'^/(?:shorts|live|embed|v)/([A-Za-z0-9_-]{11})')
+_YOUTUBE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{11}$')
+_BILIBILI_VIDEO_PATTERN = re.compile(r'/video/(BV[0-9A-Za-z]{10}|av\d+)', re.IGNORECASE)
+_DOUYIN_VIDEO_PATTERN = re.compile(r'/(?:share/)?(?:video|note)/(\d+)')
+
+
+class VideoKey(NamedTuple):
+    """同一内容的不同写法得到相同的键；无法识别内容ID时退回规范化后的链接"""
+    platform: str
+    video_id: str
+
+
+# 只需要取少数几个参数，直接用预编译的模式匹配，比 parse_qsl 解析整个查询串快得多
+_QUERY_PATTERNS = {
+    name: re.compile(rf'(?:^|[&;]){name}=([^&;#]*)')
+    for name in ("v", "list", "p", "modal_id")
+}
+
+
+def _query_value(parsed, name):
+    match = _QUERY_PATTERNS[name].search(parsed.query)
+    return match.group(1) if match else None
+
+
+def _youtube_id(parsed, host):
+    playlist_id = _query_value(parsed, "list")
+    if playlist_id:
+        # 带 list 参数时 yt-dlp 默认下载整个播放列表
+        return f"list={playlist_id}"
+    if host == "youtu.be":
+        video_id = parsed.path.strip("/").split("/")[0]
+        return video_id if _YOUTUBE_ID_PATTERN.match(video_id) else None
+    if parsed.path == "/watch":
+        video_id = _query_value(parsed, "v") or ""
+        return video_id if _YOUTUBE_ID_PATTERN.match(video_id) else None
+    match = _YOUTUBE_PATH_PATTERN.match(parsed.path)
+    return match.group(1) if match else None
+
+
+def _bilibili_id(parsed, host):
+    match = _BILIBILI_VIDEO_PATTERN.search(parsed.path)
+    if not match:
+        return None
+    video_id = match.group(1)
+    video_id = video_id.lower() if video_id[:2].lower() == "av" else "BV" + video_id[2:]
+    # 多P视频的不同分P是不同的下载，第 1 P 与不带 p 参数相同
+    page = _query_value(parsed, "p")
+    if page and page != "1":
+        video_id += f"?p={page}"
+    return video_id
+
+
+def _douyin_id(parsed, host):
+    modal_id = _query_value(parsed, "modal_id")
+    if modal_id and modal_id.isdigit():
+        return modal_id
+    match = _DOUYIN_VIDEO_PATTERN.search(parsed.path)
+    return match.group(1) if match else None
+
+
+def _xiaohongshu_id(parsed, host):
+    match = _XIAOHONGSHU_NOTE_PATTERN.search(parsed.path) or XIAOHONGSHU_USER_VIDEO_PATTERN.search(parsed.path)
+    return match.group(1).lower() if match else None
+
+
+_ID_EXTRACTORS = {
+    'youtube': _youtube_id,
+    'bilibili': _bilibili_id,
+    'douyin': _douyin_id,
+    'xiaohongshu': _xiaohongshu_id,
+}
+
+
+def _normalized_url(parsed):
+    """主机名小写、去掉 www. 和片段、去掉路径末尾的斜杠"""
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parsed.path.rstrip("/")
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{host}{path}{query}"
+
+
+def canonical_key(url, platform) -> VideoKey:
+    """返回链接对应内容的键，platform 为 Downloader.detect_platform 的结果"""
+    try:
+        parsed = urllib.parse.urlsplit(url)
+    except ValueError:
+        return VideoKey(platform, url)
+    extractor = _ID_EXTRACTORS.get(platform)
+    if extractor is not None:
+        video_id = extractor(parsed, (parsed.hostname or "").lower())
+        if video_id:
+            return VideoKey(platform, video_id)
+    # 短链接（youtu.be 以外）和无法识别的链接按规范化后的链接比较
+    return VideoKey(platform, _normalized_url(parsed))
+
+
+def dedupe_urls(lines, detect_platform):
+    """去掉空行和指向同一内容的重复链接，保持首次出现的顺序。
+
+    返回 (保留的链接, 被去掉的重复链接)。
+    """
+    unique = []
+    duplicates = []
+    seen = set()
+    for line in lines:
+        url = line.strip()
+        if not url:
+            continue
+        key = canonical_key(url, detect_platform(url))
+        if key in seen:
+            duplicates.append(url)
+            continue
+        seen.add(key)
+        unique.append(url)
+    return unique, duplicates
@@ -0,0 +1,11 @@
+# yt-dlp 的输出分两档：默认只有正常的进度和提示（结构化模式下还有进度记录）；
+# 调试档加 --verbose，额外输出大量 [debug] 行（请求、格式排序、ffmpeg 命令行等）。
+# 只在自动重试、手动重试失败的任务或用户勾选“调试日志”时使用调试档。
+VERBOSE_FLAG = "--verbose"
+
+
+def with_debug(args, position=0) -> list[str]:
+    """返回加上 --verbose 的参数（插入到 position 处，通常在程序路径之后）；已有时原样返回"""
+    if VERBOSE_FLAG in args:
+        return args
+    return [*args[:position], VERBOSE_FLAG, *args[position:]]
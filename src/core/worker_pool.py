@@ -0,0 +1,308 @@
+import importlib.util
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from pathlib import Path
+
+# progress hook 触发非常频繁，worker 端按此间隔节流后再发回主进程
+_PROGRESS_INTERVAL_SECONDS = 0.25
+_LISTENER_POLL_SECONDS = 0.5
+_PROGRESS_FIELDS = (
+    "status",
+    "downloaded_bytes",
+    "total_bytes",
+    "total_bytes_estimate",
+    "speed",
+    "eta",
+    "filename",
+)
+
+
+def is_available() -> bool:
+    """当前 Python 环境能否以库形式导入 yt-dlp。"""
+    return importlib.util.find_spec("yt_dlp") is not None
+
+
+def find_plugin_archives(bin_dir: Path) -> list[str]:
+    """返回 bin/yt-dlp-plugins 下的插件 zip，worker 启动时挂到 sys.path。"""
+    plugin_dir = Path(bin_dir) / "yt-dlp-plugins"
+    if not plugin_dir.exists():
+        return []
+    return [str(path) for path in sorted(plugin_dir.glob("*.zip"))]
+
+
+class _EventLogger:
+    """把 yt-dlp 的屏幕输出转成日志事件发回主进程。"""
+
+    def __init__(self, send, task_id):
+        self._send = send
+        self._task_id = task_id
+
+    def debug(self, msg):
+        self._send(("log", self._task_id, msg, False))
+
+    def info(self, msg):
+        self._send(("log", self._task_id, msg, False))
+
+    def warning(self, msg):
+        self._send(("log", self._task_id, msg, True))
+
+    def error(self, msg):
+        self._send(("log", self._task_id, msg, True))
+
+
+def _run_job(yt_dlp, send, task_id, argv, cwd):
+    """在 worker 内执行一次下载，返回与命令行一致的退出码。"""
+    last_progress = [0.0, None]
+
+    def progress_hook(d):
+        status = d.get("status")
+        now = time.monotonic()
+        if status == "downloading" and status == last_progress[1] and now - last_progress[0] < _PROGRESS_INTERVAL_SECONDS:
+            return
+        last_progress[0], last_progress[1] = now, status
+        info = d.get("info_dict") or {}
+        payload = {key: d.get(key) for key in _PROGRESS_FIELDS}
+        payload["id"] = info.get("id")
+        payload["title"] = info.get("title")
+        send(("progress", task_id, payload))
+
+    def postprocessor_hook(d):
+        send(("postprocess", task_id, {
+            "status": d.get("status"),
+            "postprocessor": d.get("postprocessor"),
+        }))
+
+    try:
+        parsed = yt_dlp.parse_options(argv)
+        ydl_opts = dict(parsed.ydl_opts)
+        ydl_opts["logger"] = _EventLogger(send, task_id)
+        ydl_opts["progress_hooks"] = [progress_hook]
+        ydl_opts["postprocessor_hooks"] = [postprocessor_hook]
+        # 进度改由 hook 上报，关闭文本进度条避免重复解析
+        ydl_opts["noprogress"] = True
+        os.chdir(cwd)
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.download(parsed.urls)
+    except yt_dlp.utils.DownloadError:
+        # 具体错误已经通过 logger.error 发出
+        return 1
+    except SystemExit as exc:
+        return exc.code if isinstance(exc.code, int) else 1
+    except Exception as exc:  # noqa: BLE001
+        send(("log", task_id, f"ERROR: {exc}", True))
+        return 1
+
+
+def _worker_main(worker_id, job_conn, event_conn, plugin_archives):
+    """worker 进程入口：只导入一次 yt-dlp 和插件，之后循环处理任务。"""
+    for archive in plugin_archives:
+        if archive not in sys.path:
+            sys.path.insert(0, archive)
+
+    import yt_dlp
+
+    send = event_conn.send
+    send(("ready", worker_id))
+    while True:
+        try:
+            job = job_conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        task_id, argv, cwd = job
+        send(("started", task_id, worker_id))
+        exit_code = _run_job(yt_dlp, send, task_id, argv, cwd)
+        send(("finished", task_id, exit_code))
+
+
+class _WorkerHandle:
+    def __init__(self, worker_id, process, job_conn, event_conn):
+        self.worker_id = worker_id
+        self.process = process
+        self.job_conn = job_conn
+        self.event_conn = event_conn
+        self.ready = False
+        self.task_id = None
+
+
+class WorkerPool:
+    """常驻 yt-dlp worker 进程池。
+
+    每个 worker 通过两条单向管道与主进程通信（任务下发 / 事件上报），
+    取消任务时直接结束对应 worker 并补一个新的，不会影响其他任务。
+    事件回调 on_event 在后台监听线程中调用。
+    """
+
+    def __init__(self, size, plugin_archives=(), on_event=None):
+        self.size = max(1, int(size or 1))
+        self.plugin_archives = list(plugin_archives)
+        self.on_event = on_event or (lambda event: None)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._pending = deque()
+        self._cancelled = set()
+        self._next_worker_id = 0
+        self._listener = None
+        self._running = False
+
+    def start(self):
+        """启动 worker 与监听线程；重复调用无副作用。"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            for _ in range(self.size):
+                self._spawn_worker_locked()
+
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def submit(self, task_id, argv, cwd):
+        """提交任务；argv 为不含可执行文件名的 yt-dlp 参数列表。"""
+        self.start()
+        with self._lock:
+            self._cancelled.discard(task_id)
+            self._pending.append((task_id, list(argv), cwd))
+            self._dispatch_locked()
+
+    def cancel(self, task_id):
+        """取消任务：排队中的直接移除，运行中的结束所在 worker。"""
+        removed = False
+        with self._lock:
+            for job in list(self._pending):
+                if job[0] == task_id:
+                    self._pending.remove(job)
+                    removed = True
+                    break
+            else:
+                for worker in self._workers.values():
+                    if worker.task_id == task_id:
+                        self._cancelled.add(task_id)
+                        worker.process.terminate()
+                        break
+
+        # 回调放在锁外，避免回调里再次提交任务时死锁
+        if removed:
+            self.on_event(("finished", task_id, -1))
+
+    def shutdown(self):
+        """结束全部 worker。"""
+        with self._lock:
+            self._running = False
+            self._pending.clear()
+            workers = list(self._workers.values())
+            self._workers.clear()
+
+        for worker in workers:
+            try:
+                worker.job_conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=2)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def _spawn_worker_locked(self):
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+
+        job_recv, job_send = self._ctx.Pipe(duplex=False)
+        event_recv, event_send = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, job_recv, event_send, self.plugin_archives),
+            name=f"yt-dlp-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        # 子进程已持有对端，主进程关闭不用的一端，worker 退出时才能收到 EOF
+        job_recv.close()
+        event_send.close()
+        self._workers[worker_id] = _WorkerHandle(worker_id, process, job_send, event_recv)
+
+    def _dispatch_locked(self):
+        for worker in self._workers.values():
+            if not self._pending:
+                return
+            if worker.ready and worker.task_id is None:
+                task_id, argv, cwd = self._pending.popleft()
+                worker.task_id = task_id
+                try:
+                    worker.job_conn.send((task_id, argv, cwd))
+                except (OSError, BrokenPipeError):
+                    # worker 已退出，任务放回队列，由监听线程补 worker 后再派发
+                    worker.task_id = None
+                    worker.ready = False
+                    self._pending.appendleft((task_id, argv, cwd))
+
+    def _listen(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                connections = {worker.event_conn: worker for worker in self._workers.values()}
+
+            for conn in wait(list(connections), timeout=_LISTENER_POLL_SECONDS):
+                worker = connections[conn]
+                try:
+                    event = conn.recv()
+                except (EOFError, OSError):
+                    self._handle_worker_exit(worker)
+                    continue
+                self._handle_event(worker, event)
+
+    def _handle_event(self, worker, event):
+        kind = event[0]
+        if kind == "ready":
+            with self._lock:
+                worker.ready = True
+                self._dispatch_locked()
+            return
+
+        if kind == "started":
+            with self._lock:
+                cancelled = event[1] in self._cancelled
+            if cancelled:
+                worker.process.terminate()
+            return
+
+        if kind == "finished":
+            with self._lock:
+                worker.task_id = None
+                self._dispatch_locked()
+
+        self.on_event(event)
+
+    def _handle_worker_exit(self, worker):
+        """worker 退出（被取消或崩溃）：补发结束事件并补一个新的 worker。"""
+        worker.event_conn.close()
+        failed = []
+        with self._lock:
+            self._workers.pop(worker.worker_id, None)
+            task_id = worker.task_id
+            self._cancelled.discard(task_id)
+            if task_id is not None:
+                failed.append((task_id, "yt-dlp worker 已退出"))
+            if not worker.ready and task_id is None:
+                # 还没就绪就退出，通常是 yt-dlp 无法导入；不再补 worker，避免反复重启
+                logging.error(f"yt-dlp worker {worker.worker_id} 初始化失败")
+                if not self._workers:
+                    self._running = False
+                    failed.extend((job[0], "yt-dlp worker 初始化失败") for job in self._pending)
+                    self._pending.clear()
+            elif self._running:
+                self._spawn_worker_locked()
+
+        for failed_task_id, message in failed:
+            self.on_event(("log", failed_task_id, message, True))
+            self.on_event(("finished", failed_task_id, -1))
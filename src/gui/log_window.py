@@ -1,18 +1,121 @@
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QTextEdit, QPushButton, 
-                            QHBoxLayout, QApplication, QLabel)
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QListView, QPushButton,
+                            QHBoxLayout, QApplication, QLabel, QLineEdit,
+                            QComboBox, QAbstractItemView)
+from PyQt6.QtCore import Qt, QTimer, QAbstractListModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QFont, QColor
+import logging
+import re
+import threading
+from array import array
+from core.log_spool import scan_index
+
+# 后台建立索引、筛选时每段处理的行数
+_LOAD_CHUNK_LINES = 20000
+_SEARCH_CHUNK_LINES = 50000
+
+_LEVEL_COLORS = {
+    logging.DEBUG: QColor("#1F8F1F"),
+    logging.WARNING: QColor("#FFD54F"),
+    logging.ERROR: QColor("#FF5252"),
+}
+
+
+class LogLineModel(QAbstractListModel):
+    """日志文件的行模型：按行号从 SpoolReader 读取，视图只请求可见的行。
+
+    设置筛选结果后只显示匹配的行号。
+    """
+
+    def __init__(self, reader, parent=None):
+        super().__init__(parent)
+        self.reader = reader
+        self._rows = None  # 筛选后的行号；None 表示显示全部
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows) if self._rows is not None else len(self.reader)
+
+    def line_number(self, row):
+        return self._rows[row] if self._rows is not None else row
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        number = self.line_number(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.reader.line(number).display
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return _LEVEL_COLORS.get(self.reader.levels[number])
+        return None
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def append_lines(self, offsets, levels, end, log_filter=None):
+        """追加新建立索引的行；有筛选时只插入 log_filter 匹配的行"""
+        if not offsets:
+            self.reader.end = end
+            return
+        if self._rows is None:
+            first = len(self.reader)
+            self.beginInsertRows(QModelIndex(), first, first + len(offsets) - 1)
+            self.reader.extend(offsets, levels, end)
+            self.endInsertRows()
+            return
+        start = len(self.reader)
+        self.reader.extend(offsets, levels, end)
+        self.append_matches(self.reader.search(*log_filter, start=start))
+
+    def append_matches(self, matches):
+        if not matches:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(matches) - 1)
+        self._rows.extend(matches)
+        self.endInsertRows()
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
 
 
 class LogWindow(QDialog):
-    """极客风格的实时日志窗口"""
-    
-    def __init__(self, task_id, parent=None):
+    """极客风格的实时日志窗口。
+
+    日志内容来自 LogSpool 的任务日志文件：打开时在后台线程分段建立行索引，
+    列表只渲染可见的行；运行中的任务有新输出时增量读取。
+    """
+
+    # 后台线程交回界面线程：索引段 (偏移, 级别, 读到的位置)、加载结束、筛选结果
+    chunk_loaded = pyqtSignal(object, object, int)
+    load_finished = pyqtSignal()
+    filter_ready = pyqtSignal(int, object, int)
+
+    def __init__(self, task_id, log_spool, parent=None):
         super().__init__(parent)
         self.task_id = task_id
-        self.log_content = []  # 存储所有日志内容
+        self.log_spool = log_spool
         self._auto_scroll_follow_bottom = True
+        self._loading = True
+        self._closed = False
+        self._refresh_pending = False
+        self._filter = None  # (正则, 最低级别)；None 表示不筛选
+        self._filtering = False
+        self._filter_generation = 0
+        self.model = LogLineModel(log_spool.reader(task_id), self)
         self.init_ui()
+
+        self.chunk_loaded.connect(self._append_lines)
+        self.load_finished.connect(self._handle_load_finished)
+        self.filter_ready.connect(self._handle_filter_ready)
+        threading.Thread(
+            target=self._load_history,
+            args=(self.model.reader.end,),
+            daemon=True,
+        ).start()
         
     def init_ui(self):
         """初始化界面"""
@@ -61,6 +164,10 @@ class LogWindow(QDialog):
         # 创建标题栏
         title_bar = self.create_title_bar()
         layout.addWidget(title_bar)
+
+        # 创建筛选栏
+        filter_bar = self.create_filter_bar()
+        layout.addWidget(filter_bar)
         
         # 创建日志显示区域
         self.log_display = self.create_log_display()
@@ -120,11 +227,61 @@ class LogWindow(QDialog):
         
         return title_bar
         
+    def create_filter_bar(self):
+        """创建筛选栏：正则和最低级别"""
+        from PyQt6.QtWidgets import QWidget
+
+        filter_bar = QWidget()
+        filter_bar.setFixedHeight(34)
+        filter_bar.setStyleSheet("""
+            QWidget { background-color: #001100; border-radius: 4px; }
+            QLineEdit, QComboBox {
+                background-color: #000000;
+                color: #33FF33;
+                border: 1px solid #003300;
+                border-radius: 3px;
+                padding: 2px 6px;
+                font-family: "微软雅黑", "Microsoft YaHei", "黑体", "SimHei";
+                font-size: 11px;
+            }
+            QLabel {
+                color: #33FF33;
+                font-family: "微软雅黑", "Microsoft YaHei", "黑体", "SimHei";
+                font-size: 11px;
+                background: transparent;
+            }
+        """)
+
+        layout = QHBoxLayout(filter_bar)
+        layout.setContentsMargins(8, 4, 8, 4)
+
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("正则筛选，回车应用（如 ERROR|Merger）")
+        self.pattern_input.returnPressed.connect(self.apply_filter)
+        layout.addWidget(self.pattern_input, 1)
+
+        self.level_combo = QComboBox()
+        for label, level in (("全部级别", 0), ("信息及以上", logging.INFO),
+                             ("警告及以上", logging.WARNING), ("仅错误", logging.ERROR)):
+            self.level_combo.addItem(label, level)
+        self.level_combo.currentIndexChanged.connect(self.apply_filter)
+        layout.addWidget(self.level_combo)
+
+        self.status_label = QLabel("正在加载...")
+        layout.addWidget(self.status_label)
+
+        return filter_bar
+
     def create_log_display(self):
-        """创建日志显示区域"""
-        log_display = QTextEdit()
-        log_display.setReadOnly(True)
-        
+        """创建日志显示区域：只渲染可见行的列表"""
+        log_display = QListView()
+        log_display.setModel(self.model)
+        # 行高一致时视图不再逐行计算尺寸，只请求可见的行
+        log_display.setUniformItemSizes(True)
+        log_display.setWordWrap(False)
+        log_display.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        log_display.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
         # 设置中文字体
         font = QFont("微软雅黑", 10)
         if not font.exactMatch():
@@ -138,7 +295,7 @@ class LogWindow(QDialog):
         
         # 极客风格样式
         log_display.setStyleSheet("""
-            QTextEdit {
+            QListView {
                 background-color: #000000;
                 color: #33FF33;
                 border: 1px solid #003300;
@@ -167,22 +324,11 @@ class LogWindow(QDialog):
                 background: transparent;
             }
         """)
-        
-        # 初始化显示
-        log_display.setText(f"""
->>> YT-DLP 实时下载日志监控器 <<<
-===========================================
-[系统] 任务ID: {self.task_id}
-[系统] 状态: 等待下载数据...
-[系统] 提示: 使用 Ctrl+A 全选文本
-[系统] 提示: 点击复制按钮复制日志
-===========================================
-
-""")
 
         log_display.verticalScrollBar().valueChanged.connect(
             self._handle_log_scroll_changed
         )
+        self.model.rowsInserted.connect(self._follow_bottom)
         
         return log_display
         
@@ -241,54 +387,132 @@ class LogWindow(QDialog):
             y = (screen.height() - self.height()) // 2
             self.move(x, y)
             
-    def append_log(self, text, timestamp=None):
-        """添加日志内容"""
-        self.log_content.append(text)
-        
-        # 格式化日志文本（添加时间戳和前缀）
-        if timestamp is None:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_text = f"[{timestamp}] {text}"
-        
-        self._append_to_display(formatted_text)
-        
-    def append_raw_log(self, text):
-        """添加原生日志内容（不添加时间戳格式化）"""
-        self.log_content.append(text)
-        self._append_to_display(text)
-
-    def load_log_history(self, entries):
-        """加载任务已有的完整日志历史。"""
-        for entry in entries:
-            if entry.get("kind") == "raw":
-                self.append_raw_log(entry.get("text", ""))
-            else:
-                self.append_log(
-                    entry.get("text", ""),
-                    timestamp=entry.get("timestamp"),
-                )
+    def notify_appended(self):
+        """任务有新输出（已写入 LogSpool），稍后合并读取"""
+        if self._refresh_pending:
+            return
+        self._refresh_pending = True
+        QTimer.singleShot(200, self._refresh)
+
+    def _refresh(self):
+        self._refresh_pending = False
+        # 加载历史期间由后台线程继续读到文件末尾，结束后再补读
+        if self._loading or self._closed:
+            return
+        self.log_spool.flush(self.task_id)
+        reader = self.model.reader
+        if reader.path.exists():
+            self._append_lines(*scan_index(reader.path, reader.end))
+
+    def _load_history(self, start):
+        """后台线程：从 start 偏移起分段建立索引"""
+        path = self.model.reader.path
+        end = start
+        while not self._closed and path.exists():
+            offsets, levels, end = scan_index(path, end, _LOAD_CHUNK_LINES)
+            if not offsets:
+                break
+            self.chunk_loaded.emit(offsets, levels, end)
+        self.load_finished.emit()
+
+    def _handle_load_finished(self):
+        self._loading = False
+        self._update_status()
+        self._refresh()
+
+    def _append_lines(self, offsets, levels, end):
+        if self._filtering:
+            # 后台筛选进行中，新行在筛选完成后补上
+            self.model.reader.extend(offsets, levels, end)
+        else:
+            self.model.append_lines(offsets, levels, end, self._filter)
+        self._update_status()
+
+    def apply_filter(self):
+        """按正则和最低级别筛选，在后台线程分段查找"""
+        text = self.pattern_input.text()
+        min_level = self.level_combo.currentData() or 0
+        try:
+            # 输入不含大写字母时忽略大小写
+            flags = 0 if any(char.isupper() for char in text) else re.IGNORECASE
+            pattern = re.compile(text, flags) if text else None
+        except re.error as exc:
+            self.status_label.setText(f"正则无效: {exc}")
+            return
+
+        self._filter_generation += 1
+        if pattern is None and not min_level:
+            self._filter = None
+            self._filtering = False
+            self.model.set_rows(None)
+            self._update_status()
+            return
+
+        self._filter = (pattern, min_level)
+        self._filtering = True
+        self.model.set_rows(array("L"))
+        self.status_label.setText("正在筛选...")
+        threading.Thread(
+            target=self._run_filter,
+            args=(self._filter_generation, self._filter, len(self.model.reader)),
+            daemon=True,
+        ).start()
+
+    def _run_filter(self, generation, log_filter, stop):
+        """后台线程：查找 [0, stop) 中的匹配行；有新的筛选条件时放弃"""
+        matches = array("L")
+        for start in range(0, stop, _SEARCH_CHUNK_LINES):
+            if generation != self._filter_generation or self._closed:
+                return
+            matches.extend(self.model.reader.search(
+                *log_filter, start=start, stop=min(stop, start + _SEARCH_CHUNK_LINES)
+            ))
+        self.filter_ready.emit(generation, matches, stop)
+
+    def _handle_filter_ready(self, generation, matches, stop):
+        if generation != self._filter_generation:
+            return
+        self._filtering = False
+        # 补上筛选期间新增的行
+        matches.extend(self.model.reader.search(*self._filter, start=stop))
+        self.model.set_rows(matches)
+        self._update_status()
+
+    def _update_status(self):
+        total = len(self.model.reader)
+        if self._loading:
+            self.status_label.setText(f"正在加载... {total} 行")
+        elif self._filtering:
+            self.status_label.setText("正在筛选...")
+        elif self._filter is not None:
+            self.status_label.setText(f"匹配 {len(self.model.rows)} / {total} 行")
+        else:
+            self.status_label.setText(f"共 {total} 行")
 
     def _handle_log_scroll_changed(self, _value):
         """用户离开底部时暂停自动滚动，回到底部后恢复。"""
         scrollbar = self.log_display.verticalScrollBar()
         self._auto_scroll_follow_bottom = scrollbar.value() >= scrollbar.maximum()
 
-    def _append_to_display(self, text):
-        """向日志窗口追加文本，并按需跟随到底部。"""
-        should_scroll = self._auto_scroll_follow_bottom
-        self.log_display.append(text)
-        if should_scroll:
-            scrollbar = self.log_display.verticalScrollBar()
-            scrollbar.setValue(scrollbar.maximum())
-        
+    def _follow_bottom(self, *_args):
+        """新增行后按需跟随到底部。"""
+        if self._auto_scroll_follow_bottom:
+            self.log_display.scrollToBottom()
+
+    def closeEvent(self, event):
+        self._closed = True
+        super().closeEvent(event)
+
     def copy_logs_to_clipboard(self):
         """复制日志到剪贴板"""
         clipboard = QApplication.clipboard()
         
-        # 获取所有日志内容
-        all_logs = self.log_display.toPlainText()
-        clipboard.setText(all_logs)
+        # 有选中的行时只复制选中的行，否则复制当前显示（含筛选）的全部行
+        rows = sorted(index.row() for index in self.log_display.selectionModel().selectedIndexes())
+        if not rows:
+            rows = range(self.model.rowCount())
+        reader = self.model.reader
+        clipboard.setText("\n".join(reader.line(self.model.line_number(row)).display for row in rows))
         
         # 临时显示复制成功提示
         button = self.sender()
@@ -2,14 +2,20 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QLineEdit, QPushButton, 
                             QTextEdit, QFileDialog, QLabel, QComboBox,
                             QProgressBar, QSizePolicy, QFrame, QMessageBox,
-                            QScrollArea, QMenu, QGroupBox, QCheckBox)
-from PyQt6.QtCore import Qt, QProcess, QEvent, pyqtSignal
+                            QScrollArea, QMenu, QGroupBox, QCheckBox, QSpinBox)
+from PyQt6.QtCore import Qt, QProcess, QEvent, QTimer, pyqtSignal
 from PyQt6.QtGui import QTextCursor, QFont, QIcon
 import os
 import datetime
 from core.downloader import Downloader
+from core.format_probe import QUALITY_PRESETS, evaluate_preset
+from core.output_coalescer import OutputCoalescer
+from core.url_canonical import dedupe_urls
+from core.progress_protocol import format_eta, format_size
 from core.config import Config
 from core.youtube_pot import prewarm_youtube_pot
+from core.log_spool import (LogSpool, DEFAULT_RING_LINES, DEFAULT_MAX_AGE_DAYS,
+                            DEFAULT_MAX_TOTAL_MB)
 from gui.log_window import LogWindow
 import sys
 from PyQt6.QtWidgets import QApplication
@@ -21,6 +27,39 @@ from pathlib import Path
 class MainWindow(QMainWindow):
     youtube_prewarm_finished = pyqtSignal(bool, str)
 
+    # 任务卡片的状态样式；update_output 只在样式真正变化时才重新设置
+    TASK_STATUS_ACTIVE_STYLE = """
+                    color: #2196F3;
+                    font-size: 11px;
+                    line-height: 1.1;
+                    padding: 2px 8px;
+                """
+    TASK_STATUS_DONE_STYLE = """
+                    color: #4CAF50;
+                    font-size: 11px;  /* 改回11px */
+                    line-height: 1.1;
+                    padding: 2px 8px;
+                """
+    TASK_STATUS_PROCESSING_STYLE = "color: #FF9800;"
+    TASK_PROGRESS_MERGING_STYLE = """
+                    QProgressBar {
+                        border: none;
+                        background: #f0f0f0;
+                    }
+                    QProgressBar::chunk {
+                        background: #FF9800;
+                    }
+                """
+    TASK_PROGRESS_DONE_STYLE = """
+                    QProgressBar {
+                        border: none;
+                        background: #f0f0f0;
+                    }
+                    QProgressBar::chunk {
+                        background: #4CAF50;
+                    }
+                """
+
     # 定义一个更有兼容性的字体方案，优先使用现代系统字体
     SYSTEM_FONT = QFont("Microsoft YaHei UI, PingFang SC, Segoe UI, -apple-system, sans-serif", 10)
     MONOSPACE_FONT = QFont("Consolas, Menlo, Courier, monospace", 10)
@@ -76,19 +115,31 @@ class MainWindow(QMainWindow):
         
         # 添加配置和下载器
         self.config = Config()
-        self.downloader = Downloader()
+        self.downloader = Downloader(self.config)
         
-        # 连接下载器信号
-        self.downloader.output_received.connect(self.update_output)
+        # 连接下载器信号；输出消息先经合并层按固定帧率刷新，避免并发任务多时界面线程忙于重绘
+        self.output_coalescer = OutputCoalescer(parent=self)
+        self.downloader.output_received.connect(self.output_coalescer.push)
+        self.output_coalescer.output_ready.connect(self.update_output)
         self.downloader.download_finished.connect(self.download_finished)
         self.downloader.title_updated.connect(self.update_task_title)
+        self.downloader.task_state_changed.connect(self.update_task_state)
+        self.downloader.metadata_received.connect(self.update_task_metadata)
+        self.downloader.formats_received.connect(self._apply_format_table)
         
         # 初始化变量
         self.total_urls = 0
         self.completed_urls = 0
         self.download_tasks = {}
         self.log_windows = {}  # 存储每个任务的日志窗口
-        self.task_log_history = {}  # 存储每个任务的完整日志历史
+        # 任务日志写到 config/logs 下的文件，内存中只留运行中任务的最近若干行
+        self.log_spool = LogSpool(
+            self.config.config_dir / "logs",
+            ring_lines=self.config.config.get('log_spool_ring_lines', DEFAULT_RING_LINES),
+            max_age_days=self.config.config.get('log_retention_days', DEFAULT_MAX_AGE_DAYS),
+            max_total_mb=self.config.config.get('log_spool_max_mb', DEFAULT_MAX_TOTAL_MB),
+        )
+        self.log_spool.prune_async()
         self._pending_download_request = None
         self._prewarm_in_progress = False
         self.youtube_prewarm_finished.connect(self._handle_youtube_prewarm_finished)
@@ -337,6 +388,13 @@ class MainWindow(QMainWindow):
         self.url_input.setPlaceholderText("在此输入一个或多个YouTube视频链接，每行一个")
         self.url_input.setAcceptRichText(False)
         self.url_input.setFixedHeight(90)  # 减小URL输入区域高度
+        # 停止输入片刻后再获取格式，避免逐字触发
+        self._format_probe_url = None
+        self._format_probe_timer = QTimer(self)
+        self._format_probe_timer.setSingleShot(True)
+        self._format_probe_timer.setInterval(600)
+        self._format_probe_timer.timeout.connect(self._probe_input_formats)
+        self.url_input.textChanged.connect(self._format_probe_timer.start)
         layout.addWidget(url_label)
         layout.addWidget(self.url_input)
         
@@ -406,16 +464,9 @@ class MainWindow(QMainWindow):
         quality_layout.setSpacing(5)  # 减少间距
         quality_label = QLabel("画质选择:")
         self.quality_combo = QComboBox()
-        self.quality_combo.addItems([
-            "最高画质",
-            "最高画质MP4",
-            "4K MP4",
-            "1080P MP4",
-            "480P MP4",
-            "仅MP3音频"
-        ])
+        self.quality_combo.addItems([preset.label for preset in QUALITY_PRESETS])
         saved_quality = self.config.config.get('quality_index', 0)
-        if 0 <= saved_quality <= 5:
+        if 0 <= saved_quality < len(QUALITY_PRESETS):
             self.quality_combo.setCurrentIndex(saved_quality)
         self.quality_combo.currentIndexChanged.connect(self._save_quality_setting)
 
@@ -424,6 +475,22 @@ class MainWindow(QMainWindow):
         self.subtitle_checkbox.setChecked(False)  # 默认不勾选
         self.subtitle_checkbox.setToolTip("下载视频的所有可用字幕(srt格式)")
 
+        # 只对接下来添加的任务生效，不保存
+        self.debug_checkbox = QCheckBox("调试日志")
+        self.debug_checkbox.setChecked(False)
+        self.debug_checkbox.setToolTip(
+            "让 yt-dlp 输出详细调试信息（--verbose），用于排查下载问题；日志量会大很多。\n"
+            "自动重试和重试失败的任务时会自动开启"
+        )
+
+        # 同时下载数量（超出的任务排队等待）
+        concurrency_label = QLabel("同时下载:")
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 10)
+        self.concurrency_spin.setValue(self.downloader.scheduler.max_concurrent)
+        self.concurrency_spin.setToolTip("同时运行的下载任务数量，其余任务排队等待")
+        self.concurrency_spin.valueChanged.connect(self.downloader.set_max_concurrent_downloads)
+
         # 添加播放列表下载按钮
         self.playlist_button = QPushButton("切换到播放列表/频道模式")
         self.playlist_button.clicked.connect(self.open_playlist_window)
@@ -431,6 +498,9 @@ class MainWindow(QMainWindow):
         quality_layout.addWidget(quality_label)
         quality_layout.addWidget(self.quality_combo)
         quality_layout.addWidget(self.subtitle_checkbox)
+        quality_layout.addWidget(self.debug_checkbox)
+        quality_layout.addWidget(concurrency_label)
+        quality_layout.addWidget(self.concurrency_spin)
         quality_layout.addStretch()
         quality_layout.addWidget(self.playlist_button)
         layout.addLayout(quality_layout)
@@ -496,6 +566,74 @@ class MainWindow(QMainWindow):
         self.config.config['quality_index'] = index
         self.config.save_config()
 
+    def _probe_input_formats(self):
+        """输入框里只有一个 YouTube 链接时，在后台获取它真实存在的格式"""
+        urls = [line.strip() for line in self.url_input.toPlainText().splitlines() if line.strip()]
+        url = urls[0] if len(urls) == 1 else None
+        # 其他平台下载时会换成平台默认格式，画质选项不直接作用于格式选择
+        if url and self.downloader.detect_platform(url) != 'youtube':
+            url = None
+        if url == self._format_probe_url:
+            return
+        self._format_probe_url = url
+        self._reset_quality_options()
+        if url and self.downloader.analyze_formats(url, self.browser_combo.currentData()):
+            self.quality_combo.setToolTip("正在获取该视频的可用格式...")
+
+    def _reset_quality_options(self):
+        """恢复全部画质选项"""
+        model = self.quality_combo.model()
+        for index, preset in enumerate(QUALITY_PRESETS):
+            item = model.item(index)
+            item.setText(preset.label)
+            item.setEnabled(True)
+        self.quality_combo.setToolTip("")
+        saved_quality = self.config.config.get('quality_index', 0)
+        if 0 <= saved_quality < len(QUALITY_PRESETS):
+            self.quality_combo.blockSignals(True)
+            self.quality_combo.setCurrentIndex(saved_quality)
+            self.quality_combo.blockSignals(False)
+
+    def _apply_format_table(self, url, table):
+        """按格式表禁用选不到格式的画质选项，并标出实际能拿到的分辨率"""
+        if url != self._format_probe_url:
+            return
+        if table is None or not table.rows:
+            self.quality_combo.setToolTip("未能获取该视频的可用格式")
+            return
+
+        model = self.quality_combo.model()
+        available = []
+        for index, preset in enumerate(QUALITY_PRESETS):
+            result = evaluate_preset(table, preset)
+            item = model.item(index)
+            item.setEnabled(result.available)
+            if not result.available:
+                item.setText(f"{preset.label}（不可用）")
+            elif result.height and preset.max_height and result.height < preset.max_height:
+                item.setText(f"{preset.label}（最高 {result.height}P）")
+            elif result.height and not preset.max_height:
+                item.setText(f"{preset.label}（{result.height}P）")
+            else:
+                item.setText(preset.label)
+            if result.available:
+                available.append(index)
+
+        # 当前选项在该视频上选不到格式时临时切到第一个可用的，不改动保存的偏好
+        if available and self.quality_combo.currentIndex() not in available:
+            self.quality_combo.blockSignals(True)
+            self.quality_combo.setCurrentIndex(available[0])
+            self.quality_combo.blockSignals(False)
+
+        heights = sorted({row.height for row in table.rows if row.has_video and row.height}, reverse=True)
+        audio_exts = sorted({row.ext for row in table.rows if row.has_audio and not row.has_video and row.ext})
+        lines = [f"可用格式 {len(table.rows)} 个"]
+        if heights:
+            lines.append("视频: " + ", ".join(f"{height}P" for height in heights))
+        if audio_exts:
+            lines.append("音频: " + ", ".join(audio_exts))
+        self.quality_combo.setToolTip("\n".join(lines))
+
     def update_history_display(self):
         """更新下载历史显示"""
         # 清理旧的历史显示
@@ -797,11 +935,26 @@ class MainWindow(QMainWindow):
             self.cancel_download()
             return
         
-        # 获取输入的URL
-        urls = self.url_input.toPlainText().strip().split('\n')
-        if not urls or not urls[0]:
+        # 获取输入的URL，同一视频的不同写法（youtu.be / watch?v= / m.youtube.com）只下载一次
+        urls, duplicates = dedupe_urls(self.url_input.toPlainText().splitlines(), self.downloader.detect_platform)
+        if not urls:
             QMessageBox.warning(self, "错误", "请输入要下载的视频URL")
             return
+        notes = []
+        if duplicates:
+            logging.info(f"已忽略 {len(duplicates)} 个重复链接: {duplicates[:5]}")
+            notes.append(f"已忽略 {len(duplicates)} 个重复链接")
+        # 开启 skip_downloaded 后，下载记录里已有的视频在启动任何进程之前就跳过
+        if self.config.config.get('skip_downloaded', False):
+            urls, downloaded = self.downloader.archive.filter_urls(urls)
+            if downloaded:
+                logging.info(f"已跳过 {len(downloaded)} 个下载过的视频: {downloaded[:5]}")
+                notes.append(f"已跳过 {len(downloaded)} 个下载过的视频")
+            if not urls:
+                QMessageBox.information(self, "提示", "这些视频都已经下载过")
+                return
+        if notes:
+            self._set_header_status("，".join(notes))
         
         # 获取下载路径
         output_path = self.location_input.text()
@@ -841,18 +994,11 @@ class MainWindow(QMainWindow):
             return
             
         # 获取画质选择
-        quality_index = self.quality_combo.currentIndex()
-        format_options = {
-            'format': 'bv*+ba' if quality_index == 0 else 
-                     'bv[ext=mp4]+ba[ext=m4a]' if quality_index == 1 else 
-                     'bv[ext=mp4][height<=2160]+ba[ext=m4a]' if quality_index == 2 else
-                     'bv[ext=mp4][height<=1080]+ba[ext=m4a]' if quality_index == 3 else
-                     'bv[ext=mp4][height<=480]+ba[ext=m4a]' if quality_index == 4 else
-                     'ba/b'  # 选择最佳音频
-        }
+        preset = QUALITY_PRESETS[self.quality_combo.currentIndex()]
+        format_options = {'format': preset.format}
 
         # 如果是 MP3 选项，添加音频格式参数
-        if quality_index == 5:  # 仅MP3音频选项
+        if preset.audio_only:  # 仅MP3音频选项
             format_options.update({
                 'audioformat': 'mp3',      # 这个参数会触发 downloader.py 中的 MP3 转换逻辑
                 'audioquality': '320'      # 设置比特率
@@ -864,6 +1010,9 @@ class MainWindow(QMainWindow):
                 'writesubtitles': True,
                 'subtitlesformat': 'srt'
             })
+
+        if self.debug_checkbox.isChecked():
+            format_options['capture_debug'] = True
         
         self._queue_download_request(urls, output_path, format_options, browser)
         
@@ -884,7 +1033,7 @@ class MainWindow(QMainWindow):
             
             # 更新所有未完成任务的状态
             for task_widget in self.download_tasks.values():
-                if task_widget.status_label.text() in ["⏬ 下载中", "🔄 处理中", "⏳ 准备中"]:
+                if task_widget.status_label.text() in ["⏬ 下载中", "🔄 处理中", "⏳ 准备中", "⏳ 排队中"]:
                     task_widget.status_label.setText("已取消")
                     task_widget.status_label.setStyleSheet("color: #FF9800;")
                     task_widget.progress_label.setText("下载已取消")
@@ -907,24 +1056,17 @@ class MainWindow(QMainWindow):
         if message.startswith("[RAW_LOG]"):
             # 这是原生日志信息，只发送到日志窗口，不更新UI进度
             raw_log = message[9:]  # 移除前缀
-            self.task_log_history.setdefault(task_id, []).append({
-                'kind': 'raw',
-                'text': raw_log,
-            })
+            self.log_spool.append_raw(task_id, raw_log)
             if task_id in self.log_windows:
-                self.log_windows[task_id].append_raw_log(raw_log)
+                self.log_windows[task_id].notify_appended()
             return  # 不继续处理原生日志（原生日志不包含UI更新信息）
             
         # 同时将普通消息发送到日志窗口
         from datetime import datetime
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.task_log_history.setdefault(task_id, []).append({
-            'kind': 'message',
-            'text': message,
-            'timestamp': timestamp,
-        })
+        self.log_spool.append_message(task_id, message, timestamp)
         if task_id in self.log_windows:
-            self.log_windows[task_id].append_log(message, timestamp=timestamp)
+            self.log_windows[task_id].notify_appended()
             
         if task_id in self.download_tasks:
             task_widget = self.download_tasks[task_id]
@@ -937,12 +1079,7 @@ class MainWindow(QMainWindow):
                 
                 # 更新状态
                 task_widget.status_label.setText("⏬ 下载中")
-                task_widget.status_label.setStyleSheet("""
-                    color: #2196F3;
-                    font-size: 11px;
-                    line-height: 1.1;
-                    padding: 2px 8px;
-                """)
+                self._set_style_if_changed(task_widget.status_label, self.TASK_STATUS_ACTIVE_STYLE)
                 task_widget.progress_label.setText("准备下载...")
                 task_widget.progress_bar.setValue(0)
                 task_widget.retry_button.hide()
@@ -959,56 +1096,53 @@ class MainWindow(QMainWindow):
                     pass
                 task_widget.progress_label.setText(message)
                 task_widget.status_label.setText("⏬ 下载中")
-                task_widget.status_label.setStyleSheet("""
-                    color: #2196F3;
-                    font-size: 11px;
-                    line-height: 1.1;
-                    padding: 2px 8px;
-                """)
+                self._set_style_if_changed(task_widget.status_label, self.TASK_STATUS_ACTIVE_STYLE)
                 task_widget.retry_button.hide()
             elif "正在合并" in message:
                 task_widget.progress_bar.setValue(100)
-                task_widget.progress_bar.setStyleSheet("""
-                    QProgressBar {
-                        border: none;
-                        background: #f0f0f0;
-                    }
-                    QProgressBar::chunk {
-                        background: #FF9800;
-                    }
-                """)
+                self._set_style_if_changed(task_widget.progress_bar, self.TASK_PROGRESS_MERGING_STYLE)
                 task_widget.progress_label.setText(message)
                 task_widget.status_label.setText("🔄 处理中")
-                task_widget.status_label.setStyleSheet("color: #FF9800;")
+                self._set_style_if_changed(task_widget.status_label, self.TASK_STATUS_PROCESSING_STYLE)
                 task_widget.retry_button.hide()
             elif "正在自动重试" in message:
                 task_widget.progress_label.setText(message)
                 task_widget.status_label.setText("处理中")
-                task_widget.status_label.setStyleSheet("color: #FF9800;")
+                self._set_style_if_changed(task_widget.status_label, self.TASK_STATUS_PROCESSING_STYLE)
                 task_widget.retry_button.hide()
             elif "下载完成" in message or "文件已存在" in message:
                 task_widget.progress_bar.setValue(100)
-                task_widget.progress_bar.setStyleSheet("""
-                    QProgressBar {
-                        border: none;
-                        background: #f0f0f0;
-                    }
-                    QProgressBar::chunk {
-                        background: #4CAF50;
-                    }
-                """)
+                self._set_style_if_changed(task_widget.progress_bar, self.TASK_PROGRESS_DONE_STYLE)
                 task_widget.progress_label.setText(message)
                 task_widget.status_label.setText("✓ 已完成")
-                task_widget.status_label.setStyleSheet("""
-                    color: #4CAF50;
-                    font-size: 11px;  /* 改回11px */
-                    line-height: 1.1;
-                    padding: 2px 8px;
-                """)
+                self._set_style_if_changed(task_widget.status_label, self.TASK_STATUS_DONE_STYLE)
                 task_widget.retry_button.hide()
 
+    @staticmethod
+    def _set_style_if_changed(widget, style):
+        """重设样式表会触发整棵子控件重新解析样式，只有真正变化时才设置"""
+        if widget.styleSheet() != style:
+            widget.setStyleSheet(style)
+
+    def update_task_state(self, task_id, state):
+        """根据调度器状态更新任务卡片（排队中 / 准备中）"""
+        task_widget = self.download_tasks.get(task_id)
+        if not task_widget:
+            return
+
+        if state == "queued":
+            task_widget.status_label.setText("⏳ 排队中")
+            task_widget.progress_label.setText("等待空闲下载名额...")
+        elif state == "running" and task_widget.status_label.text() == "⏳ 排队中":
+            task_widget.status_label.setText("⏳ 准备中")
+            task_widget.progress_label.setText("")
+
     def download_finished(self, success, message, title, task_id):
         """处理下载完成事件"""
+        # 先把该任务尚未刷新的输出发出去，保证完成状态不会被旧进度覆盖
+        self.output_coalescer.flush(task_id)
+        # 任务结束后日志只留在文件里
+        self.log_spool.finish(task_id)
         if task_id not in self.download_tasks:
             return
             
@@ -1258,7 +1392,7 @@ class MainWindow(QMainWindow):
         if not task_widget:
             return
 
-        if self.downloader.processes or self._prewarm_in_progress:
+        if self.downloader.has_active_tasks() or self._prewarm_in_progress:
             QMessageBox.information(self, "请稍候", "当前仍有下载任务在运行，请稍后再试。")
             return
 
@@ -1267,10 +1401,13 @@ class MainWindow(QMainWindow):
             return
 
         task_widget.retry_button.hide()
+        # 重试失败的任务时输出调试信息，再次失败时日志里有足够的线索
+        format_options = dict(task_widget.format_options or {})
+        format_options['capture_debug'] = True
         self._queue_download_request(
             [task_widget.source_url],
             task_widget.download_path,
-            dict(task_widget.format_options or {}),
+            format_options,
             task_widget.browser,
         )
 
@@ -1389,15 +1526,17 @@ class MainWindow(QMainWindow):
 
     def _check_all_downloads_finished(self):
         """检查是否所有下载都已完成"""
-        # 检查是否还有正在进行的下载进程
-        if self.downloader.processes:
+        # 检查是否还有正在进行或排队中的下载
+        if self.downloader.has_active_tasks():
             return False
         
         # 检查所有任务的状态
         for task_widget in self.download_tasks.values():
-            if task_widget.status_label.text() in ["⏬ 下载中", "🔄 处理中", "⏳ 准备中"]:
+            if task_widget.status_label.text() in ["⏬ 下载中", "🔄 处理中", "⏳ 准备中", "⏳ 排队中"]:
                 return False
         
+        self.output_coalescer.log_stats()
+
         # 如果没有正在进行的下载，则重置界面
         try:
             self.download_button.clicked.disconnect()
@@ -1433,9 +1572,9 @@ class MainWindow(QMainWindow):
             return
             
         # 创建新的日志窗口
-        log_window = LogWindow(task_id, self)
+        # 日志窗口从任务日志文件读取，在后台建立索引
+        log_window = LogWindow(task_id, self.log_spool, self)
         self.log_windows[task_id] = log_window
-        log_window.load_log_history(self.task_log_history.get(task_id, []))
         
         # 连接窗口关闭信号，清理引用
         log_window.finished.connect(lambda: self._cleanup_log_window(task_id))
@@ -1454,15 +1593,19 @@ class MainWindow(QMainWindow):
             log_window.close()
         self.log_windows.clear()
         
-        # 取消所有正在进行的下载
-        self.downloader.cancel_download()
+        # 取消所有正在进行的下载并关闭执行后端（含 worker 进程池）
+        self.downloader.shutdown()
+        self.log_spool.close()
         # 等待下载器清理完成
         event.accept() 
 
     def open_playlist_window(self):
         """打开播放列表下载模式"""
         from gui.playlist_window import PlaylistWindow
-        self.playlist_window = PlaylistWindow(self.config, self)  # 传入 self 作为父窗口
+        # 传入 self 作为父窗口；下载记录和 cookies 导出与下载器共用
+        self.playlist_window = PlaylistWindow(
+            self.config, self, archive=self.downloader.archive, cookie_broker=self.downloader.cookie_broker
+        )
         self.playlist_window.show()
         self.hide() 
 
@@ -1475,6 +1618,23 @@ class MainWindow(QMainWindow):
                 # 更新工具提示
                 task_widget.title_label.setToolTip(title)
     
+    def update_task_metadata(self, task_id, metadata):
+        """元数据探测完成后，在标题提示中补充时长、大小和条目数"""
+        task_widget = self.download_tasks.get(task_id)
+        if not task_widget:
+            return
+
+        details = []
+        if metadata.duration:
+            details.append(f"时长: {format_eta(metadata.duration)}")
+        if metadata.filesize_approx:
+            details.append(f"大小: 约 {format_size(metadata.filesize_approx)}")
+        if metadata.entry_count:
+            details.append(f"条目数: {metadata.entry_count}")
+        if details:
+            title = task_widget.title_label.text()
+            task_widget.title_label.setToolTip(f"{title}\n" + "  ".join(details))
+    
     def create_download_task(self, url, task_id):
         """创建下载任务"""
         # 创建任务组件
@@ -1,10 +1,16 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                            QPushButton, QLineEdit, QLabel, QMessageBox, QTextEdit, QHBoxLayout, QFileDialog, QComboBox, QCheckBox, QDialog,
-                           QStyle, QSizePolicy, QApplication)
-from PyQt6.QtCore import Qt, QProcess, QProcessEnvironment, pyqtSignal
+                           QStyle, QSizePolicy, QApplication, QSpinBox)
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QIcon
 from .saved_urls_dialog import SavedURLsDialog
+from core.archive_store import open_archive
 from core.youtube_pot import prewarm_youtube_pot
+from core.io_engine import ProcessExited, ProcessIOEngine
+from core.process_stream import MarkerMatcher, StreamDecoder, TailBuffer
+from core import log_dispatch, playlist_fanout, playlist_sync, progress_protocol, verbosity
+from core.log_dispatch import LineDispatcher
+import itertools
 import os
 import logging
 import re
@@ -12,9 +18,28 @@ import requests
 from bs4 import BeautifulSoup
 from pathlib import Path
 import threading
+from typing import NamedTuple
+
+
+class _UiUpdate(NamedTuple):
+    """I/O 线程解析出的界面更新；target 为 log/status/filename/total_progress"""
+    target: str
+    text: str
+
+
+class _Discovered(NamedTuple):
+    """并行模式下列举进程新列出的播放列表条目"""
+    entries: tuple
+
+
+class _DownloadRecord(NamedTuple):
+    """并行模式下下载进程输出的下载完成记录，由界面线程交给 SyncTracker"""
+    line: str
+
 
 class PlaylistWindow(QMainWindow):
     youtube_prewarm_finished = pyqtSignal(bool, str)
+    _engine_batch_ready = pyqtSignal(object)
     _YOUTUBE_RETRY_ERROR_MARKERS = (
         "po token",
         "bgutil",
@@ -27,21 +52,40 @@ class PlaylistWindow(QMainWindow):
         "generate_once.ts",
     )
     _MAX_YOUTUBE_RECOVERY_RETRIES = 2
+    _PROCESS_KEY = "playlist"
+    _LIST_PROCESS_KEY = "playlist-list"
 
-    def __init__(self, config, parent=None):
+    def __init__(self, config, parent=None, archive=None, cookie_broker=None):
         super().__init__()
         self.config = config
         self.parent_window = parent
-        self.process = None
+        # 下载记录与主窗口共用；yt-dlp 读写的是导出的文本文件
+        self.archive = archive if archive is not None else open_archive(config)
+        # 浏览器 cookies 的导出与下载器共用，每个进程各用一份副本
+        self.cookie_broker = cookie_broker
+        # 子进程读取与输出解析在后台 I/O 线程进行，界面线程只按批应用结果；
+        # 进程运行期间条目状态只由 I/O 线程修改，进程结束事件送达后才由界面线程读取
+        self._engine = ProcessIOEngine(self._engine_batch_ready.emit)
+        self._engine_batch_ready.connect(self._handle_engine_batch)
+        self._process_running = False
+        self._ui_updates = None
         self._pending_download_start = None
         self._active_download_start = None
         self._prewarm_in_progress = False
         self._youtube_retry_count = 0
         self._saw_download_progress = False
         self._cancel_requested = False
-        self._last_process_output = ""
-        self._last_process_error = ""
+        # 只保留最近的输出行，长播放列表下载时内存不随日志增长；
+        # 重试判断用的标记在输出流过时即记下，不受尾部长度限制
+        self._last_process_output = TailBuffer()
+        self._last_process_error = TailBuffer()
+        self._retry_markers = MarkerMatcher(self._YOUTUBE_RETRY_ERROR_MARKERS)
+        # 上次下载失败（退出码非 0 或有失败条目）的链接，再次下载时自动输出调试日志
+        self._debug_urls = set()
         self._output_auto_scroll = True
+        self._worker_ids = itertools.count(1)
+        # 输出行按行首前缀分发，进度等界面更新也在这里产生
+        self._line_dispatcher = self._build_line_dispatcher()
         self.youtube_prewarm_finished.connect(self._handle_youtube_prewarm_finished)
         self._reset_download_tracking()
         self.setup_ui()
@@ -161,6 +205,16 @@ class PlaylistWindow(QMainWindow):
         self.subtitle_checkbox.setToolTip("下载视频的所有可用字幕并转换为srt格式")
         quality_layout.addWidget(self.subtitle_checkbox)
 
+        # 同时运行的下载进程数；大于 1 时先列出全部条目，再分批交给多个进程下载
+        parallel_label = QLabel("同时下载:")
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(1, playlist_fanout.MAX_PARALLELISM)
+        self.parallel_spin.setValue(self.config.config.get('playlist_parallelism', 1))
+        self.parallel_spin.setToolTip("同时运行的下载进程数量，1 为逐个下载；过大可能触发网站限流")
+        self.parallel_spin.valueChanged.connect(self._save_parallelism_setting)
+        quality_layout.addWidget(parallel_label)
+        quality_layout.addWidget(self.parallel_spin)
+
         quality_layout.addStretch()  # 添加弹性空间
         layout.addLayout(quality_layout)  # 添加画质选择布局
         
@@ -180,6 +234,25 @@ class PlaylistWindow(QMainWindow):
         )
         self.resilient_retry_checkbox.stateChanged.connect(self._save_resilient_retry_setting)
         archive_layout.addWidget(self.resilient_retry_checkbox)
+
+        # 收藏的播放列表记住上次同步到的位置，只检查之后的新视频
+        self.sync_checkbox = QCheckBox("增量同步收藏的播放列表")
+        self.sync_checkbox.setChecked(self.config.config.get('playlist_incremental_sync', False))
+        self.sync_checkbox.setToolTip(
+            "记住每个收藏的频道上次同步到的视频，下次遇到已下载的视频即停止，不再检查全部历史视频；\n"
+            "第一次同步或上次同步未全部成功时会完整检查一遍"
+        )
+        self.sync_checkbox.stateChanged.connect(self._save_sync_setting)
+        archive_layout.addWidget(self.sync_checkbox)
+
+        # 只对本次下载生效，不保存
+        self.debug_checkbox = QCheckBox("调试日志")
+        self.debug_checkbox.setChecked(False)
+        self.debug_checkbox.setToolTip(
+            "让 yt-dlp 输出详细调试信息（--verbose），用于排查下载问题；日志量会大很多。\n"
+            "自动重试和上次下载失败的播放列表再次下载时会自动开启"
+        )
+        archive_layout.addWidget(self.debug_checkbox)
         archive_layout.addStretch()
         layout.addLayout(archive_layout)
         
@@ -187,7 +260,8 @@ class PlaylistWindow(QMainWindow):
         archive_tip = QLabel(
             "说明：勾选此选项后，程序会记住已经下载过的视频，下次下载相同的播放列表时会自动跳过这些视频。\n"
             "适用于订阅更新的播放列表。若取消勾选，软件将尝试重新下载所有视频。\n"
-            "下载记录保存在程序目录下的 downloaded_videos_list.txt 文件中，如需清空下载记录可以手动删除该文件"
+            "下载记录保存在程序目录 config 文件夹下的 archive.sqlite3 中，与单视频下载共用；"
+            "如需清空下载记录可以删除该文件和同目录下的 downloaded_videos_list.txt"
         )
         archive_tip.setStyleSheet("""
             QLabel {
@@ -315,6 +389,19 @@ class PlaylistWindow(QMainWindow):
         self.config.config['quality_index'] = index
         self.config.save_config()
 
+    def _save_parallelism_setting(self, value):
+        """保存同时下载进程数；并行下载中修改时立即生效（调小时不结束已在运行的进程）"""
+        self.config.config['playlist_parallelism'] = value
+        self.config.save_config()
+        if self._fanout is not None and self._active_download_start is not None:
+            self._active_download_start["parallelism"] = value
+            self._dispatch_workers()
+
+    def _save_sync_setting(self, state):
+        """保存增量同步开关"""
+        self.config.config['playlist_incremental_sync'] = (state == Qt.CheckState.Checked.value)
+        self.config.save_config()
+
     def _save_resilient_retry_setting(self, state):
         """保存播放列表模式的稳健重试开关"""
         self.config.config['playlist_resilient_retry'] = (state == Qt.CheckState.Checked.value)
@@ -344,8 +431,18 @@ class PlaylistWindow(QMainWindow):
         self.current_item_id = None
         self.current_merging_id = None
         self.total_items_expected = 0
-        self.stdout_buffer = ""
-        self.stderr_buffer = ""
+        self.stdout_decoder, self.stderr_decoder = StreamDecoder.pair()
+        # 并行模式：列举进程把条目放入队列，多个下载进程各领取一批
+        self._fanout = None
+        self._listing = False
+        self._workers = {}  # 进程键 -> 领取的条目数
+        # 每个下载进程各自的当前条目 (current_item_id, current_merging_id)，只在 I/O 线程修改
+        self._worker_cursors = {}
+        self._finished_cursors = []
+        self._fanout_exit_code = 0
+        self._fanout_skipped = 0
+        self._fanout_completed = 0
+        self._sync_tracker = playlist_sync.SyncTracker()
 
     def _ensure_item_state(self, video_id, title=None):
         """确保视频条目状态存在并返回状态字典"""
@@ -455,125 +552,69 @@ class PlaylistWindow(QMainWindow):
             self._mark_item_failed(video_id, "retries_exhausted", reason, "download")
         state["pending_retry_exhausted"] = False
 
-    def _parse_stream_text(self, text, is_error=False):
-        """解析 stdout/stderr 流并进行条目状态追踪"""
-        buffer_name = "stderr_buffer" if is_error else "stdout_buffer"
-        combined = getattr(self, buffer_name) + text
-        normalized = combined.replace('\r\n', '\n').replace('\r', '\n')
-        parts = normalized.split('\n')
-
-        if normalized.endswith('\n'):
-            lines = parts[:-1]
-            remainder = ""
-        else:
-            lines = parts[:-1]
-            remainder = parts[-1] if parts else ""
-
-        setattr(self, buffer_name, remainder)
-
-        for raw_line in lines:
-            line = raw_line.strip()
-            if not line:
-                continue
+    def _track_lines(self, lines, is_error=False):
+        (self._last_process_error if is_error else self._last_process_output).extend(lines)
+        self._retry_markers.feed(lines)
+        for line in lines:
             self._track_line(line, is_error=is_error)
 
-    def _flush_stream_buffers(self):
-        """处理残留在缓冲区中的最后一行文本"""
-        if self.stdout_buffer.strip():
-            self._track_line(self.stdout_buffer.strip(), is_error=False)
-        if self.stderr_buffer.strip():
-            self._track_line(self.stderr_buffer.strip(), is_error=True)
-        self.stdout_buffer = ""
-        self.stderr_buffer = ""
-
-    def _track_line(self, line, is_error=False):
-        """按行跟踪下载/合并状态"""
-        # 某些失败会发生在 Destination 之前，先尽量从 URL/INFO 行绑定当前条目ID
-        extracting_match = re.search(
-            r'\[youtube\]\s+Extracting URL:\s+https?://[^\s]+[?&]v=([A-Za-z0-9_-]{10,20})',
-            line
-        )
-        if extracting_match:
-            video_id = extracting_match.group(1)
-            self.current_item_id = video_id
-            state = self._ensure_item_state(video_id)
-            if state and not state["stage"]:
-                state["stage"] = "download"
-
-        info_match = re.search(r'^\[info\]\s+([A-Za-z0-9_-]{10,20}):', line)
-        if info_match:
-            video_id = info_match.group(1)
-            self.current_item_id = video_id
-            state = self._ensure_item_state(video_id)
-            if state and not state["stage"]:
-                state["stage"] = "download"
-
-        youtube_step_match = re.search(r'^\[youtube\]\s+([A-Za-z0-9_-]{10,20}):', line)
-        if youtube_step_match:
-            video_id = youtube_step_match.group(1)
-            self.current_item_id = video_id
-            state = self._ensure_item_state(video_id)
-            if state and not state["stage"]:
+    def _track_protocol_event(self, event):
+        """结构化模式：直接用 yt-dlp 给出的视频ID、标题和进度更新条目状态"""
+        if isinstance(event, progress_protocol.ProgressEvent):
+            if event.status != "downloading":
+                return
+            self._saw_download_progress = True
+            speed = f"{progress_protocol.format_size(event.speed)}/s" if event.speed else "未知"
+            self._post_ui(
+                "status",
+                f"单个视频下载进度: {event.percent:.1f}%  "
+                f"大小: {progress_protocol.format_size(event.total)}  速度: {speed}"
+            )
+        elif isinstance(event, progress_protocol.VideoEvent):
+            self.current_item_id = event.video_id
+            state = self._ensure_item_state(event.video_id, event.title)
+            if state:
                 state["stage"] = "download"
-
-        item_match = re.search(r'\[download\] Downloading item (\d+) of (\d+)', line)
-        if item_match:
-            _, total = item_match.groups()
-            try:
-                self.total_items_expected = max(self.total_items_expected, int(total))
-            except ValueError:
-                pass
-            self._finalize_pending_for_item(self.current_item_id, switched_to_next=True)
-            self.current_item_id = None
-            self.current_merging_id = None
-            return
-
-        if '[download] Destination: ' in line:
-            path_text = line.split('[download] Destination: ', 1)[-1].strip()
-            video_id = self._extract_video_id(path_text)
-            title = self._extract_display_title(path_text)
-            if video_id:
-                self.current_item_id = video_id
-                state = self._ensure_item_state(video_id, title)
-                if state:
-                    state["stage"] = "download"
-            return
-
-        if '[Merger] Merging formats into ' in line:
-            merged_path = line.split('[Merger] Merging formats into ', 1)[-1].strip().strip('"')
-            video_id = self._extract_video_id(merged_path) or self.current_item_id
-            if video_id:
-                self.current_merging_id = video_id
-                state = self._ensure_item_state(video_id, self._extract_display_title(merged_path))
+            self._post_ui("filename", f"正在下载: {event.title}")
+        elif isinstance(event, progress_protocol.PostprocessEvent):
+            if event.postprocessor == "Merger" and event.status == "started" and event.video_id:
+                self.current_merging_id = event.video_id
+                state = self._ensure_item_state(event.video_id)
                 if state:
                     state["seen_merger"] = True
                     state["stage"] = "merge"
-            return
-
-        if line.startswith('Deleting original file '):
-            video_id = self._extract_video_id(line)
-            if video_id:
-                self._mark_item_completed(video_id, merged=True)
-                if self.current_merging_id == video_id:
-                    self.current_merging_id = None
-            return
-
-        if 'has already been downloaded and merged' in line:
-            video_id = self._extract_video_id(line) or self.current_item_id
-            if video_id:
-                self._mark_item_completed(video_id, merged=True)
-            return
+        elif isinstance(event, progress_protocol.FileEvent):
+            state = self.item_states.get(event.video_id)
+            self._mark_item_completed(event.video_id, merged=bool(state and state.get("seen_merger")))
+            if self.current_merging_id == event.video_id:
+                self.current_merging_id = None
+
+    def _build_line_dispatcher(self):
+        return LineDispatcher({
+            log_dispatch.BIND: self._on_bind_line,
+            log_dispatch.ITEM: self._on_item_line,
+            log_dispatch.DESTINATION: self._on_destination_line,
+            log_dispatch.PROGRESS: self._on_progress_line,
+            log_dispatch.MERGING: self._on_merging_line,
+            log_dispatch.DELETING: self._on_deleting_line,
+            log_dispatch.ALREADY_MERGED: self._on_already_merged_line,
+            log_dispatch.RETRY_LAST: self._on_retry_last_line,
+            log_dispatch.GIVE_UP: self._on_give_up_line,
+        })
 
-        if 'Retrying (10/10)' in line:
-            video_id = self.current_item_id
-            if video_id:
-                self._mark_retry_exhausted_pending(video_id, line)
+    def _track_line(self, line, is_error=False):
+        """按行跟踪下载/合并状态：按行首前缀分发，没有规则匹配的错误行再判断失败原因"""
+        if self._fanout is None:
+            self._sync_tracker.feed(line)
+        elif playlist_sync.is_download_record(line) and self._ui_updates is not None:
+            # 并行模式下条目已由列举进程统计，下载进程只报告下载完成的视频；
+            # SyncTracker 由界面线程修改，这里不直接 feed
+            self._ui_updates.append(_DownloadRecord(line))
+        event = progress_protocol.parse_record(line)
+        if event is not None:
+            self._track_protocol_event(event)
             return
-
-        if 'Giving up after 10 retries' in line:
-            video_id = self.current_item_id
-            if video_id:
-                self._mark_item_failed(video_id, "retries_exhausted", line, "download")
+        if self._line_dispatcher.dispatch(line, is_error):
             return
 
         lower = line.lower()
@@ -589,6 +630,78 @@ class PlaylistWindow(QMainWindow):
             elif 'error:' in lower:
                 self._mark_item_failed(target_id, "download_failed", line, "download")
 
+    def _on_bind_line(self, match, is_error):
+        # 某些失败会发生在 Destination 之前，先尽量从 URL/INFO 行绑定当前条目ID
+        video_id = match.group(1)
+        self.current_item_id = video_id
+        state = self._ensure_item_state(video_id)
+        if state and not state["stage"]:
+            state["stage"] = "download"
+
+    def _on_item_line(self, match, is_error):
+        current, total = match.groups()
+        if total.isdigit():
+            self.total_items_expected = max(self.total_items_expected, int(total))
+        self._finalize_pending_for_item(self.current_item_id, switched_to_next=True)
+        self.current_item_id = None
+        self.current_merging_id = None
+        if not is_error:
+            if total.isdigit():
+                self._post_ui("total_progress", f"正在下载第 {current} 个视频，共 {total} 个")
+            else:
+                self._post_ui("total_progress", f"正在下载第 {current} 个视频")
+
+    def _on_destination_line(self, match, is_error):
+        path_text = match.group(1).strip()
+        video_id = self._extract_video_id(path_text)
+        title = self._extract_display_title(path_text)
+        if video_id:
+            self.current_item_id = video_id
+            state = self._ensure_item_state(video_id, title)
+            if state:
+                state["stage"] = "download"
+        # 只显示真正的视频文件名
+        if not is_error and path_text.endswith(('.mp4', '.webm', '.mkv')):
+            self._post_ui("filename", f"正在下载: {path_text}")
+
+    def _on_progress_line(self, match, is_error):
+        if is_error:
+            return
+        self._saw_download_progress = True
+        percent, size, speed, _ = match.groups()
+        if speed is not None:
+            self._post_ui("status", f"单个视频下载进度: {percent}%  大小: {size}  速度: {speed}")
+
+    def _on_merging_line(self, match, is_error):
+        merged_path = match.group(1).strip().strip('"')
+        video_id = self._extract_video_id(merged_path) or self.current_item_id
+        if video_id:
+            self.current_merging_id = video_id
+            state = self._ensure_item_state(video_id, self._extract_display_title(merged_path))
+            if state:
+                state["seen_merger"] = True
+                state["stage"] = "merge"
+
+    def _on_deleting_line(self, match, is_error):
+        video_id = self._extract_video_id(match.string)
+        if video_id:
+            self._mark_item_completed(video_id, merged=True)
+            if self.current_merging_id == video_id:
+                self.current_merging_id = None
+
+    def _on_already_merged_line(self, match, is_error):
+        video_id = self._extract_video_id(match.string) or self.current_item_id
+        if video_id:
+            self._mark_item_completed(video_id, merged=True)
+
+    def _on_retry_last_line(self, match, is_error):
+        if self.current_item_id:
+            self._mark_retry_exhausted_pending(self.current_item_id, match.string)
+
+    def _on_give_up_line(self, match, is_error):
+        if self.current_item_id:
+            self._mark_item_failed(self.current_item_id, "retries_exhausted", match.string, "download")
+
     def _format_failure_reason(self, state):
         """将失败状态格式化为用户可读原因"""
         code = state.get("reason_code")
@@ -657,8 +770,9 @@ class PlaylistWindow(QMainWindow):
             self._youtube_retry_count = 0
             self._saw_download_progress = False
             self._cancel_requested = False
-            self._last_process_output = ""
-            self._last_process_error = ""
+            self._last_process_output.clear()
+            self._last_process_error.clear()
+            self._retry_markers.clear()
 
             # 获取下载路径并规范化
             output_path = os.path.normpath(self.location_input.text())
@@ -669,32 +783,24 @@ class PlaylistWindow(QMainWindow):
             # 确保下载目录存在
             os.makedirs(output_path, exist_ok=True)
             
-            # 设置下载记录文件路径 (在项目根目录)
             root_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            archive_file = os.path.normpath(os.path.join(root_dir, "downloaded_videos_list.txt"))
-            
-            # 创建进程
-            self.process = QProcess()
+            archive_file = None
+            if self.archive_checkbox.isChecked():
+                # 单个视频链接已在下载记录中时直接跳过，不启动进程
+                if self.archive.contains_url(url):
+                    self.status_label.setText("该视频已下载过，已跳过")
+                    logging.info(f"下载记录中已有该视频，跳过: {url}")
+                    return
+                # 下载记录只在有变化时导出为 yt-dlp 使用的文本文件
+                archive_file = os.path.normpath(str(self.archive.export_text()))
             
             # 设置环境变量，强制使用 UTF-8
-            env = QProcess.systemEnvironment()
-            env.append("PYTHONIOENCODING=utf-8")
-            env.append("PYTHONUTF8=1")
-            env.append("LANG=zh_CN.UTF-8")  # 添加语言环境设置
-            
-            # 创建 QProcessEnvironment
-            process_env = QProcessEnvironment()
-            for env_str in env:
-                if '=' in env_str:
-                    key, value = env_str.split('=', 1)
-                    process_env.insert(key, value)
+            process_env = dict(os.environ)
+            process_env["PYTHONIOENCODING"] = "utf-8"
+            process_env["PYTHONUTF8"] = "1"
+            process_env["LANG"] = "zh_CN.UTF-8"  # 添加语言环境设置
             bin_dir = os.path.normpath(os.path.join(root_dir, "bin"))
-            process_env.insert("PATH", bin_dir + os.pathsep + process_env.value("PATH", ""))
-            self.process.setProcessEnvironment(process_env)
-            
-            self.process.readyReadStandardOutput.connect(self.handle_output)
-            self.process.readyReadStandardError.connect(self.handle_error)
-            self.process.finished.connect(self.download_finished)
+            process_env["PATH"] = bin_dir + os.pathsep + process_env.get("PATH", "")
             
             # 构建命令
             program = os.path.normpath(os.path.join(root_dir, "bin", "yt-dlp.exe"))
@@ -714,8 +820,8 @@ class PlaylistWindow(QMainWindow):
                             'bv[ext=mp4][height<=480]+ba[ext=m4a]' if quality_index == 4 else
                             'ba/b')  # 选择最佳音频
             
+            # 不含链接和输出模板，并行模式下每个下载进程另行追加
             args = [
-                url,
                 "--no-restrict-filenames",  # 允许文件名包含特殊字符
                 "--encoding", "utf-8",      # 强制使用 UTF-8 编码
                 "-f", format_option,        # 使用选择的画质/格式
@@ -732,8 +838,26 @@ class PlaylistWindow(QMainWindow):
                 ])
             
             # 根据复选框状态决定是否使用断点续传
-            if self.archive_checkbox.isChecked():
+            if archive_file:
                 args.extend(["--download-archive", archive_file])
+
+            # 增量同步只对收藏的播放列表生效：按上次同步的水位提前停止，
+            # 停止参数只加给遍历播放列表的进程，并行模式的下载进程不加
+            sync = None
+            traversal_args = []
+            if self.sync_checkbox.isChecked():
+                saved = self._saved_playlist(url)
+                if saved is None:
+                    self._append_output_log("提示：增量同步只对收藏的播放列表生效，本次完整检查")
+                else:
+                    watermark = playlist_sync.Watermark.from_dict(saved.get('watermark'))
+                    sync = {"watermark": watermark}
+                    traversal_args = playlist_sync.sync_args(url, watermark, archive_file is not None)
+                    if archive_file:
+                        traversal_args.extend(["--download-archive", archive_file])
+                    args.extend(playlist_sync.record_args())
+                    if watermark is None:
+                        self._append_output_log("增量同步：第一次同步该播放列表，完整检查一遍")
             
             # 添加 PO Token 参数（YouTube SABR 协议需要）
             pot_server_home = os.path.normpath(os.path.join(root_dir, "bin", "bgutil-ytdlp-pot-provider", "server"))
@@ -746,10 +870,18 @@ class PlaylistWindow(QMainWindow):
             # 添加其他参数
             args.extend([
                 "--cookies-from-browser", "firefox",
-                "--verbose",
-                "-o", output_template
             ])
 
+            # 调试日志：用户勾选，或该链接上次下载失败
+            if self.debug_checkbox.isChecked() or url in self._debug_urls:
+                args = verbosity.with_debug(args)
+                if not self.debug_checkbox.isChecked():
+                    self._append_output_log("上次下载该链接时有失败，本次输出调试日志")
+
+            # 结构化进度：进度、标题和视频ID由 yt-dlp 按模板直接输出
+            if self.config.config.get('structured_progress', False):
+                args.extend(progress_protocol.build_args())
+
             # 稳健重试参数：平衡成功率与等待体验
             if self.resilient_retry_checkbox.isChecked():
                 args.extend([
@@ -769,15 +901,32 @@ class PlaylistWindow(QMainWindow):
                     "--postprocessor-args", "-codec:a libmp3lame"  # 使用 LAME 编码器
                 ])
             
+            parallelism = self.parallel_spin.value()
+            # 流式处理：--lazy-playlist 让 yt-dlp 边获取列表边处理，第一个条目不必等整个列表获取完
+            streaming = self.config.config.get('playlist_streaming', True)
+            if streaming and "--lazy-playlist" not in traversal_args:
+                traversal_args = ["--lazy-playlist", *traversal_args]
             logging.debug(f"启动下载进程: {program}")
             logging.debug(f"下载参数: {args}")
             logging.debug(f"下载目录: {output_path}")
             logging.debug(f"下载记录文件: {archive_file}")
+            logging.debug(f"同时下载进程数: {parallelism}，流式处理: {streaming}")
 
             bin_dir_path = Path(root_dir) / "bin"
             self._pending_download_start = {
                 "program": program,
-                "args": args,
+                "args": [url, *args, *traversal_args, "-o", output_template],
+                "base_args": args,
+                "list_args": [
+                    "--encoding", "utf-8",
+                    "--cookies-from-browser", "firefox",
+                    *traversal_args,
+                    *playlist_fanout.enumerate_args(url, output_template),
+                ],
+                "parallelism": parallelism,
+                "streaming": streaming,
+                "sync": sync,
+                "env": process_env,
                 "output_path": output_path,
                 "url": url,
             }
@@ -807,90 +956,124 @@ class PlaylistWindow(QMainWindow):
             self.back_button.setEnabled(True)
             return
 
-        if self.process and self.process.state() == QProcess.ProcessState.Running:
-            self.process.kill()
+        if self._process_running:
+            self._kill_processes()
+
+    def _kill_processes(self):
+        """结束所有下载相关进程；并行模式下取消后不再分配新的条目"""
+        if self._fanout is None:
+            self._engine.kill(self._PROCESS_KEY)
+            return
+        if self._listing:
+            self._engine.kill(self._LIST_PROCESS_KEY)
+        for key in self._workers:
+            self._engine.kill(key)
     
-    def handle_output(self):
-        """处理输出"""
+    def _post_ui(self, target, text):
+        """记录一条界面更新，由 _parse_output_lines 随批次返回"""
+        if self._ui_updates is not None:
+            self._ui_updates.append(_UiUpdate(target, text))
+
+    def _parse_output_lines(self, lines, is_error):
+        """在 I/O 线程中解析一批完整输出行，返回要在界面线程应用的更新"""
+        self._ui_updates = []
         try:
-            data = self.process.readAllStandardOutput().data()
-            try:
-                text = data.decode('utf-8')
-            except UnicodeDecodeError:
-                text = data.decode('utf-8', errors='replace')
-            
-            # 记录调试信息
-            logging.debug(f"Raw output: {text}")
-            self._last_process_output += text
-            self._parse_stream_text(text, is_error=False)
-            
-            # 处理输出文本
-            self._append_output_log(text)
-            
-            # 更新进度信息
-            if '[download]' in text:
-                # 检查是否包含文件名信息 - 使用更严格的匹配
-                if '[download] Destination: ' in text:
-                    # 只处理真正的目标文件名行
-                    lines = text.split('\n')
-                    for line in lines:
-                        if '[download] Destination: ' in line:
-                            # 确保这是一个视频文件
-                            filename = line.split('[download] Destination: ')[-1].strip()
-                            if any(filename.endswith(ext) for ext in ['.mp4', '.webm', '.mkv']):
-                                self.filename_label.setText(f"正在下载: {filename}")
-                                break
-                # 处理播放列表进度信息
-                elif 'Downloading item' in text:
-                    match = re.search(r'\[download\] Downloading item (\d+) of (\d+)', text)
-                    if match:
-                        current, total = match.groups()
-                        self.total_progress_label.setText(f"正在下载第 {current} 个视频，共 {total} 个")
-                # 处理单个视频的下载进度
-                elif '%' in text and 'of' in text:
-                    try:
-                        self._saw_download_progress = True
-                        # 兼容普通格式和 SABR 格式（带流编号前缀如 "2:"）
-                        progress_match = re.search(
-                            r'\[download\]\s+([\d.]+)%\s+of\s+~?\s*([\d.]+\S+)\s+at\s+([\d.]+\S+)\s+ETA\s+(\S+)',
-                            text
-                        )
-                        if progress_match:
-                            percent = progress_match.group(1) + '%'
-                            size = progress_match.group(2)
-                            speed = progress_match.group(3)
-                            progress_text = f"单个视频下载进度: {percent}  大小: {size}  速度: {speed}"
-                            self.status_label.setText(progress_text)
-                    except (IndexError, ValueError) as e:
-                        logging.error(f"解析进度信息出错: {str(e)}")
-                    
-        except Exception as e:
-            logging.error(f"处理输出时出错: {str(e)}", exc_info=True)
-    
-    def handle_error(self):
-        """处理错误输出"""
+            if is_error:
+                self._parse_error_lines(lines)
+            else:
+                self._parse_stdout_lines(lines)
+            return self._ui_updates
+        finally:
+            self._ui_updates = None
+
+    def _parse_worker_lines(self, key, lines, is_error):
+        """并行模式下解析某个下载进程的输出：先切换到该进程自己的当前条目"""
+        self.current_item_id, self.current_merging_id = self._worker_cursors.get(key, (None, None))
         try:
-            data = self.process.readAllStandardError().data().decode('utf-8', errors='ignore')
-            # 错误信息记录到日志
-            logging.error(f"下载错误: {data}")
-            self._last_process_error += data
-            self._parse_stream_text(data, is_error=True)
-            
-            # 对用户显示更友好的错误信息
-            if "Unable to download" in data:
-                self._append_output_log("⚠️ 无法下载此视频，已跳过")
-            elif "Video unavailable" in data:
-                self._append_output_log("⚠️ 视频不可用，已跳过")
-            # 其他错误信息不显示给用户
-            
-        except Exception as e:
-            # 错误只记录到日志，不显示给用户
-            logging.error(f"处理错误输出时出错: {str(e)}", exc_info=True)
-    
-    def download_finished(self, exit_code, exit_status):
+            return self._parse_output_lines(lines, is_error)
+        finally:
+            self._worker_cursors[key] = (self.current_item_id, self.current_merging_id)
+
+    def _parse_listing_lines(self, lines, is_error):
+        """在 I/O 线程中解析列举进程的输出"""
+        if is_error:
+            self._last_process_error.extend(lines)
+            self._retry_markers.feed(lines)
+            errors = [line for line in lines if line.startswith("ERROR:")]
+            return [_UiUpdate("log", "\n".join(errors))] if errors else []
+        entries = tuple(entry for entry in map(playlist_fanout.parse_entry, lines) if entry)
+        return [_Discovered(entries)] if entries else []
+
+    def _parse_stdout_lines(self, lines):
+        """处理输出"""
+        text = "\n".join(lines)
+        # 记录调试信息
+        logging.debug(f"Raw output: {text}")
+
+        # 处理输出文本（结构化记录只用于解析，不显示）
+        display_text = progress_protocol.strip_records(text)
+        if display_text.strip():
+            self._post_ui("log", display_text)
+
+        # 更新条目状态，文件名和进度信息随之产生
+        self._track_lines(lines, is_error=False)
+
+    def _parse_error_lines(self, lines):
+        """处理错误输出"""
+        data = "\n".join(lines)
+        # 错误信息记录到日志
+        logging.error(f"下载错误: {data}")
+        self._track_lines(lines, is_error=True)
+
+        # 对用户显示更友好的错误信息，其他错误信息不显示给用户
+        if "Unable to download" in data:
+            self._post_ui("log", "⚠️ 无法下载此视频，已跳过")
+        elif "Video unavailable" in data:
+            self._post_ui("log", "⚠️ 视频不可用，已跳过")
+
+    def _handle_engine_batch(self, batch):
+        """在界面线程应用一批解析结果：日志合并为一次追加，标签只设置最后的值"""
+        log_texts = []
+        labels = {}
+        for event in batch:
+            if isinstance(event, ProcessExited):
+                self._apply_ui_updates(log_texts, labels)
+                log_texts, labels = [], {}
+                self._release_cookies(event.key)
+                if event.key == self._PROCESS_KEY:
+                    self._process_running = False
+                    self.download_finished(event.exit_code)
+                elif event.key == self._LIST_PROCESS_KEY:
+                    self._listing_finished(event.exit_code)
+                else:
+                    self._worker_finished(event.key, event.exit_code)
+            elif isinstance(event, _Discovered):
+                self._queue_entries(event.entries)
+            elif isinstance(event, _DownloadRecord):
+                self._sync_tracker.feed(event.line)
+            elif event.target == "log":
+                log_texts.append(event.text)
+            else:
+                labels[event.target] = event.text
+        self._apply_ui_updates(log_texts, labels)
+
+    def _apply_ui_updates(self, log_texts, labels):
+        if log_texts:
+            self._append_output_log("\n".join(log_texts))
+        for target, text in labels.items():
+            getattr(self, f"{target}_label").setText(text)
+
+    def download_finished(self, exit_code):
         """下载完成处理"""
-        logging.info(f"下载进程结束 - 退出码: {exit_code}, 状态: {exit_status}")
-        self._flush_stream_buffers()
+        logging.info(f"下载进程结束 - 退出码: {exit_code}")
+        active = self._active_download_start or {}
+        sync = active.get("sync")
+        if exit_code == playlist_sync.BREAK_EXIT_CODE and sync:
+            self._append_output_log("增量同步：已到达上次同步的位置，停止检查更早的视频")
+            exit_code = 0
+        # 收入 yt-dlp 这次追加的下载记录
+        if "--download-archive" in active.get("args", ()):
+            self.archive.ingest_text(self.config.archive_file)
 
         if self._should_retry_youtube_failure(exit_code):
             current_attempt = self._youtube_retry_count + 2
@@ -904,13 +1087,26 @@ class PlaylistWindow(QMainWindow):
             self._youtube_retry_count += 1
             self._reset_download_tracking()
             self._saw_download_progress = False
-            self._last_process_output = ""
-            self._last_process_error = ""
+            self._last_process_output.clear()
+            self._last_process_error.clear()
+            self._retry_markers.clear()
+            # 重试时输出调试信息，万一再次失败便于排查
+            active["args"] = verbosity.with_debug(active["args"])
+            active["base_args"] = verbosity.with_debug(active["base_args"])
             self._start_active_download_process()
             return
 
         self._finalize_pending_for_item(self.current_item_id, switched_to_next=False)
         self._append_download_summary()
+        url = active.get("url")
+        if url and not self._cancel_requested:
+            failed = any(state.get("status") == "failed" for state in self.item_states.values())
+            if exit_code != 0 or failed:
+                self._debug_urls.add(url)
+            else:
+                self._debug_urls.discard(url)
+        if sync:
+            self._finish_sync(active["url"], sync["watermark"], exit_code)
         self._set_download_button_idle()
         self.back_button.setEnabled(True)
         self._active_download_start = None
@@ -924,6 +1120,34 @@ class PlaylistWindow(QMainWindow):
                 self.status_label.setText(f"下载失败 (退出码: {exit_code})")
             logging.error(f"下载失败 - 退出码: {exit_code}")
 
+    def _finish_sync(self, url, watermark, exit_code):
+        """报告本次同步检查与下载的条目数，并更新收藏播放列表的水位"""
+        tracker = self._sync_tracker
+        failed = any(state.get("status") == "failed" for state in self.item_states.values())
+        self._append_output_log(f"增量同步：检查了 {tracker.scanned} 个条目，下载了 {tracker.downloaded} 个")
+        if exit_code == 0 and not failed and not self._cancel_requested:
+            self._store_watermark(url, tracker.advance(watermark))
+        elif watermark is not None:
+            # 失败或未下载的条目排在已下载的条目之前，按水位停止会跳过它们
+            self._store_watermark(url, None)
+            self._append_output_log("增量同步：本次未全部成功，下次同步将完整检查一遍")
+
+    def _saved_playlist(self, url):
+        for item in self.config.config.get('saved_playlists', []):
+            if item['url'] == url:
+                return item
+        return None
+
+    def _store_watermark(self, url, watermark):
+        item = self._saved_playlist(url)
+        if item is None:
+            return
+        if watermark is None:
+            item.pop('watermark', None)
+        else:
+            item['watermark'] = watermark.to_dict()
+        self.config.save_config()
+
     def _should_retry_youtube_failure(self, exit_code):
         """仅对 YouTube 首次初始化类失败自动补一次重试。"""
         if exit_code == 0 or self._cancel_requested:
@@ -940,8 +1164,7 @@ class PlaylistWindow(QMainWindow):
         if self._saw_download_progress:
             return False
 
-        combined = f"{self._last_process_output}\n{self._last_process_error}".lower()
-        return any(marker in combined for marker in self._YOUTUBE_RETRY_ERROR_MARKERS)
+        return bool(self._retry_markers.matched)
     
     def back_to_main(self):
         """返回主窗口"""
@@ -955,7 +1178,7 @@ class PlaylistWindow(QMainWindow):
             self.hide()
             return
 
-        if self.process and self.process.state() == QProcess.ProcessState.Running:
+        if self._process_running:
             reply = QMessageBox.question(
                 self,
                 "确认返回",
@@ -965,7 +1188,7 @@ class PlaylistWindow(QMainWindow):
             if reply == QMessageBox.StandardButton.No:
                 return
             self._cancel_requested = True
-            self.process.kill()
+            self._kill_processes()
         
         # 直接显示主窗口并关闭当前窗口，不触发closeEvent
         self.parent_window.show()
@@ -984,7 +1207,7 @@ class PlaylistWindow(QMainWindow):
             event.accept()
             return
 
-        if self.process and self.process.state() == QProcess.ProcessState.Running:
+        if self._process_running:
             reply = QMessageBox.question(
                 self,
                 "确认关闭",
@@ -996,7 +1219,7 @@ class PlaylistWindow(QMainWindow):
                 return
             
             self._cancel_requested = True
-            self.process.kill()
+            self._kill_processes()
         
         # 如果用户确认关闭或没有正在进行的下载，则关闭窗口
         if self.parent_window:
@@ -1111,11 +1334,141 @@ class PlaylistWindow(QMainWindow):
             return
 
         self._cancel_requested = False
-        self.process.start(active["program"], active["args"])
+        self._process_running = True
+        if active["parallelism"] > 1:
+            self._start_fanout(active)
+        else:
+            self._engine.spawn(
+                self._PROCESS_KEY,
+                self._cookie_args([active["program"], *active["args"]], self._PROCESS_KEY),
+                None,
+                active["env"],
+                self._parse_output_lines,
+                decoders=(self.stdout_decoder, self.stderr_decoder),
+            )
         self._set_download_button_cancel_mode()
         self.back_button.setEnabled(True)
         self.status_label.setText("下载中...")
 
+    def _start_fanout(self, active):
+        """并行模式：先用 --flat-playlist 列出条目（不提取每个视频），再分批交给多个下载进程。
+
+        下载进程共用同一份 --download-archive 文本记录（yt-dlp 写入时加文件锁），
+        条目状态汇总到同一个 item_states。
+        """
+        self._fanout = playlist_fanout.FanoutQueue()
+        self._listing = True
+        if active["streaming"]:
+            self._append_output_log(f"正在列出播放列表条目，列出后立即开始下载（同时下载 {active['parallelism']} 个）...")
+        else:
+            self._append_output_log(f"正在列出播放列表条目（同时下载 {active['parallelism']} 个）...")
+        self._engine.spawn(
+            self._LIST_PROCESS_KEY,
+            self._cookie_args([active["program"], *active["list_args"]], self._LIST_PROCESS_KEY),
+            None,
+            active["env"],
+            self._parse_listing_lines,
+        )
+
+    def _cookie_args(self, args, key):
+        """把 --cookies-from-browser 换成该进程专用的 cookies 副本，避免每个进程各自读取浏览器数据库"""
+        if self.cookie_broker is None:
+            return args
+        return self.cookie_broker.rewrite_args(args, key)
+
+    def _release_cookies(self, key):
+        if self.cookie_broker is not None:
+            self.cookie_broker.release(key)
+
+    def _queue_entries(self, entries):
+        """列举出的条目去掉下载记录中已有的之后放入队列"""
+        if self._fanout is None or self._cancel_requested:
+            return
+        self._sync_tracker.note_entries(entry.video_id for entry in entries)
+        if "--download-archive" in self._active_download_start["args"]:
+            kept = [entry for entry in entries if entry.archive_id not in self.archive]
+            self._fanout_skipped += len(entries) - len(kept)
+            entries = kept
+        self._fanout.add(entries)
+        self.total_progress_label.setText(f"已列出 {self._fanout.discovered + self._fanout_skipped} 个视频")
+        if self._active_download_start["streaming"]:
+            self._dispatch_workers()
+
+    def _listing_finished(self, exit_code):
+        self._listing = False
+        if exit_code == playlist_sync.BREAK_EXIT_CODE and self._active_download_start.get("sync"):
+            exit_code = 0  # 增量同步到达上次同步的位置
+        self._fanout.close()
+        discovered = self._fanout.discovered
+        if exit_code != 0 and discovered == 0 and not self._fanout_skipped:
+            self._fanout_exit_code = exit_code
+        else:
+            self._append_output_log(
+                f"共列出 {discovered + self._fanout_skipped} 个视频，"
+                f"跳过下载过的 {self._fanout_skipped} 个，待下载 {discovered} 个"
+            )
+        self.total_items_expected = discovered
+        self._dispatch_workers()
+
+    def _dispatch_workers(self):
+        """为空闲的下载名额分配条目；全部进程结束后收尾"""
+        fanout = self._fanout
+        if fanout is None:
+            return
+        active = self._active_download_start
+        parallelism = active["parallelism"]
+        # 非流式处理时列举结束后才开始下载，此时已知全部条目，按进程数分批
+        ready = fanout.closed or active["streaming"]
+        while ready and not self._cancel_requested and len(self._workers) < parallelism:
+            batch = fanout.next_batch(parallelism)
+            if not batch:
+                break
+            key = f"{self._PROCESS_KEY}-{next(self._worker_ids)}"
+            self._workers[key] = len(batch)
+            self._engine.spawn(
+                key,
+                self._cookie_args([active["program"], *playlist_fanout.worker_args(active["base_args"], batch)], key),
+                None,
+                active["env"],
+                lambda lines, is_error, key=key: self._parse_worker_lines(key, lines, is_error),
+            )
+        self._update_fanout_progress()
+        if not self._listing and not self._workers:
+            self._fanout_finished()
+
+    def _worker_finished(self, key, exit_code):
+        count = self._workers.pop(key, 0)
+        self._fanout_completed += count
+        # 进程已结束，不会再有该进程的解析回调
+        self._finished_cursors.append(self._worker_cursors.pop(key, (None, None)))
+        if exit_code != 0:
+            self._fanout_exit_code = exit_code
+        self._dispatch_workers()
+
+    def _update_fanout_progress(self):
+        if not self._workers:
+            return
+        if self._listing:
+            total = f"已列出 {self._fanout.discovered} 个视频（仍在列出）"
+        else:
+            total = f"共 {self.total_items_expected} 个视频"
+        self.total_progress_label.setText(
+            f"已处理 {self._fanout_completed} 个，{total}，{len(self._workers)} 个进程下载中"
+        )
+
+    def _fanout_finished(self):
+        """列举与所有下载进程都已结束：逐个确认重试上限条目后按单进程模式收尾"""
+        for item_id, _ in self._finished_cursors:
+            self._finalize_pending_for_item(item_id, switched_to_next=False)
+        self.current_item_id = None
+        exit_code = self._fanout_exit_code
+        if self._cancel_requested and exit_code == 0:
+            exit_code = 1
+        self._fanout.discard()
+        self._fanout = None
+        self._process_running = False
+        self.download_finished(exit_code)
+
     def _handle_output_scroll_changed(self, _value):
         """????????????????????"""
         scrollbar = self.output_text.verticalScrollBar()
@@ -82,11 +82,14 @@ class SavedURLsDialog(QDialog):
     
     def save_changes(self):
         """保存更改到配置文件"""
+        # 保留增量同步的水位等其他字段
+        previous = {item['url']: item for item in self.config.config.get('saved_playlists', [])}
         items = []
         for i in range(self.url_list.count()):
             text = self.url_list.item(i).text()
             title, url = text.split(" - ", 1)
             items.append({
+                **previous.get(url, {}),
                 'title': title,
                 'url': url
             })
@@ -1,8 +1,10 @@
 import sys
 import os
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
 from gui.main_window import MainWindow
+from core.config import Config
 from pathlib import Path
 import logging
 
@@ -16,16 +18,8 @@ def main():
     else:
         os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
 
-    # 设置更详细的日志格式
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.FileHandler("debug.log", encoding='utf-8'),  # 文件处理器
-            logging.StreamHandler()  # 控制台处理器
-        ]
-    )
+    # 读取配置并初始化日志（后台线程写入 config/debug.log）
+    Config()
 
     logging.debug(f"程序目录: {os.path.dirname(os.path.abspath(__file__))}")
     logging.debug(f"二进制目录: {bin_dir}")
@@ -58,4 +52,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # 打包后 worker 进程池（spawn）需要
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+测试日志配置：队列写入、按大小轮转、分模块级别
+"""
+
+import logging
+import logging.handlers
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import app_logging
+
+
+def test_queue_rotation_and_levels():
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    with tempfile.TemporaryDirectory() as directory:
+        log_file = Path(directory) / "debug.log"
+        try:
+            app_logging.setup_logging(log_file, levels={"core.platform_index": "info"},
+                                      max_mb=0.01, backup_count=2)
+            # 再次调用只更新级别，不重复安装处理器
+            app_logging.setup_logging(log_file, levels={"core.platform_index": "INFO"})
+            assert len(root.handlers) == 1
+            assert isinstance(root.handlers[0], logging.handlers.QueueHandler)
+
+            logging.getLogger("core.platform_index").debug("不应写入的平台识别日志")
+            logging.getLogger("core.downloader").debug("提取到标题: 测试")
+            for i in range(500):
+                logging.getLogger("gui.playlist_window").error(f"第 {i} 行 " + "x" * 40)
+            app_logging.stop_logging()
+
+            files = sorted(path.name for path in Path(directory).iterdir())
+            assert files == ["debug.log", "debug.log.1", "debug.log.2"], files
+            assert all((Path(directory) / name).stat().st_size <= 0.01 * 1024 * 1024 for name in files)
+            text = "".join((Path(directory) / name).read_text(encoding="utf-8") for name in files)
+            assert "不应写入" not in text
+            assert "第 499 行" in log_file.read_text(encoding="utf-8")
+        finally:
+            app_logging.stop_logging()
+            for handler in root.handlers[:]:
+                root.removeHandler(handler)
+                handler.close()
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+            logging.getLogger("core.platform_index").setLevel(logging.NOTSET)
+    print("✓ 日志队列、轮转和分模块级别正确")
+
+
+if __name__ == "__main__":
+    test_queue_rotation_and_levels()
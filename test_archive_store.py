@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+测试下载记录存储：旧文本记录迁移、与 yt-dlp 文本文件的导出/读入、多个写入方
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.archive_store import ArchiveStore
+
+
+def test_migrate_export_ingest():
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        export_path = root / "config" / "downloaded_videos_list.txt"
+        export_path.parent.mkdir()
+        export_path.write_text("youtube aaaaaaaaaaa\n\nyoutube aaaaaaaaaaa\n", encoding="utf-8")
+        legacy = root / "downloaded_videos_list.txt"
+        legacy.write_text("youtube bbbbbbbbbbb\nYoutube aaaaaaaaaaa\nbilibili BV1xx411c7mD", encoding="utf-8")
+
+        store = ArchiveStore(root / "config" / "archive.sqlite3", export_path=export_path, legacy_paths=[legacy])
+        assert len(store) == 3
+        assert not legacy.exists() and legacy.with_name(legacy.name + ".migrated").exists()
+        # 重复行触发整理，导出文件只剩唯一记录
+        assert export_path.read_text(encoding="utf-8").splitlines() == [
+            "youtube aaaaaaaaaaa", "youtube bbbbbbbbbbb", "bilibili BV1xx411c7mD",
+        ]
+
+        kept, skipped = store.filter_urls([
+            "https://youtu.be/aaaaaaaaaaa",
+            "https://www.youtube.com/watch?v=ccccccccccc",
+            "https://www.youtube.com/watch?v=bbbbbbbbbbb&t=1",
+        ])
+        assert kept == ["https://www.youtube.com/watch?v=ccccccccccc"]
+        assert len(skipped) == 2
+
+        # 没有变化时不重写；yt-dlp 追加的记录（包括写了一半的最后一行）按位置读入
+        mtime = export_path.stat().st_mtime_ns
+        time.sleep(0.01)
+        store.export_text()
+        assert export_path.stat().st_mtime_ns == mtime
+        with open(export_path, "a", encoding="utf-8") as f:
+            f.write("youtube ccccccccccc\nyoutube ddd")
+        assert store.ingest_text(export_path) == 1
+        assert "youtube ccccccccccc" in store and "youtube ddd" not in store
+        with open(export_path, "a", encoding="utf-8") as f:
+            f.write("dddddddd\n")
+        store.ingest_text(export_path)
+        assert "youtube ddddddddddd" in store
+        # 读入的记录本来就在导出文件里，不需要重写
+        mtime = export_path.stat().st_mtime_ns
+        time.sleep(0.01)
+        store.export_text()
+        assert export_path.stat().st_mtime_ns == mtime
+        store.close()
+
+        # 重新打开：记录和读取位置都已持久化
+        store = ArchiveStore(root / "config" / "archive.sqlite3", export_path=export_path)
+        assert len(store) == 5
+        store.close()
+
+
+def test_concurrent_writers():
+    """两个实例在多个线程里同时写，记录不丢失，彼此能读到对方写入的记录"""
+    with tempfile.TemporaryDirectory() as root:
+        database = Path(root) / "archive.sqlite3"
+        stores = [ArchiveStore(database), ArchiveStore(database)]
+
+        def writer(store, prefix):
+            for index in range(200):
+                store.add("Youtube", f"{prefix}{index:010d}")
+
+        threads = [threading.Thread(target=writer, args=(stores[i % 2], f"{i}")) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for store in stores:
+            store.filter_urls([])
+            assert len(store) == 800, len(store)
+            store.close()
+        print("  4 个线程经 2 个实例写入 800 条，无丢失")
+
+
+if __name__ == "__main__":
+    test_migrate_export_ingest()
+    test_concurrent_writers()
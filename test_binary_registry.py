@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+测试外部程序版本探测缓存：文件不变时不再启动进程，文件被替换后重新探测
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.binary_registry import BinaryRegistry
+
+
+def _write_fake_binary(path, version, counter, exit_code=0):
+    """写一个记录调用次数并输出版本号的脚本（仅 POSIX 可执行）"""
+    path.write_text(f"#!/bin/sh\necho x >> '{counter}'\necho '{version}'\nexit {exit_code}\n")
+    path.chmod(0o755)
+
+
+def _calls(counter):
+    return len(counter.read_text().splitlines()) if counter.exists() else 0
+
+
+def test_probe_cache():
+    if os.name == "nt":
+        print("  跳过：需要 POSIX shell 脚本模拟可执行文件")
+        return
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        counter = root / "calls.txt"
+        binaries = {"yt-dlp": ("yt-dlp.exe", ["--version"]), "ffmpeg": ("ffmpeg.exe", ["-version"])}
+        _write_fake_binary(root / "yt-dlp.exe", "2025.01.01", counter)
+        cache_path = root / "config" / "binaries.json"
+
+        registry = BinaryRegistry(root, cache_path, binaries=binaries)
+        registry.refresh()
+        assert _calls(counter) == 1
+        assert registry.info("yt-dlp").version == "2025.01.01"
+        ok, error = registry.check("ffmpeg")
+        assert not ok and "未找到" in error
+
+        # 新实例读取磁盘缓存，文件没变不再启动进程
+        registry = BinaryRegistry(root, cache_path, binaries=binaries)
+        registry.refresh()
+        for _ in range(1000):
+            assert registry.check("yt-dlp") == (True, "")
+        assert _calls(counter) == 1
+
+        # 更新内核后文件变化：check 不阻塞，后台重新探测
+        _write_fake_binary(root / "yt-dlp.exe", "2025.02.02-broken", counter, exit_code=1)
+        os.utime(root / "yt-dlp.exe", ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert registry.check("yt-dlp") == (True, "")
+        deadline = time.monotonic() + 10
+        while registry.info("yt-dlp") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        ok, error = registry.check("yt-dlp")
+        assert not ok and "退出码 1" in error
+        assert _calls(counter) == 2
+        print("  1000 次检查只在文件变化时启动进程")
+
+
+if __name__ == "__main__":
+    test_probe_cache()
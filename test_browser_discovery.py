@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+测试火狐 cookies 查找结果的缓存与失效（在临时目录中构造配置文件目录）
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import browser_discovery
+from core.browser_discovery import BrowserDiscovery
+
+
+def _make_profile(profiles_dir, name, mtime):
+    profile = profiles_dir / name
+    profile.mkdir(parents=True)
+    cookies = profile / "cookies.sqlite"
+    cookies.write_bytes(b"")
+    os.utime(cookies, (mtime, mtime))
+    return str(cookies)
+
+
+def test_cookies_path_cache():
+    """首次查找后不再遍历目录；新建配置文件、cookies 被删除时重新查找"""
+    glob_calls = []
+    real_glob = browser_discovery.glob.glob
+
+    def counting_glob(pattern):
+        glob_calls.append(pattern)
+        return real_glob(pattern)
+
+    browser_discovery.glob.glob = counting_glob
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            appdata = Path(root) / "AppData"
+            profiles_dir = appdata / "Mozilla" / "Firefox" / "Profiles"
+            discovery = BrowserDiscovery(appdata=str(appdata), search_root=str(Path(root) / "app"), registry=None)
+
+            # 没有配置文件目录时返回 None，结果同样缓存
+            assert discovery.firefox_cookies_path() is None
+            calls = len(glob_calls)
+            assert discovery.firefox_cookies_path() is None
+            assert len(glob_calls) == calls
+
+            old = _make_profile(profiles_dir, "abc.default-release", 1_000_000)
+            assert discovery.firefox_cookies_path() == old
+            calls = len(glob_calls)
+            for _ in range(1000):
+                assert discovery.firefox_cookies_path() == old
+            assert len(glob_calls) == calls
+            print(f"  1000 次缓存命中没有遍历目录（共 {calls} 次 glob）")
+
+            # 新的配置文件最近被使用，取修改时间最新的那个
+            new = _make_profile(profiles_dir, "xyz.default-esr", 2_000_000)
+            os.utime(profiles_dir, (3_000_000, 3_000_000))
+            assert discovery.firefox_cookies_path() == new
+
+            # 旧配置文件的 cookies 更新了
+            os.utime(old, (4_000_000, 4_000_000))
+            assert discovery.firefox_cookies_path() == old
+
+            os.remove(old)
+            assert discovery.firefox_cookies_path() == new
+            os.remove(new)
+            assert discovery.firefox_cookies_path() is None
+    finally:
+        browser_discovery.glob.glob = real_glob
+
+
+def test_portable_profile():
+    """没有安装版配置时从程序目录向上查找便携版"""
+    with tempfile.TemporaryDirectory() as root:
+        cookies = Path(root) / "FirefoxPortable" / "Data" / "profile" / "cookies.sqlite"
+        cookies.parent.mkdir(parents=True)
+        cookies.write_bytes(b"")
+        search_root = Path(root) / "tools" / "downloader"
+        search_root.mkdir(parents=True)
+        discovery = BrowserDiscovery(appdata="", search_root=str(search_root), registry=None)
+        assert discovery.firefox_cookies_path() == str(cookies)
+
+
+if __name__ == "__main__":
+    test_cookies_path_cache()
+    test_portable_profile()
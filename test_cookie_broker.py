@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+测试 cookies 导出：只在源数据库变化时重新导出，每个使用者拿到独立副本
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import cookie_broker
+from core.cookie_broker import CookieBroker
+
+
+class FakeDiscovery:
+    def __init__(self, path):
+        self.path = path
+
+    def firefox_cookies_path(self):
+        return self.path
+
+
+def _make_database(path, rows):
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS moz_cookies (host TEXT, path TEXT, isSecure INTEGER, "
+        "expiry INTEGER, name TEXT, value TEXT, originAttributes TEXT)"
+    )
+    connection.executemany("INSERT INTO moz_cookies VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    connection.commit()
+    connection.close()
+
+
+def test_export_and_refresh():
+    exports = []
+    real_export = cookie_broker.export_firefox_cookies
+
+    def counting_export(source, destination):
+        exports.append(source)
+        return real_export(source, destination)
+
+    cookie_broker.export_firefox_cookies = counting_export
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "cookies.sqlite")
+            _make_database(source, [
+                (".youtube.com", "/", 1, 2_000_000_000_000, "SID", "abc", ""),
+                ("www.youtube.com", "/", 0, 2_000_000_000, "PREF", "f6=8", ""),
+                (".youtube.com", "/", 1, 2_000_000_000, "SID", "container", "^userContextId=1"),
+            ])
+            broker = CookieBroker(os.path.join(root, "cookies"), FakeDiscovery(source))
+
+            args = ["yt-dlp", "--cookies-from-browser", "firefox", "-f", "best", "URL"]
+            jars = [broker.rewrite_args(args, f"Task-{index}")[2] for index in range(10)]
+            assert len(exports) == 1, "10 个任务只应导出一次"
+            assert len(set(jars)) == 10
+            assert broker.rewrite_args(args, "Task-0")[:2] == ["yt-dlp", "--cookies"]
+
+            lines = [line for line in Path(jars[0]).read_text(encoding="utf-8").splitlines()
+                     if line and not line.startswith("#")]
+            assert lines == [
+                ".youtube.com\tTRUE\t/\tTRUE\t2000000000\tSID\tabc",
+                "www.youtube.com\tFALSE\t/\tFALSE\t2000000000\tPREF\tf6=8",
+            ], lines
+            try:
+                from yt_dlp.cookies import YoutubeDLCookieJar
+            except ImportError:
+                pass
+            else:
+                jar = YoutubeDLCookieJar(jars[0])
+                jar.load()
+                assert {cookie.name for cookie in jar} == {"SID", "PREF"}
+
+            # 某个进程写回自己的副本，不影响其他副本
+            Path(jars[1]).write_text("", encoding="utf-8")
+            assert Path(jars[2]).read_text(encoding="utf-8").count("\n") > 3
+
+            # 源数据库变化后重新导出
+            _make_database(source, [(".youtube.com", "/", 1, 2_000_000_000, "LOGIN", "x", "")])
+            jar = broker.acquire("Task-10", "firefox")
+            assert len(exports) == 2
+            assert "LOGIN" in Path(jar).read_text(encoding="utf-8")
+
+            broker.release("Task-10")
+            assert not os.path.exists(jar)
+            broker.release_all()
+            assert not any(os.path.exists(path) for path in jars)
+
+            # 不支持的浏览器保持原参数
+            chrome_args = ["yt-dlp", "--cookies-from-browser", "chrome", "URL"]
+            assert broker.rewrite_args(chrome_args, "Task-11") == chrome_args
+            print(f"  10 个任务共导出 {len(exports) - 1} 次，源数据库变化后重新导出")
+    finally:
+        cookie_broker.export_firefox_cookies = real_export
+
+
+if __name__ == "__main__":
+    test_export_and_refresh()
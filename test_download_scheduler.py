@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+测试下载调度器：优先级、同优先级先进先出、平台并发上限、预估代价排序、取消与释放名额，
+以及并发上限与其他设置先后保存时互不覆盖
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.downloader import DownloadScheduler
+
+
+def _scheduler(max_concurrent=1, platform_limits=None):
+    scheduler = DownloadScheduler(max_concurrent=max_concurrent, platform_limits=platform_limits)
+    started = []
+    states = []
+    scheduler.job_state_changed.connect(lambda task_id, state: states.append((task_id, state)))
+
+    def submit(task_id, platform="youtube", priority=0, result=True):
+        def launch():
+            started.append(task_id)
+            return result
+        scheduler.submit(task_id, platform, launch, priority=priority)
+
+    return scheduler, submit, started, states
+
+
+def _drain(scheduler, started):
+    """依次结束正在运行的任务，直到队列清空"""
+    finished = 0
+    while finished < len(started):
+        scheduler.finish(started[finished])
+        finished += 1
+
+
+def test_priority_and_fifo():
+    scheduler, submit, started, _ = _scheduler()
+    submit("blocker")
+    submit("low-1")
+    submit("high-1", priority=5)
+    submit("low-2")
+    submit("high-2", priority=5)
+    assert started == ["blocker"] and scheduler.pending_count() == 4
+    _drain(scheduler, started)
+    assert started == ["blocker", "high-1", "high-2", "low-1", "low-2"], started
+    assert not scheduler.has_work()
+    print("✓ 优先级高的先启动，同优先级先进先出")
+
+
+def test_platform_limits():
+    scheduler, submit, started, _ = _scheduler(max_concurrent=3, platform_limits={"youtube": 1})
+    submit("yt-1")
+    submit("yt-2")
+    submit("bili-1", platform="bilibili")
+    submit("bili-2", platform="bilibili")
+    # 全局 3 个名额，但 YouTube 同时只能 1 个
+    assert started == ["yt-1", "bili-1", "bili-2"], started
+    assert scheduler.is_queued("yt-2") and scheduler.running_count() == 3
+
+    scheduler.finish("bili-1")
+    assert started == ["yt-1", "bili-1", "bili-2"], "其他平台的名额不能给 YouTube"
+    scheduler.finish("yt-1")
+    assert started[-1] == "yt-2" and not scheduler.is_queued("yt-2")
+    print("✓ 平台并发上限生效")
+
+
+def test_update_cost():
+    scheduler, submit, started, _ = _scheduler()
+    submit("blocker")
+    for task_id in ("big", "small", "medium"):
+        submit(task_id)
+    assert scheduler.update_cost("big", 3_000)
+    assert scheduler.update_cost("small", 10)
+    assert scheduler.update_cost("medium", 500)
+    assert not scheduler.update_cost("blocker", 1), "已启动的任务不在队列中"
+    assert not scheduler.update_cost("missing", 1)
+    _drain(scheduler, started)
+    assert started == ["blocker", "small", "medium", "big"], started
+    print("✓ 预估代价小的先启动")
+
+
+def test_finish_and_cancel():
+    scheduler, submit, started, states = _scheduler(max_concurrent=2)
+    submit("a")
+    submit("b")
+    submit("c")
+    submit("d")
+    assert started == ["a", "b"]
+
+    # finish 释放名额并立即派发下一个；重复 finish 无副作用
+    scheduler.finish("a")
+    assert started == ["a", "b", "c"]
+    scheduler.finish("a")
+    assert scheduler.running_count() == 2 and started == ["a", "b", "c"]
+
+    assert scheduler.cancel_pending() == ["d"]
+    assert scheduler.pending_count() == 0 and not scheduler.is_queued("d")
+    assert ("d", DownloadScheduler.STATE_DONE) in states
+    scheduler.finish("b")
+    scheduler.finish("c")
+    assert started == ["a", "b", "c"] and not scheduler.has_work()
+    print("✓ 结束释放名额，取消排队任务")
+
+
+def test_failed_launch_frees_slot():
+    scheduler, submit, started, states = _scheduler()
+    submit("broken", result=False)
+    submit("next")
+    assert started == ["broken", "next"]
+    assert scheduler.running_count() == 1
+    assert states[:3] == [
+        ("broken", DownloadScheduler.STATE_QUEUED),
+        ("broken", DownloadScheduler.STATE_RUNNING),
+        ("broken", DownloadScheduler.STATE_DONE),
+    ]
+    print("✓ 启动失败时释放名额")
+
+
+def test_concurrency_setting_shares_config():
+    """下载器与主窗口共用一个 Config，先后保存时不会用旧字典覆盖对方的设置"""
+    from core.config import Config
+    from core.downloader import Downloader
+
+    config = Config()
+    with tempfile.TemporaryDirectory() as directory:
+        config.config_file = Path(directory) / "config.json"
+        downloader = Downloader(config)
+        try:
+            assert downloader.config is config
+            # 主窗口保存下载路径，下载器保存并发上限，播放列表窗口再保存水位
+            config.config['last_download_path'] = directory
+            config.save_config()
+            downloader.set_max_concurrent_downloads(5)
+            config.config['playlist_sync'] = {"https://example.com/list": {"first_id": "abc"}}
+            config.save_config()
+        finally:
+            downloader.shutdown()
+
+        saved = json.loads(config.config_file.read_text())
+        assert saved['last_download_path'] == directory
+        assert saved['max_concurrent_downloads'] == 5
+        assert saved['playlist_sync'] == {"https://example.com/list": {"first_id": "abc"}}
+    print("✓ 并发上限与其他设置先后保存互不覆盖")
+
+
+if __name__ == "__main__":
+    test_priority_and_fifo()
+    test_platform_limits()
+    test_update_cost()
+    test_finish_and_cancel()
+    test_failed_launch_frees_slot()
+    test_concurrency_setting_shares_config()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+测试格式表解析与画质选项可用性判断
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.format_probe import QUALITY_PRESETS, FormatProbe, evaluate_preset, parse_formats
+from core.info_cache import InfoCache
+
+
+def _fmt(format_id, ext, vcodec, acodec, height=None, **extra):
+    return {"format_id": format_id, "ext": ext, "vcodec": vcodec, "acodec": acodec, "height": height, **extra}
+
+
+# 只有 720P 的 mp4 视频流，另有 webm 1080P 和 m4a 音频
+INFO = {
+    "id": "WjPXAwOYkDA",
+    "extractor_key": "Youtube",
+    "title": "示例视频",
+    "formats": [
+        _fmt("sb0", "mhtml", "none", "none"),
+        _fmt("140", "m4a", "none", "mp4a.40.2", tbr=129.5, filesize=3_000_000),
+        _fmt("251", "webm", "none", "opus"),
+        _fmt("136", "mp4", "avc1.4d401f", "none", 720, width=1280, fps=30),
+        _fmt("248", "webm", "vp9", "none", 1080, width=1920, fps=30),
+        _fmt("18", "mp4", "avc1.42001E", "mp4a.40.2", 360, width=640),
+    ],
+}
+
+
+def test_presets():
+    table = parse_formats(INFO)
+    assert len(table.rows) == 5, "故事板不应计入格式表"
+    assert table.rows[2].resolution == "1280x720"
+
+    results = [evaluate_preset(table, preset) for preset in QUALITY_PRESETS]
+    print("画质选项可用性:")
+    for preset, result in zip(QUALITY_PRESETS, results):
+        print(f"  {preset.label:<12} 可用={result.available} 分辨率={result.height}")
+    assert [result.available for result in results] == [True, True, True, True, False, True]
+    assert results[0].height == 1080  # bv* 可选 webm
+    assert results[1].height == 720
+    assert results[3].height == 720
+
+    # 没有纯音频流时 bv*+ba 选不到格式，ba/b 退回带音频的合并流
+    muxed_only = parse_formats({"formats": [_fmt("0", "mp4", "h264", "aac", 720)]})
+    assert not evaluate_preset(muxed_only, QUALITY_PRESETS[0]).available
+    assert evaluate_preset(muxed_only, QUALITY_PRESETS[-1]).available
+
+
+def test_cached_from_info_cache():
+    """信息缓存里已有 info.json 时不启动进程"""
+    with tempfile.TemporaryDirectory() as root:
+        info_cache = InfoCache(Path(root) / "info_cache")
+        info_cache.store("Youtube", "WjPXAwOYkDA", json.dumps(INFO))
+        probe = FormatProbe(lambda: {}, info_cache=info_cache)
+        received = []
+        probe.formats_ready.connect(lambda url, table: received.append((url, table)))
+
+        url = "https://youtu.be/WjPXAwOYkDA"
+        probe.request(url, ["yt-dlp"])
+        assert received and received[0][1].video_id == "WjPXAwOYkDA"
+        assert probe.cached("https://www.youtube.com/watch?v=WjPXAwOYkDA&t=30") is not None
+        assert probe._running is None
+        probe.shutdown()
+
+
+if __name__ == "__main__":
+    test_presets()
+    test_cached_from_info_cache()
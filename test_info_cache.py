@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+测试视频信息缓存的失效时间、淘汰和收入
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.info_cache import EXPIRY_MARGIN_SECONDS, InfoCache, key_from_url
+
+NOW = 1_700_000_000
+
+
+def _info(video_id, expire, padding=0):
+    return json.dumps({
+        "id": video_id,
+        "extractor_key": "Youtube",
+        "formats": [{"format_id": "18", "url": f"https://rr1.googlevideo.com/videoplayback?expire={expire}&id=x"}],
+        "description": "x" * padding,
+    })
+
+
+def test_key_from_url():
+    """只有单视频链接能直接得出缓存键"""
+    test_cases = [
+        ("https://www.youtube.com/watch?v=WjPXAwOYkDA", ("Youtube", "WjPXAwOYkDA")),
+        ("https://youtu.be/WjPXAwOYkDA?t=10", ("Youtube", "WjPXAwOYkDA")),
+        ("https://www.youtube.com/shorts/WjPXAwOYkDA", ("Youtube", "WjPXAwOYkDA")),
+        ("https://www.youtube.com/watch?v=WjPXAwOYkDA&list=PL123", None),
+        ("https://www.bilibili.com/video/BV1xx411c7mD", None),
+    ]
+    print("测试缓存键:")
+    print("=" * 50)
+    for url, expected in test_cases:
+        key = key_from_url(url)
+        print(f"  {url:<60} {key}")
+        assert key == expected
+
+
+def test_store_and_expiry():
+    """失效时间取最早过期的媒体链接并预留余量，过期后查不到"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = InfoCache(directory)
+        path = cache.store("Youtube", "WjPXAwOYkDA", _info("WjPXAwOYkDA", NOW + 3600), now=NOW)
+        print(f"\n  写入: {path.name}")
+        assert path.name.endswith(f".{NOW + 3600 - EXPIRY_MARGIN_SECONDS}.info.json")
+        assert cache.lookup("Youtube", "WjPXAwOYkDA", now=NOW) == str(path)
+        assert cache.lookup("Youtube", "WjPXAwOYkDA", now=NOW + 3600) is None
+        assert cache.store("Youtube", "expired0000", _info("expired0000", NOW + 60), now=NOW) is None
+
+        cache.invalidate("Youtube", "WjPXAwOYkDA")
+        assert cache.lookup("Youtube", "WjPXAwOYkDA", now=NOW) is None
+
+
+def test_evict_by_size():
+    """总大小超过上限时先删最早写入的条目"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = InfoCache(directory, max_bytes=25_000)
+        for index in range(4):
+            cache.store("Youtube", f"video{index:06d}", _info(f"video{index:06d}", NOW + 7200, 10_000), now=NOW)
+        kept = [index for index in range(4) if cache.lookup("Youtube", f"video{index:06d}", now=NOW)]
+        print(f"\n  按大小淘汰后保留: {kept}")
+        assert kept == [2, 3]
+
+
+def test_adopt_incoming():
+    """下载进程写到 incoming 的 info.json 收入缓存后删除原文件"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = InfoCache(directory)
+        cache.incoming_dir.mkdir(parents=True)
+        (cache.incoming_dir / "Youtube-Wj-PXAwOYkD.info.json").write_text(
+            _info("Wj-PXAwOYkD", NOW + 7200), encoding="utf-8"
+        )
+        assert cache.adopt_incoming(now=NOW) == 1
+        assert cache.lookup("Youtube", "Wj-PXAwOYkD", now=NOW)
+        assert not list(cache.incoming_dir.iterdir())
+
+
+if __name__ == "__main__":
+    test_key_from_url()
+    test_store_and_expiry()
+    test_evict_by_size()
+    test_adopt_incoming()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+测试后台 I/O 线程的子进程读取与批量事件
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.io_engine import ProcessExited, ProcessIOEngine
+
+
+def _run(argv, kill_at_once=False):
+    batches = []
+    done = threading.Event()
+
+    def on_batch(batch):
+        batches.append(batch)
+        if any(isinstance(event, ProcessExited) for event in batch):
+            done.set()
+
+    engine = ProcessIOEngine(on_batch)
+    engine.spawn("job", argv, None, None, lambda lines, is_error: [(is_error, line) for line in lines])
+    if kill_at_once:
+        engine.kill("job")
+    assert done.wait(30), "进程结束事件未送达"
+    engine.shutdown()
+    return batches
+
+
+def test_output_and_exit():
+    """输出按行解析、打包送出，结束事件排在所有输出之后"""
+    script = (
+        "import sys\n"
+        "for i in range(200): print(f'[download] {i / 2:.1f}%', flush=True)\n"
+        "sys.stderr.write('ERROR: boom\\n')\n"
+        "sys.stdout.write('last line without newline')\n"
+        "sys.exit(3)\n"
+    )
+    batches = _run([sys.executable, "-c", script])
+    events = [event for batch in batches for event in batch]
+
+    print("测试输出与退出:")
+    print("=" * 50)
+    print(f"  批次数: {len(batches)}, 事件数: {len(events)}")
+    assert events[-1] == ProcessExited("job", 3)
+    stdout_lines = [line for is_error, line in events[:-1] if not is_error]
+    assert len(stdout_lines) == 201
+    assert stdout_lines[-1] == "last line without newline"
+    assert (True, "ERROR: boom") in events
+    assert len(batches) < len(events)
+
+
+def test_failed_start():
+    """程序不存在时报告错误行并以 -1 结束，而不是一直等待"""
+    events = [event for batch in _run(["/nonexistent/yt-dlp.exe"]) for event in batch]
+    print(f"  启动失败: {events}")
+    assert events[-1] == ProcessExited("job", -1)
+    assert events[0][0] is True and events[0][1].startswith("ERROR:")
+
+
+def test_kill_right_after_spawn():
+    """spawn 后立即 kill：进程尚未创建时的结束请求不能丢失"""
+    started = time.monotonic()
+    events = [event for batch in _run([sys.executable, "-c", "import time; time.sleep(5)"], kill_at_once=True)
+              for event in batch]
+    elapsed = time.monotonic() - started
+    print(f"  立即结束: {events}, 耗时 {elapsed:.2f}s")
+    assert events[-1].key == "job" and events[-1].exit_code != 0
+    assert elapsed < 4
+
+
+if __name__ == "__main__":
+    test_output_and_exit()
+    test_failed_start()
+    test_kill_right_after_spawn()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+测试 yt-dlp 输出行按前缀分发
+"""
+
+import sys
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import log_dispatch
+from core.log_dispatch import LineDispatcher, line_prefix
+
+
+def _collect(kinds):
+    seen = []
+    dispatcher = LineDispatcher({
+        kind: (lambda match, kind=kind: seen.append((kind, match.groups())))
+        for kind in kinds
+    })
+    return dispatcher, seen
+
+
+def test_line_prefix():
+    assert line_prefix("[download]  23.4% of 50.75MiB") == "[download]"
+    assert line_prefix("[youtube:tab] Extracting URL: x") == "[youtube:tab]"
+    assert line_prefix("ERROR: [youtube] abc: Video unavailable") == "ERROR:"
+    assert line_prefix("") == ""
+    print("✓ 行首前缀正确")
+
+
+def test_dispatch():
+    dispatcher, seen = _collect([
+        log_dispatch.PROGRESS, log_dispatch.ITEM, log_dispatch.DESTINATION,
+        log_dispatch.BIND, log_dispatch.MERGING, log_dispatch.GIVE_UP,
+    ])
+    lines = [
+        "[download]  23.4% of 50.75MiB at 2.52MiB/s ETA 00:15",
+        "2: [download]  18.8% of 210.43MiB at 902.64KiB/s ETA 03:12 (frag 20/119)",
+        "[download] 100% of    5.04MiB in 00:00:03 at 1.20MiB/s",
+        "[download] Downloading item 3 of N/A",
+        "[download] Destination: 标题 [abcdefghij0].f137.mp4",
+        "[youtube] Extracting URL: https://www.youtube.com/watch?v=abcdefghij0",
+        "[youtube] abcdefghij0: Downloading webpage",
+        "[youtube:tab] abcdefghij0: Downloading webpage",
+        "[info] abcdefghij0: Downloading 1 format(s): 137+140",
+        "[Merger] Merging formats into \"标题 [abcdefghij0].mp4\"",
+        "ERROR: [download] Got error: timed out. Giving up after 10 retries",
+        "WARNING: [youtube] abcdefghij0: nsig extraction failed",
+    ]
+    handled = [dispatcher.dispatch(line) for line in lines]
+    assert handled == [True] * 7 + [False] + [True] * 3 + [False]
+    assert seen == [
+        (log_dispatch.PROGRESS, ("23.4", "50.75MiB", "2.52MiB/s", "00:15")),
+        (log_dispatch.PROGRESS, ("18.8", "210.43MiB", "902.64KiB/s", "03:12")),
+        (log_dispatch.PROGRESS, ("100", "5.04MiB", None, None)),
+        (log_dispatch.ITEM, ("3", "N/A")),
+        (log_dispatch.DESTINATION, ("标题 [abcdefghij0].f137.mp4",)),
+        (log_dispatch.BIND, ("abcdefghij0",)),
+        (log_dispatch.BIND, ("abcdefghij0",)),
+        (log_dispatch.BIND, ("abcdefghij0",)),
+        (log_dispatch.MERGING, ("\"标题 [abcdefghij0].mp4\"",)),
+        (log_dispatch.GIVE_UP, ()),
+    ]
+    print("✓ 分发结果正确")
+
+
+def test_unregistered_kinds_fall_through():
+    """没有注册的类型跳过，继续尝试同一前缀下的后续规则"""
+    dispatcher, seen = _collect([log_dispatch.ALREADY_DOWNLOADED])
+    assert dispatcher.dispatch("[download] a.mp4 has already been downloaded and merged")
+    assert not dispatcher.dispatch("[download]  23.4% of 50.75MiB at 2.52MiB/s ETA 00:15")
+    assert seen == [(log_dispatch.ALREADY_DOWNLOADED, ())]
+    print("✓ 未注册的类型不影响匹配")
+
+
+if __name__ == "__main__":
+    test_line_prefix()
+    test_dispatch()
+    test_unregistered_kinds_fall_through()
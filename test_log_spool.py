@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+测试任务日志的落盘、内存环形缓冲、随机读取和旧日志整理
+"""
+
+import gzip
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.log_spool import LogRecord, LogSpool
+
+
+def test_append_and_read_back():
+    with tempfile.TemporaryDirectory() as directory:
+        spool = LogSpool(directory, ring_lines=3)
+        spool.append_message("Task-1", "开始下载: 测试", "12:00:00")
+        spool.append_raw("Task-1", "[youtube] abcdefghij0: Downloading webpage\n[download]  10.0% of 5MiB")
+        spool.append_raw("Task-1", "[Merger] Merging formats into \"a\tb.mp4\"")
+
+        expected = [
+            LogRecord("message", "12:00:00", "开始下载: 测试"),
+            LogRecord("raw", "", "[youtube] abcdefghij0: Downloading webpage"),
+            LogRecord("raw", "", "[download]  10.0% of 5MiB"),
+            LogRecord("raw", "", "[Merger] Merging formats into \"a\tb.mp4\""),
+        ]
+        assert list(spool.records("Task-1")) == expected
+        assert spool.recent("Task-1") == expected[1:]
+        assert expected[0].display == "[12:00:00] 开始下载: 测试"
+
+        reader = spool.reader("Task-1")
+        assert len(reader) == 4
+        assert reader.read(2, 10) == expected[2:]
+
+        # 结束后内存中不再保留，仍能从文件读出
+        spool.finish("Task-1")
+        assert spool.recent("Task-1") == []
+        assert list(spool.records("Task-1")) == expected
+        reader = spool.reader("Task-1")
+        assert len(reader) == 0 and reader.scan() == 4
+        assert reader.read(1, 1) == expected[1:2]
+
+        # 结束后又有输出时接着追加，偏移仍然正确
+        spool.append_raw("Task-1", "重试")
+        assert spool.reader("Task-1").read(4, 1) == [LogRecord("raw", "", "重试")]
+        spool.flush("Task-1")
+        assert reader.scan() == 1 and reader.line(4) == LogRecord("raw", "", "重试")
+        assert list(spool.records("Task-2")) == []
+        spool.close()
+    print("✓ 日志写入与读取正确")
+
+
+def test_index_and_search():
+    """分段建立索引、按页读取、按级别和正则筛选"""
+    with tempfile.TemporaryDirectory() as directory:
+        spool = LogSpool(directory)
+        lines = []
+        for i in range(1000):
+            lines.append(f"[download]  {i / 10:.1f}% of 5MiB")
+            if i % 100 == 0:
+                lines.append(f"[debug] Invoking http downloader {i}")
+            if i % 250 == 0:
+                lines.append(f"WARNING: [youtube] 第 {i} 行")
+        lines.append("ERROR: [youtube] abcdefghij0: Video unavailable")
+        spool.append_raw("Task-1", "\n".join(lines))
+        spool.append_message("Task-1", "下载失败", "12:00:00")
+        spool.finish("Task-1")
+
+        reader = spool.reader("Task-1")
+        while reader.scan(max_lines=300):
+            pass
+        assert len(reader) == len(lines) + 1
+        assert [reader.line(i).text for i in (0, 257, 600)] == [lines[0], lines[257], lines[600]]
+
+        warnings = reader.search(min_level=logging.WARNING)
+        assert [reader.line(i).text for i in warnings] == [
+            line for line in lines if line.startswith(("WARNING:", "ERROR:"))
+        ]
+        assert list(reader.search(min_level=logging.ERROR)) == [len(lines) - 1]
+        assert len(reader.search(re.compile(r"Invoking"))) == 10
+        assert len(reader.search(re.compile(r"Invoking"), min_level=logging.INFO)) == 0
+        # 匹配显示文本（消息带时间戳）
+        assert list(reader.search(re.compile(r"^\[12:00:00\] 下载失败$"))) == [len(lines)]
+        # 分段筛选与一次筛选结果相同
+        debug = reader.search(re.compile("debug"), start=0, stop=500)
+        debug.extend(reader.search(re.compile("debug"), start=500))
+        assert list(debug) == list(reader.search(re.compile("debug")))
+        spool.close()
+    print("✓ 索引与筛选正确")
+
+
+def test_prune():
+    with tempfile.TemporaryDirectory() as directory:
+        now = time.time()
+        old = Path(directory) / "20240101-000000-1-Task-1.log"
+        expired = Path(directory) / "20231201-000000-1-Task-1.log.gz"
+        previous = Path(directory) / "20240102-000000-1-Task-1.log"
+        old.write_text("R\t\t" + os.urandom(2000).hex() + "\n")
+        previous.write_text("R\t\tprevious\n")
+        expired.write_bytes(b"")
+        os.utime(old, (now - 3 * 86400, now - 3 * 86400))
+        os.utime(previous, (now - 86400, now - 86400))
+        os.utime(expired, (now - 30 * 86400, now - 30 * 86400))
+
+        spool = LogSpool(directory, max_age_days=7, max_total_mb=0.001)
+        spool.append_raw("Task-1", "本次启动的日志不整理")
+        spool.prune(now)
+
+        names = sorted(path.name for path in Path(directory).iterdir())
+        # 过期的删除，其余压缩；总大小超限时先删最旧的
+        assert names == sorted([previous.name + ".gz", spool.path_for("Task-1").name]), names
+        with gzip.open(Path(directory) / (previous.name + ".gz"), "rt") as file:
+            assert file.read() == "R\t\tprevious\n"
+        spool.close()
+    print("✓ 旧日志整理正确")
+
+
+if __name__ == "__main__":
+    test_append_and_read_back()
+    test_index_and_search()
+    test_prune()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+测试元数据探测：-J 输出行与任务的对应，以及已缓存视频不再探测
+"""
+
+import itertools
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.info_cache import InfoCache
+from core.io_engine import ProcessExited
+from core.metadata_probe import MetadataProbe
+
+
+def _info(video_id, title):
+    return json.dumps({"id": video_id, "extractor_key": "Youtube", "title": title, "duration": 60})
+
+
+def test_lines_map_to_tasks():
+    """第 n 行 JSON（含失败的 null）对应第 n 个 URL；输出分几批到达也一样"""
+    probe = MetadataProbe(lambda: {})
+    received = []
+    probe.metadata_ready.connect(lambda task_id, metadata: received.append((task_id, metadata.title)))
+
+    urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in ("aaaaaaaaaa1", "bbbbbbbbbb2", "cccccccccc3")]
+    probe._running[7] = [("Task-1", urls[0]), ("Task-2", urls[1]), ("Task-3", urls[2])]
+    counter = itertools.count()
+    events = probe._parse_lines(7, urls, counter, [_info("aaaaaaaaaa1", "第一个"), "null"], False)
+    events += probe._parse_lines(7, urls, counter, ["ERROR: [youtube] bbbbbbbbbb2: Video unavailable"], True)
+    events += probe._parse_lines(7, urls, counter, ["[youtube] 其他输出", _info("cccccccccc3", "第三个")], False)
+    probe._handle_batch(events + [ProcessExited(MetadataProbe._batch_key(7), 0)])
+
+    print(f"  探测结果: {received}")
+    assert received == [("Task-1", "第一个"), ("Task-3", "第三个")]
+    assert not probe._running
+    probe.shutdown()
+    print("✓ 输出行与任务对应正确")
+
+
+def test_skip_cached_and_discard():
+    with tempfile.TemporaryDirectory() as root:
+        info_cache = InfoCache(Path(root) / "info_cache")
+        info_cache.store("Youtube", "aaaaaaaaaa1", _info("aaaaaaaaaa1", "已缓存"))
+        probe = MetadataProbe(lambda: {}, info_cache=info_cache)
+
+        assert not probe.enqueue("Task-1", "https://youtu.be/aaaaaaaaaa1", ["yt-dlp"])
+        assert probe.enqueue("Task-2", "https://youtu.be/bbbbbbbbbb2", ["yt-dlp"])
+        assert probe.enqueue("Task-3", "https://youtu.be/cccccccccc3", ["yt-dlp"])
+        assert probe.pending_count() == 2
+
+        # 开始下载的任务移出队列
+        probe.discard("Task-2")
+        probe.discard("Task-3")
+        assert probe.pending_count() == 0 and not probe._pending
+        probe.shutdown()
+    print("✓ 已缓存的视频不探测，已开始的任务移出队列")
+
+
+if __name__ == "__main__":
+    test_lines_map_to_tasks()
+    test_skip_cached_and_discard()
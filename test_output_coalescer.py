@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试界面消息合并：进度只保留最新一条、状态消息保持顺序、按任务刷新、空闲时停止定时器
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt6.QtWidgets import QApplication
+
+from core.output_coalescer import OutputCoalescer
+
+# 定时器需要事件循环所在的应用对象，否则 start() 不生效；
+# 与其他测试在同一进程运行时可能要创建窗口，这里用 QApplication
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def _coalescer():
+    coalescer = OutputCoalescer()
+    emitted = []
+    coalescer.output_ready.connect(lambda task_id, message: emitted.append((task_id, message)))
+    return coalescer, emitted
+
+
+def test_progress_and_order():
+    coalescer, emitted = _coalescer()
+    messages = [
+        "开始下载: 测试视频",
+        "下载进度: 10%",
+        "下载进度: 20%",
+        "下载进度: 30%",
+        "正在合并音视频",
+        "下载进度: 100%",
+        "下载完成",
+    ]
+    for message in messages:
+        coalescer.push("Task-1", message)
+    coalescer.push("Task-1", "[RAW_LOG][download]  10.0% of 5MiB")
+    coalescer.push("Task-1", "[RAW_LOG][download]  20.0% of 5MiB")
+    coalescer.flush()
+
+    print(f"  发出: {emitted}")
+    assert emitted == [
+        ("Task-1", "[RAW_LOG][download]  10.0% of 5MiB\n[download]  20.0% of 5MiB"),
+        ("Task-1", "开始下载: 测试视频"),
+        ("Task-1", "下载进度: 30%"),
+        ("Task-1", "正在合并音视频"),
+        ("Task-1", "下载进度: 100%"),
+        ("Task-1", "下载完成"),
+    ]
+    assert coalescer.stats() == {"received": 9, "emitted": 6, "dropped": 2, "merged": 1}
+    print("✓ 连续进度只保留最新一条，状态消息保持顺序")
+
+
+def test_flush_single_task_and_timer():
+    coalescer, emitted = _coalescer()
+    assert not coalescer._timer.isActive()
+    coalescer.push("Task-1", "下载进度: 50%")
+    coalescer.push("Task-2", "下载进度: 70%")
+    assert coalescer._timer.isActive()
+
+    # 只刷新指定任务，其他任务仍待刷新，定时器继续
+    coalescer.flush("Task-1")
+    assert emitted == [("Task-1", "下载进度: 50%")]
+    assert coalescer._timer.isActive()
+
+    coalescer.flush()
+    assert emitted[-1] == ("Task-2", "下载进度: 70%")
+    assert not coalescer._timer.isActive(), "没有待刷新的消息时定时器应停止"
+
+    coalescer.flush()
+    assert len(emitted) == 2
+    print("✓ 按任务刷新，空闲时停止定时器")
+
+
+if __name__ == "__main__":
+    test_progress_and_order()
+    test_flush_single_task_and_timer()
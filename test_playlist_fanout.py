@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+测试播放列表并行下载：列举输出解析、下载进程参数与分批
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.playlist_fanout import FanoutQueue, PlaylistEntry, parse_entry, worker_args
+
+# yt-dlp --flat-playlist --print ENTRY_TEMPLATE 的实际输出（文件名已由 yt-dlp 清理）
+LINES = [
+    "Youtube\tabcdefghij0\thttps://www.youtube.com/watch?v=abcdefghij0\t"
+    + os.path.join("D:", "视频", "My： List⧸100%", "T：0 [abcdefghij0].NA"),
+    "[debug] Command-line config: ['--flat-playlist']",
+    "\tNA\thttps://example.com/x\t/out/NA.NA",
+]
+
+
+def _entries(count, directory="/out/a"):
+    return [PlaylistEntry("Youtube", f"id{i:09d}", f"https://youtu.be/id{i:09d}", directory) for i in range(count)]
+
+
+def test_parse_entry():
+    entry = parse_entry(LINES[0])
+    assert entry.video_id == "abcdefghij0"
+    assert entry.archive_id == "youtube abcdefghij0"
+    assert entry.directory == os.path.join("D:", "视频", "My： List⧸100%")
+    assert parse_entry(LINES[1]) is None
+    assert parse_entry(LINES[2]) is None
+    print("✓ 列举输出解析正确")
+
+
+def test_worker_args():
+    entry = parse_entry(LINES[0])
+    args = worker_args(["-f", "bv*+ba"], [entry])
+    # 目录中的 % 需转义，链接放在 -- 之后
+    assert args[:3] == ["-f", "bv*+ba", "-o"]
+    assert args[3] == os.path.join("D:", "视频", "My： List⧸100%%", "%(title)s [%(id)s].%(ext)s")
+    assert args[4:] == ["--", entry.url]
+    print("✓ 下载进程参数正确")
+
+
+def test_batches():
+    queue = FanoutQueue(batch_size=20)
+    queue.add(_entries(100))
+    queue.close()
+    # 条目多时按上限分批，接近结束时按进程数平分
+    sizes = []
+    while len(queue):
+        sizes.append(len(queue.next_batch(4)))
+    assert sizes == [20, 20, 15, 12, 9, 6, 5, 4, 3, 2, 1, 1, 1, 1]
+    assert queue.done and queue.discovered == 100
+
+    # 一批只包含同一目录的条目
+    queue = FanoutQueue()
+    queue.add(_entries(3, "/out/a") + _entries(3, "/out/b"))
+    assert [entry.directory for entry in queue.next_batch(1)] == ["/out/a"] * 3
+    assert [entry.directory for entry in queue.next_batch(1)] == ["/out/b"] * 3
+    assert queue.next_batch(1) == [] and not queue.done
+    print("✓ 分批正确")
+
+
+def test_streaming_spill():
+    """列举未结束时有多少领多少；超出内存上限的条目暂存到临时文件，顺序不变"""
+    queue = FanoutQueue(batch_size=4, memory_entries=10)
+    queue.add(_entries(2))
+    assert len(queue.next_batch(3)) == 2  # 第一个条目列出后即可开始下载
+
+    entries = _entries(50)
+    queue.add(entries)
+    assert len(queue) == 50 and len(queue._pending) == 10
+    taken = []
+    for _ in range(5):
+        taken += queue.next_batch(3)
+    queue.add(_entries(3, "/out/b"))
+    queue.close()
+    while len(queue):
+        taken += queue.next_batch(3)
+    assert taken[:50] == entries
+    assert [entry.directory for entry in taken[50:]] == ["/out/b"] * 3
+    assert queue.done and queue.discovered == 55
+    queue.discard()
+    print("✓ 流式分批与溢出正确")
+
+
+if __name__ == "__main__":
+    test_parse_entry()
+    test_worker_args()
+    test_batches()
+    test_streaming_spill()
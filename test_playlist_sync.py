@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试收藏播放列表的增量同步：停止参数、输出统计与水位推进，
+以及并行模式下只由列举进程统计检查过的条目
+"""
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt6.QtWidgets import QApplication
+
+from core import playlist_fanout
+from core.config import Config
+from core.playlist_sync import SyncTracker, Watermark, is_newest_first, sync_args
+from gui.playlist_window import PlaylistWindow
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+# yt-dlp --lazy-playlist --break-on-existing 的实际输出（节选）
+OUTPUT = [
+    "[download] Downloading playlist: Fake Channel",
+    "[FakeChan] Playlist Fake Channel: Downloading N/A items",
+    "[download] Downloading item 1 of N/A",
+    "@@ytdlp-gui|W|vid00000001|20260129",
+    "[download] Downloading item 2 of N/A",
+    "@@ytdlp-gui|W|vid00000002|NA",
+    "[download] vid00000005: title 5 has already been recorded in the archive",
+    "[info] Encountered a video that is already in the archive, stopping due to --break-on-existing",
+]
+
+
+def test_newest_first():
+    assert is_newest_first("https://www.youtube.com/@somechannel")
+    assert is_newest_first("https://www.youtube.com/@somechannel/videos")
+    assert is_newest_first("https://www.youtube.com/channel/UCxxxx/streams")
+    assert is_newest_first("https://www.youtube.com/playlist?list=UUxxxx")
+    assert is_newest_first("https://space.bilibili.com/123456/video")
+    assert not is_newest_first("https://www.youtube.com/playlist?list=PLxxxx")
+    assert not is_newest_first("https://www.youtube.com/@somechannel/playlists")
+    print("✓ 来源排序判断正确")
+
+
+def test_sync_args():
+    url = "https://www.youtube.com/@somechannel"
+    # 没有水位或来源不按时间排列时只边获取边处理，不提前停止
+    assert sync_args(url, None, True) == ["--lazy-playlist"]
+    watermark = Watermark("vid00000003", "20260110", "")
+    assert sync_args("https://www.youtube.com/playlist?list=PLxxxx", watermark, True) == ["--lazy-playlist"]
+    assert sync_args(url, watermark, True) == [
+        "--lazy-playlist", "--break-on-existing",
+        "--break-match-filters", "id!=vid00000003 & upload_date>=20260103",
+    ]
+    assert "--break-on-existing" not in sync_args(url, watermark._replace(upload_date=None), False)
+    print("✓ 同步参数正确")
+
+
+def test_tracker():
+    tracker = SyncTracker()
+    for line in OUTPUT:
+        tracker.feed(line)
+    assert (tracker.scanned, tracker.downloaded, tracker.first_id) == (3, 2, "vid00000001")
+
+    now = datetime(2026, 2, 1, 12, 0, 0)
+    watermark = tracker.advance(Watermark("vid00000005", "20260120", ""), now)
+    assert watermark == Watermark("vid00000001", "20260129", "2026-02-01T12:00:00")
+    assert Watermark.from_dict(watermark.to_dict()) == watermark
+
+    # 没有新条目：位置不变，只更新同步时间
+    old = Watermark("vid00000005", "20260120", "")
+    assert SyncTracker().advance(old, now) == old._replace(synced_at="2026-02-01T12:00:00")
+    assert SyncTracker().advance(None, now) is None
+    print("✓ 统计与水位推进正确")
+
+
+def test_parallel_counts_listing_only():
+    """并行模式：下载进程的输出不在 I/O 线程修改 SyncTracker，已记录的条目不重复计数"""
+    window = PlaylistWindow(Config())
+    window._fanout = playlist_fanout.FanoutQueue()
+    window._active_download_start = {"args": [], "streaming": False}
+    entries = tuple(
+        playlist_fanout.PlaylistEntry("Youtube", f"vid0000000{i}", f"https://youtu.be/vid0000000{i}", "")
+        for i in (1, 2, 3)
+    )
+    worker_lines = [
+        "[download] vid00000002: title 2 has already been recorded in the archive",
+        "[download] Downloading item 1 of 1",
+        "@@ytdlp-gui|W|vid00000001|20260129",
+    ]
+    try:
+        # I/O 线程解析下载进程输出时不改动统计，只把下载完成记录交给界面线程
+        updates = window._parse_worker_lines("playlist-1", worker_lines, False)
+        tracker = window._sync_tracker
+        assert (tracker.scanned, tracker.downloaded, tracker.first_id) == (0, 0, None)
+
+        window._queue_entries(entries)
+        window._handle_engine_batch(updates)
+        assert (tracker.scanned, tracker.downloaded, tracker.newest_date) == (3, 1, "20260129")
+        assert tracker.first_id == "vid00000001"
+    finally:
+        window._fanout.discard()
+        window._engine.shutdown()
+    print("✓ 并行模式只由列举进程统计条目")
+
+
+if __name__ == "__main__":
+    test_newest_first()
+    test_sync_args()
+    test_tracker()
+    test_parallel_counts_listing_only()
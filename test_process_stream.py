@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+测试进程输出的解码、切行与尾部缓冲逻辑
+"""
+
+import sys
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.process_stream import LineFramer, MarkerMatcher, StreamDecoder, TailBuffer
+
+
+def test_line_framer():
+    """输出块在任意位置被切开时，仍应还原出完整的行"""
+    output = (
+        "[youtube] Extracting URL: https://www.youtube.com/watch?v=abc123\n"
+        "[download] Destination: 测试视频.mp4\n"
+        "\r[download]  10.0% of 50.75MiB at 2.52MiB/s ETA 00:15"
+        "\r[download]  20.0% of 50.75MiB at 2.52MiB/s ETA 00:12\r\n"
+        "[Merger] Merging formats into \"测试视频.mp4\""
+    )
+    expected = [
+        "[youtube] Extracting URL: https://www.youtube.com/watch?v=abc123",
+        "[download] Destination: 测试视频.mp4",
+        "[download]  10.0% of 50.75MiB at 2.52MiB/s ETA 00:15",
+        "[download]  20.0% of 50.75MiB at 2.52MiB/s ETA 00:12",
+        "[Merger] Merging formats into \"测试视频.mp4\"",
+    ]
+
+    print("测试切行逻辑:")
+    print("=" * 50)
+    for chunk_size in (1, 3, 7, 64, len(output)):
+        framer = LineFramer()
+        lines = []
+        for start in range(0, len(output), chunk_size):
+            lines.extend(framer.feed(output[start:start + chunk_size]))
+        lines.extend(framer.flush())
+        status = "通过" if lines == expected else f"失败: {lines}"
+        print(f"  块大小 {chunk_size:>3}: {status}")
+        assert lines == expected
+
+
+def test_tail_buffer():
+    """尾部缓冲只保留最近的若干行"""
+    tail = TailBuffer(max_lines=3)
+    tail.extend(f"line {i}" for i in range(1000))
+    print("\n测试尾部缓冲:")
+    print(f"  保留行数: {len(tail)}，内容: {tail.text()!r}")
+    assert tail.text() == "line 997\nline 998\nline 999"
+
+
+def test_marker_matcher():
+    """标记流过时即记下，之后被挤出尾部缓冲也不会漏掉"""
+    matcher = MarkerMatcher(("PO Token", "timed out"))
+    tail = TailBuffer(max_lines=3)
+    lines = ["WARNING: [youtube] abc: Failed to fetch GVS PO Token"] + [f"[download] {i}%" for i in range(1000)]
+    for start in range(0, len(lines), 64):
+        batch = lines[start:start + 64]
+        tail.extend(batch)
+        matcher.feed(batch)
+    print("\n测试标记匹配:")
+    print(f"  命中: {sorted(matcher.matched)}，尾部仍含标记: {'po token' in tail.text().lower()}")
+    assert matcher.matched == {"po token"}
+    matcher.clear()
+    assert not matcher.matched
+
+
+def test_stream_decoder():
+    """多字节字符被切在块边界时不应误判编码，检测结果在 stdout/stderr 间共享"""
+    text = "[download] Destination: 【官方MV】夜空中最亮的星.mp4\n"
+    print("\n测试增量解码:")
+    for encoding in ("utf-8", "gb18030"):
+        raw = text.encode(encoding)
+        # 模拟系统首选编码为 encoding 的环境（如中文 Windows 控制台）
+        stdout_decoder, stderr_decoder = StreamDecoder.pair(preferred_encoding=encoding)
+        decoded = "".join(stdout_decoder.decode(raw[i:i + 1]) for i in range(len(raw)))
+        decoded += stdout_decoder.flush()
+        status = "通过" if decoded == text else f"失败: {decoded!r}"
+        print(f"  {encoding:<8} 逐字节解码: {status}，检测编码: {stdout_decoder.encoding}")
+        assert decoded == text
+        assert stderr_decoder.encoding == stdout_decoder.encoding
+        assert stderr_decoder.decode("错误".encode(encoding)) == "错误"
+
+
+if __name__ == "__main__":
+    test_line_framer()
+    test_stream_decoder()
+    test_tail_buffer()
+    test_marker_matcher()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+测试结构化进度记录的解析
+"""
+
+import sys
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core import progress_protocol
+from core.progress_protocol import FileEvent, PostprocessEvent, ProgressEvent, VideoEvent
+
+
+def test_parse_record():
+    """各类记录解析为对应事件，普通输出与残缺记录返回 None"""
+    prefix = progress_protocol.RECORD_PREFIX
+    test_cases = [
+        (f'{prefix}V|WjPXAwOYkDA|"Vlog\\uff1a\\u672c\\u683c|\\u7684"', VideoEvent("WjPXAwOYkDA", "Vlog：本格|的")),
+        (f"{prefix}P|downloading|1048576|10485760|NA|524288.0|18|WjPXAwOYkDA",
+         ProgressEvent("WjPXAwOYkDA", "downloading", 1048576.0, 10485760.0, None, 524288.0, 18.0)),
+        (f"{prefix}M|started|Merger|WjPXAwOYkDA", PostprocessEvent("WjPXAwOYkDA", "started", "Merger")),
+        (f'{prefix}F|WjPXAwOYkDA|"C:\\\\Videos\\\\a.mp4"', FileEvent("WjPXAwOYkDA", "C:\\Videos\\a.mp4")),
+        ("[download]  23.4% of 50.75MiB at 2.52MiB/s ETA 00:15", None),
+        (f"{prefix}P|downloading|1024", None),
+        (f'{prefix}V|WjPXAwOYkDA|"未闭合', None),
+    ]
+
+    print("测试结构化记录解析:")
+    print("=" * 50)
+    for line, expected in test_cases:
+        event = progress_protocol.parse_record(line)
+        status = "通过" if event == expected else f"失败: {event}"
+        print(f"  {line[:60]:<60} {status}")
+        assert event == expected
+
+    progress = test_cases[1][1]
+    print(f"\n  进度百分比: {progress.percent:.1f}%")
+    assert round(progress.percent, 1) == 10.0
+
+
+if __name__ == "__main__":
+    test_parse_record()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+测试链接规范化与批量去重
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.platform_index import PlatformIndex
+from core.url_canonical import VideoKey, canonical_key, dedupe_urls
+
+INDEX = PlatformIndex({
+    'youtube': ['youtube.com', 'youtu.be', 'm.youtube.com'],
+    'xiaohongshu': ['xiaohongshu.com', 'xhslink.com'],
+    'bilibili': ['bilibili.com', 'b23.tv'],
+    'douyin': ['douyin.com', 'iesdouyin.com'],
+})
+
+
+def test_canonical_key():
+    """同一内容的不同写法得到相同的键"""
+    test_cases = [
+        ("https://youtu.be/WjPXAwOYkDA", VideoKey('youtube', 'WjPXAwOYkDA')),
+        ("https://www.youtube.com/watch?v=WjPXAwOYkDA&t=30", VideoKey('youtube', 'WjPXAwOYkDA')),
+        ("https://m.youtube.com/watch?feature=share&v=WjPXAwOYkDA", VideoKey('youtube', 'WjPXAwOYkDA')),
+        ("https://www.youtube.com/shorts/WjPXAwOYkDA", VideoKey('youtube', 'WjPXAwOYkDA')),
+        ("https://www.youtube.com/watch?v=WjPXAwOYkDA&list=PLx", VideoKey('youtube', 'list=PLx')),
+        ("https://www.bilibili.com/video/BV1xx411c7mD/?spm_id_from=333", VideoKey('bilibili', 'BV1xx411c7mD')),
+        ("https://www.bilibili.com/video/BV1xx411c7mD?p=2", VideoKey('bilibili', 'BV1xx411c7mD?p=2')),
+        ("https://www.douyin.com/discover?modal_id=7300000000000000000", VideoKey('douyin', '7300000000000000000')),
+        ("https://www.douyin.com/video/7300000000000000000", VideoKey('douyin', '7300000000000000000')),
+        ("https://www.xiaohongshu.com/user/profile/5a1b/64f0c0ffee", VideoKey('xiaohongshu', '64f0c0ffee')),
+        ("https://www.xiaohongshu.com/explore/64F0C0FFEE?xsec=1", VideoKey('xiaohongshu', '64f0c0ffee')),
+        ("https://Example.com/video/1/#comments", VideoKey('generic', 'example.com/video/1')),
+    ]
+    print("测试链接规范化:")
+    print("=" * 50)
+    for url, expected in test_cases:
+        key = canonical_key(url, INDEX.classify(url))
+        status = "通过" if key == expected else f"失败: {key}"
+        print(f"  {url:<70} {status}")
+        assert key == expected
+
+
+def test_dedupe_batch():
+    """去掉空行与重复链接并保持顺序；1 万行的粘贴远小于 1 秒"""
+    lines = [
+        "https://youtu.be/WjPXAwOYkDA",
+        "",
+        "  https://www.youtube.com/watch?v=WjPXAwOYkDA&t=30  ",
+        "https://www.bilibili.com/video/BV1xx411c7mD",
+        "https://m.youtube.com/watch?v=WjPXAwOYkDA",
+    ]
+    unique, duplicates = dedupe_urls(lines, INDEX.classify)
+    assert unique == ["https://youtu.be/WjPXAwOYkDA", "https://www.bilibili.com/video/BV1xx411c7mD"]
+    assert len(duplicates) == 2
+
+    paste = [f"https://www.youtube.com/watch?v={index:011d}&t={index % 7}" for index in range(5_000)] * 2
+    started = time.perf_counter()
+    unique, duplicates = dedupe_urls(paste, INDEX.classify)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"\n  {len(paste)} 行去重: 保留 {len(unique)}，重复 {len(duplicates)}，耗时 {elapsed_ms:.1f} ms")
+    assert len(unique) == 5_000
+    assert elapsed_ms < 1000
+
+
+if __name__ == "__main__":
+    test_canonical_key()
+    test_dedupe_batch()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+测试调试档参数：--verbose 插入位置、不重复添加，以及下载命令仍以 URL 结尾
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 将src目录添加到Python路径
+src_dir = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from core.verbosity import VERBOSE_FLAG, with_debug
+
+
+def test_with_debug():
+    args = ["yt-dlp.exe", "--progress", "https://youtu.be/abcdefghij0"]
+    assert with_debug(args) == [VERBOSE_FLAG, *args]
+    assert with_debug(args, 1) == ["yt-dlp.exe", VERBOSE_FLAG, "--progress", "https://youtu.be/abcdefghij0"]
+    assert with_debug(args, len(args))[-1] == VERBOSE_FLAG
+    assert args == ["yt-dlp.exe", "--progress", "https://youtu.be/abcdefghij0"], "不应修改传入的列表"
+
+    # 已有 --verbose 时原样返回，重试多次也只有一个
+    debug_args = with_debug(args, 1)
+    assert with_debug(debug_args, 1) is debug_args
+    assert with_debug(with_debug(debug_args, 1), 1).count(VERBOSE_FLAG) == 1
+    print("✓ --verbose 插入位置正确且不重复")
+
+
+def test_download_args_end_with_url():
+    """勾选调试日志或自动重试后，命令仍以 URL 结尾（_apply_info_cache 依赖 base_args[:-1]）"""
+    from core.downloader import Downloader
+
+    downloader = Downloader()
+    downloader._check_yt_dlp_available = lambda: True
+    downloader.metadata_probe = None
+    launched = []
+    downloader._launch_task = lambda task_id, url, output_path, args: launched.append(args) or True
+
+    url = "https://www.bilibili.com/video/BV1GJ411x7h7"
+    try:
+        with tempfile.TemporaryDirectory() as output_path:
+            for options in ({"capture_debug": True}, {}):
+                assert downloader.start_download(url, output_path, options, None)
+    finally:
+        downloader.shutdown()
+
+    debug_args, normal_args = launched
+    assert debug_args[1] == VERBOSE_FLAG and debug_args[-1] == url
+    assert VERBOSE_FLAG not in normal_args and normal_args[-1] == url
+    # 自动重试时对 base_args 再加一次
+    retry_args = with_debug(normal_args, 1)
+    assert retry_args[1] == VERBOSE_FLAG and retry_args[-1] == url
+    print("✓ 下载命令以 URL 结尾")
+
+
+if __name__ == "__main__":
+    test_with_debug()
+    test_download_args_end_with_url()